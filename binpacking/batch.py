@@ -0,0 +1,372 @@
+import argparse
+import glob
+import os
+import time
+
+from numba import prange
+from numba.typed import Dict
+from numba.types import Tuple
+
+from binpacking.structures import *
+from binpacking.data_manager import BINARY_INSTANCE_EXTENSION, iter_instances_from_file, records_to_solution
+from binpacking.decoder import check_bin_selection, check_placement_engine, decode
+from binpacking.fitness import compute_bin_lower_bound, compute_bins_fitness, compute_fitness
+from binpacking.genetic_algo.crossover import crossover_individual, selection_probabilities
+from binpacking.genetic_algo.mutation import mutate_individual
+from binpacking.population_generation import generate_population, get_corresponding_sequence_by_id, set_seed
+from binpacking.symmetry import class_sequences, hash_class_sequence, size_classes
+
+# Short genetic algorithm run on each instance of a batch, without generations only the deterministic sequence
+# (items by non-increasing area) is decoded
+BATCH_POPULATION_SIZE = 10
+BATCH_GENERATIONS = 20
+BATCH_CROSSOVER_RATE = 0.7
+BATCH_MUTATION_RATE = 0.3
+
+@njit(int32[:, :](int32[:, :], float64[:], from_dtype(Item)[:], float64, float64, float64, float64, boolean), cache = True)
+def evolve_population(population: np.ndarray, fitnesses: np.ndarray, items: np.ndarray, crossover_rate: float,
+                      mutation_rate: float, kappa: float, delta: float, rotation: bool) -> np.ndarray:
+    """
+    Build the next generation of a population like genetic_algo (crossover, sampled individuals, mutation), with the
+    same operators on the calling thread: the batch kernel already runs one instance per thread, and doesn't nest
+    the parallel loops of crossover and mutation.
+
+    Parameters:
+    - population (np.ndarray): The id orderings of the population, one per row.
+    - fitnesses (np.ndarray): Their fitnesses.
+    - items (np.ndarray): The items of the instance.
+    - crossover_rate (float): Proportion of the population generated by crossover.
+    - mutation_rate (float): The probability of mutation of an individual.
+    - kappa (float): Parameter controlling the probability distribution in generating solutions.
+    - delta (float): Exponent used to adjust selection probabilities based on fitness ranking.
+    - rotation (bool): Should the items be able to rotate, otherwise only swaps are applied.
+
+    Returns:
+    - np.ndarray: The next population.
+    """
+
+    psize = population.shape[0]
+    num_crossover = int(crossover_rate * psize)
+
+    sorted_indices = np.argsort(fitnesses)
+    probabilities = selection_probabilities(psize, num_crossover, delta)
+    pop_idx_array = np.arange(psize, dtype=np.int32)
+
+    new_population = np.empty_like(population)
+
+    for i in range(num_crossover):
+        new_population[i] = crossover_individual(population, fitnesses, sorted_indices, pop_idx_array, probabilities, i)
+
+    new_population[num_crossover:] = generate_population(items, psize - num_crossover, kappa)
+
+    for i in range(psize):
+        mutate_individual(new_population[i], mutation_rate, rotation)
+
+    return new_population
+
+@njit(int32[:](from_dtype(Item)[:]), cache = True)
+def deterministic_sequence(items: np.ndarray) -> np.ndarray:
+    """
+    Parameters:
+    - items (np.ndarray): The items of the instance.
+
+    Returns:
+    - np.ndarray: The id ordering of the items by non-increasing area, the sequence generate_population samples around.
+    """
+    order = np.argsort(-(items['width'] * items['height']))
+
+    ordering = np.empty(len(items), dtype=np.int32)
+    for i in range(len(items)):
+        ordering[i] = items[order[i]]['id']
+
+    return ordering
+
+@njit(Tuple((int32[:], float64))(from_dtype(Item)[:], int32, int32, int32, int32, float64, float64, float64, float64, boolean, boolean, int32, int32, int32, int32), cache = True)
+def solve_instance(items: np.ndarray, bin_width: int, bin_height: int, population_size: int, nb_generations: int,
+                   crossover_rate: float, mutation_rate: float, kappa: float, delta: float, guillotine_cut: bool,
+                   rotation: bool, engine: int, split_rule: int, bin_selection: int, open_bins: int):
+    """
+    Solve an instance with a short genetic algorithm on the calling thread, the deterministic sequence (items by
+    non-increasing area) being the first individual. Without generations, only the deterministic sequence is decoded.
+
+    Parameters:
+    - items (np.ndarray): The items of the instance.
+    - bin_width (int): The width of the bins.
+    - bin_height (int): The height of the bins.
+    - population_size (int): The size of the population in each generation.
+    - nb_generations (int): The number of generations.
+    - crossover_rate (float): Proportion of the population generated by crossover.
+    - mutation_rate (float): The probability of mutation of an individual.
+    - kappa (float): Parameter controlling the probability distribution in generating solutions.
+    - delta (float): Parameter controlling the randomness in crossover.
+    - guillotine_cut (bool): Should the guillotine cut rule be applied.
+    - rotation (bool): Should the items be able to rotate
+    - engine (int): The placement engine used to build the bins.
+    - split_rule (int): The rule deciding the orientation of the guillotine cuts.
+    - bin_selection (int): The policy choosing the bin receiving the next item.
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+
+    Returns:
+    - tuple: The best id ordering found and its fitness.
+    """
+
+    bin_dimensions = (bin_width, bin_height)
+
+    best_solution = deterministic_sequence(items)
+    best_fitness = compute_fitness(items, best_solution, bin_dimensions, guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)
+
+    if nb_generations == 0:
+        return best_solution, best_fitness
+
+    population = generate_population(items, population_size, kappa)
+    population[0] = best_solution
+    fitnesses = np.empty(population_size, dtype=np.float64)
+
+    # Fitnesses of the orderings already decoded, by sequence of size classes like genetic_algo: small instances
+    # converge fast. A sequence is found by its hash, and compared with the cached one on a hash match.
+    classes = size_classes(items)
+    cached_rows = Dict.empty(key_type=int64, value_type=int64)
+    cached_sequences = np.empty((population_size, len(items)), dtype=np.int32)
+    cached_fitnesses = np.empty(population_size, dtype=np.float64)
+    cached_sequences[0] = class_sequences(population[:1], classes)[0]
+    cached_fitnesses[0] = best_fitness
+    cached_rows[hash_class_sequence(best_solution, classes)] = 0
+    nb_cached = 1
+
+    for generation in range(nb_generations):
+
+        sequences = class_sequences(population, classes)
+        for i in range(population_size):
+            key = hash_class_sequence(population[i], classes)
+            row = cached_rows[key] if key in cached_rows else -1
+            if row != -1 and np.array_equal(cached_sequences[row], sequences[i]):
+                fitnesses[i] = cached_fitnesses[row]
+                continue
+
+            fitnesses[i] = compute_fitness(items, population[i], bin_dimensions, guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)
+            # On a hash collision, the sequence cached first keeps the entry
+            if row == -1:
+                if nb_cached == len(cached_fitnesses):
+                    cached_sequences = np.concatenate((cached_sequences, np.empty_like(cached_sequences)))
+                    cached_fitnesses = np.concatenate((cached_fitnesses, np.empty_like(cached_fitnesses)))
+                cached_sequences[nb_cached] = sequences[i]
+                cached_fitnesses[nb_cached] = fitnesses[i]
+                cached_rows[key] = nb_cached
+                nb_cached += 1
+
+        best_index = np.argmin(fitnesses)
+        if fitnesses[best_index] < best_fitness:
+            best_fitness = fitnesses[best_index]
+            best_solution[:] = population[best_index]
+
+        population = evolve_population(population, fitnesses, items, crossover_rate, mutation_rate, kappa, delta, rotation)
+
+    return best_solution, best_fitness
+
+@njit(Tuple((from_dtype(BatchResult)[:], int32[:], from_dtype(SolutionRecord)[:]))(from_dtype(Item)[:], int64[:], int32[:, :], int32, int32, float64, float64, float64, float64, boolean, boolean, int32, int32, int32, int32, int64), parallel = True, cache = True)
+def solve_batch(items: np.ndarray, offsets: np.ndarray, bin_dimensions: np.ndarray, population_size: int,
+                nb_generations: int, crossover_rate: float, mutation_rate: float, kappa: float, delta: float,
+                guillotine_cut: bool, rotation: bool, engine: int, split_rule: int, bin_selection: int,
+                open_bins: int, seed: int):
+    """
+    Solve a ragged batch of instances in parallel, one instance per thread (see solve_instance).
+
+    Each instance seeds the random generator of its thread with seed + its index, so its solution doesn't depend on
+    the thread running it.
+
+    Parameters:
+    - items (np.ndarray): The items of every instance, concatenated.
+    - offsets (np.ndarray): The items of instance k are items[offsets[k]:offsets[k + 1]].
+    - bin_dimensions (np.ndarray): The bin width and height of each instance, one per row.
+    - population_size (int): The size of the population in each generation.
+    - nb_generations (int): The number of generations, 0 to only decode the deterministic sequence.
+    - crossover_rate (float): Proportion of the population generated by crossover.
+    - mutation_rate (float): The probability of mutation of an individual.
+    - kappa (float): Parameter controlling the probability distribution in generating solutions.
+    - delta (float): Parameter controlling the randomness in crossover.
+    - guillotine_cut (bool): Should the guillotine cut rule be applied.
+    - rotation (bool): Should the items be able to rotate
+    - engine (int): The placement engine used to build the bins.
+    - split_rule (int): The rule deciding the orientation of the guillotine cuts.
+    - bin_selection (int): The policy choosing the bin receiving the next item.
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+    - seed (int): Seed of the first instance.
+
+    Returns:
+    - tuple: The result of each instance (BatchResult), and its best id ordering and placed items (SolutionRecord,
+             in bin order) at the offsets of its items.
+    """
+
+    nb_instances = len(offsets) - 1
+
+    results = np.empty(nb_instances, dtype=BatchResult)
+    orderings = np.empty(len(items), dtype=np.int32)
+    records = np.empty(len(items), dtype=SolutionRecord)
+
+    for k in prange(nb_instances):
+        start, end = offsets[k], offsets[k + 1]
+        instance_items = items[start:end]
+        bin_width, bin_height = bin_dimensions[k, 0], bin_dimensions[k, 1]
+
+        # Without generations, the only ordering is decoded once
+        if nb_generations == 0:
+            ordering = deterministic_sequence(instance_items)
+        else:
+            set_seed(seed + k)
+            ordering, _ = solve_instance(instance_items, bin_width, bin_height, population_size, nb_generations,
+                                         crossover_rate, mutation_rate, kappa, delta, guillotine_cut, rotation,
+                                         engine, split_rule, bin_selection, open_bins)
+        orderings[start:end] = ordering
+
+        bins = decode(get_corresponding_sequence_by_id(instance_items, ordering), bin_width, bin_height,
+                      guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)
+
+        position = start
+        for b in range(len(bins)):
+            for i in range(MAX_ITEMS):
+                item = bins[b]['items'][i]
+                if item['id'] == -1 or item['width'] == 0:
+                    break
+
+                record = records[position]
+                record['bin_id'] = bins[b]['id']
+                record['bin_width'] = bins[b]['width']
+                record['bin_height'] = bins[b]['height']
+                record['id'] = item['id']
+                record['width'] = item['width']
+                record['height'] = item['height']
+                record['rotated'] = item['rotated']
+                record['corner_x'] = item['corner_x']
+                record['corner_y'] = item['corner_y']
+                position += 1
+
+        results[k]['nb_bins'] = len(bins)
+        results[k]['lower_bound'] = compute_bin_lower_bound(instance_items, (bin_width, bin_height))
+        results[k]['fitness'] = compute_bins_fitness(bins)
+
+    return results, orderings, records
+
+def pack_instances(instances):
+    """
+    Concatenate instances into the ragged arrays of solve_batch.
+
+    Parameters:
+    - instances (list): The bin width, bin height and array of items of each instance.
+
+    Returns:
+    - tuple: The concatenated items, the offsets of each instance and the bin dimensions of each instance.
+    """
+
+    offsets = np.zeros(len(instances) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(items) for _, _, items in instances])
+
+    items = np.concatenate([items for _, _, items in instances]).astype(Item) if instances else np.empty(0, dtype=Item)
+    bin_dimensions = np.array([(bin_width, bin_height) for bin_width, bin_height, _ in instances], dtype=np.int32).reshape(-1, 2)
+
+    return items, offsets, bin_dimensions
+
+def solve_instances(instances, population_size=BATCH_POPULATION_SIZE, nb_generations=BATCH_GENERATIONS,
+                    crossover_rate=BATCH_CROSSOVER_RATE, mutation_rate=BATCH_MUTATION_RATE, kappa=1.0, delta=1.0,
+                    guillotine_cut=True, rotation=True, engine=LGFI_ENGINE, split_rule=SHORTER_LEFTOVER_SPLIT,
+                    bin_selection=FIRST_FIT_SELECTION, open_bins=DEFAULT_OPEN_BINS, seed=None):
+    """
+    Solve many small instances in a single call of the batch kernel (see solve_batch).
+
+    Parameters:
+    - instances (list): The bin width, bin height and array of items of each instance.
+    - seed (int): Seed of the first instance, None for a non reproducible run.
+    - The other parameters are those of solve_instance.
+
+    Returns:
+    - tuple: The result of each instance (BatchResult), the best id orderings and the placed items (SolutionRecord)
+             of all the instances, and the offsets of each instance in them (see solution_of_instance).
+
+    Raises:
+    - ValueError: If the options are invalid, an instance has no items or some items don't fit in their bin.
+    """
+
+    check_placement_engine(engine, guillotine_cut)
+    check_bin_selection(bin_selection, open_bins, engine)
+
+    items, offsets, bin_dimensions = pack_instances(instances)
+
+    if np.any(offsets[1:] == offsets[:-1]):
+        raise ValueError(f"Instance {int(np.argmax(offsets[1:] == offsets[:-1]))} has no items")
+
+    # Bin dimensions of each item
+    item_bins = np.repeat(bin_dimensions, np.diff(offsets), axis=0)
+    fits = (items['width'] <= item_bins[:, 0]) & (items['height'] <= item_bins[:, 1])
+    if rotation:
+        fits |= (items['height'] <= item_bins[:, 0]) & (items['width'] <= item_bins[:, 1])
+    if not np.all(fits):
+        instance = np.searchsorted(offsets, np.argmin(fits), side='right') - 1
+        raise ValueError(f"Some items of instance {instance} don't fit in a bin")
+
+    if seed is None:
+        seed = np.random.randint(2**31)
+
+    results, orderings, records = solve_batch(items, offsets, bin_dimensions, population_size, nb_generations,
+                                              crossover_rate, mutation_rate, kappa, delta, guillotine_cut, rotation,
+                                              engine, split_rule, bin_selection, open_bins, seed)
+
+    return results, orderings, records, offsets
+
+def solution_of_instance(records, offsets, index):
+    """
+    Returns:
+    - np.ndarray: The bins of the solution of an instance of a batch.
+    """
+    return records_to_solution(records[offsets[index]:offsets[index + 1]])
+
+def find_instance_files(paths):
+    """
+    Returns:
+    - list: The instance files given, and those of the directories given, sorted by name.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "*.bp2d")) + glob.glob(os.path.join(path, f"*{BINARY_INSTANCE_EXTENSION}")))
+        else:
+            files.append(path)
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m binpacking.batch",
+                                     description="Solve every instance of the given files and directories in a single parallel call.")
+    parser.add_argument("paths", nargs="+", help="instance files (.bp2d, possibly holding several instances, or .npz) or directories")
+    parser.add_argument("--generations", type=int, default=BATCH_GENERATIONS, help="0 only decodes the deterministic sequence")
+    parser.add_argument("--population", type=int, default=BATCH_POPULATION_SIZE)
+    parser.add_argument("--kappa", type=float, default=1.0)
+    parser.add_argument("--no-guillotine", action="store_true")
+    parser.add_argument("--no-rotation", action="store_true")
+    parser.add_argument("--engine", type=int, default=LGFI_ENGINE, help="one of the *_ENGINE constants")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="save the results, orderings, solution records and offsets to this .npz file")
+    arguments = parser.parse_args()
+
+    names, instances = [], []
+    for file in find_instance_files(arguments.paths):
+        for header, bin_width, bin_height, items in iter_instances_from_file(file):
+            names.append(header.get('NAME', os.path.basename(file)))
+            instances.append((bin_width, bin_height, items))
+
+    start = time.perf_counter()
+    results, orderings, records, offsets = solve_instances(instances, arguments.population, arguments.generations,
+                                                           kappa=arguments.kappa, guillotine_cut=not arguments.no_guillotine,
+                                                           rotation=not arguments.no_rotation, engine=arguments.engine,
+                                                           seed=arguments.seed)
+    elapsed = time.perf_counter() - start
+
+    gaps = results['nb_bins'] - results['lower_bound']
+    print(f"{len(instances)} instances ({len(records)} items) solved in {elapsed:.3f} seconds, "
+          f"{len(instances) / elapsed:.0f} instances per second")
+    print(f"Bins: {int(results['nb_bins'].sum())}, gap to the lower bounds: {int(gaps.sum())} "
+          f"({int(np.count_nonzero(gaps == 0))} instances at their lower bound)")
+
+    if arguments.output:
+        np.savez(arguments.output, names=np.array(names), results=results, orderings=orderings, records=records, offsets=offsets)
+        print(f"Results saved to: {arguments.output}")
+
+if __name__ == "__main__":
+    main()
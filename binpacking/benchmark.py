@@ -0,0 +1,397 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numba
+import numpy as np
+from numba import get_num_threads, set_num_threads
+
+from binpacking.structures import *
+from binpacking.data_manager import NumpyEncoder, load_items_from_file
+from binpacking.decoder import decode
+from binpacking.fitness import compute_bin_lower_bound, compute_fitnesses
+from binpacking.genetic_algo.gen_algo import genetic_algo
+from binpacking.instance_generator import INSTANCE_FAMILIES, generate_instance
+from binpacking.population_generation import generate_population, get_corresponding_sequence_by_id, set_seed
+from binpacking.tabu_search import tabu_search
+
+# Numbers of items of the generated instances, one of each family
+BENCHMARK_SIZES = (1000, 10000)
+# Decoding is quadratic in the number of items with first fit, the searches only run on the smaller instances
+SEARCH_MAX_ITEMS = 1000
+# The tabu search stores its solutions in MAX_ITEMS slots
+TABU_MAX_ITEMS = MAX_ITEMS
+# Each throughput is measured for at least this many seconds
+MIN_BENCHMARK_TIME = 1.0
+# The throughput is the best of this many rounds sharing that time, the slower rounds being disturbed by other processes
+BENCHMARK_ROUNDS = 3
+# Time given to the genetic algorithm to reach the target number of bins of an instance
+TIME_TO_TARGET_LIMIT = 5.0
+# Generations run between two points of a time to target curve
+TIME_TO_TARGET_CHUNK = 5
+
+POPULATION_SIZE = 16
+KAPPA = 2.0
+BENCHMARK_SEED = 0
+
+# A change of a metric by more than this fraction of its baseline is reported
+REGRESSION_TOLERANCE = 0.1
+# Changes of a time to target below this many seconds are noise, whatever their relative change
+TIME_RESOLUTION = 0.05
+
+def machine_description():
+    """
+    Returns:
+    - dict: The versions and CPU resources the benchmarks ran with, to tell if two runs are comparable.
+    """
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'numba': numba.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numba_threads': numba.config.NUMBA_NUM_THREADS,
+    }
+
+def load_benchmark_instances(data_directory="data", sizes=BENCHMARK_SIZES, families=INSTANCE_FAMILIES):
+    """
+    Load the instances of the data directory and generate one instance of each family and size.
+
+    Returns:
+    - list: The name, bin dimensions, items and target number of bins of each instance. The target is
+            the optimum of the perfect fit instances, else the bin count lower bound.
+    """
+    instances = []
+
+    if data_directory is not None:
+        for file in sorted(os.listdir(data_directory)):
+            if file.endswith(".bp2d"):
+                bin_width, bin_height, items = load_items_from_file(os.path.join(data_directory, file))
+                instances.append((file[:-len(".bp2d")], (bin_width, bin_height), items,
+                                  int(compute_bin_lower_bound(items, (bin_width, bin_height)))))
+
+    for family in families:
+        for nb_items in sizes:
+            header, bin_width, bin_height, items = generate_instance(family, nb_items, BENCHMARK_SEED)
+            target = header.get('OPTIMUM') or int(compute_bin_lower_bound(items, (bin_width, bin_height)))
+            instances.append((header['NAME'], (bin_width, bin_height), items, target))
+
+    return instances
+
+def measure(function, min_time, nb_rounds=BENCHMARK_ROUNDS):
+    """
+    Call a function repeatedly for at least min_time seconds, split into rounds, after a first call loading its kernels.
+
+    Returns:
+    - float: The number of calls per second of the fastest round.
+    """
+    function()
+
+    best = 0.0
+    for _ in range(nb_rounds):
+        nb_calls = 0
+        start = time.perf_counter()
+        while True:
+            function()
+            nb_calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time / nb_rounds:
+                break
+        best = max(best, nb_calls / elapsed)
+
+    return best
+
+def benchmark_decoding(items, bin_dimensions, min_time=MIN_BENCHMARK_TIME, engine=LGFI_ENGINE):
+    """
+    Measure the throughput of the placement engine on random orderings of the items.
+
+    Returns:
+    - dict: The decodes and items placed per second.
+    """
+    bin_width, bin_height = bin_dimensions
+    guillotine_cut = engine == LGFI_ENGINE
+
+    set_seed(BENCHMARK_SEED)
+    sequences = [get_corresponding_sequence_by_id(items, ordering) for ordering in generate_population(items, 4, KAPPA)]
+    calls = iter(range(sys.maxsize))
+
+    def decode_next():
+        decode(sequences[next(calls) % len(sequences)], bin_width, bin_height, guillotine_cut, True, engine,
+               SHORTER_LEFTOVER_SPLIT, FIRST_FIT_SELECTION, 1)
+
+    decodes_per_second = measure(decode_next, min_time)
+
+    return {'decodes_per_second': decodes_per_second, 'items_per_second': decodes_per_second * len(items)}
+
+def benchmark_fitnesses(items, bin_dimensions, thread_counts, min_time=MIN_BENCHMARK_TIME):
+    """
+    Measure the throughput of compute_fitnesses on a population of POPULATION_SIZE orderings, for each number of threads.
+
+    Returns:
+    - dict: The orderings evaluated per second, by number of threads.
+    """
+    set_seed(BENCHMARK_SEED)
+    population = generate_population(items, POPULATION_SIZE, KAPPA)
+    threads = get_num_threads()
+
+    results = {}
+    try:
+        for nb_threads in thread_counts:
+            set_num_threads(nb_threads)
+            evaluations = measure(lambda: compute_fitnesses(population, items, bin_dimensions, True, True, LGFI_ENGINE,
+                                                            SHORTER_LEFTOVER_SPLIT, FIRST_FIT_SELECTION, 1), min_time)
+            results[str(nb_threads)] = evaluations * POPULATION_SIZE
+    finally:
+        set_num_threads(threads)
+
+    return results
+
+def steps_per_second(run, min_time):
+    """
+    Measure the rate of the steps (generations, iterations) of a metaheuristic, without its setup: a run of one step
+    is subtracted from a run of enough steps to last about min_time seconds.
+
+    Parameters:
+    - run (callable): Runs the metaheuristic for the given number of steps.
+
+    Returns:
+    - float: The number of steps per second.
+    """
+    run(1)
+
+    start = time.perf_counter()
+    run(1)
+    single = time.perf_counter() - start
+
+    nb_steps = int(np.clip(min_time / max(single, 1e-6), 2, 10000))
+    start = time.perf_counter()
+    run(nb_steps + 1)
+    elapsed = time.perf_counter() - start
+
+    return nb_steps / max(elapsed - single, 1e-9)
+
+def benchmark_genetic_algo(items, bin_dimensions, min_time=MIN_BENCHMARK_TIME):
+    """
+    Returns:
+    - dict: The generations per second of the genetic algorithm, with a population of POPULATION_SIZE.
+    """
+    def run(nb_generations):
+        genetic_algo(items, bin_dimensions, POPULATION_SIZE, nb_generations, 0.7, 0.3, KAPPA, 1.0, True, True,
+                     seed=BENCHMARK_SEED)
+
+    return {'generations_per_second': steps_per_second(run, min_time)}
+
+def benchmark_tabu_search(items, bin_dimensions, min_time=MIN_BENCHMARK_TIME):
+    """
+    Returns:
+    - dict: The iterations per second of the tabu search.
+    """
+    def run(nb_iterations):
+        tabu_search(items, bin_dimensions, nb_iterations, min(10, 3 * len(items) - 1), KAPPA, True, True, seed=BENCHMARK_SEED)
+
+    return {'iterations_per_second': steps_per_second(run, min_time)}
+
+def time_to_target(items, bin_dimensions, target, time_limit=TIME_TO_TARGET_LIMIT):
+    """
+    Run the genetic algorithm by chunks of TIME_TO_TARGET_CHUNK generations, each one starting from the best
+    ordering of the previous one, until it reaches the target number of bins or the time limit.
+
+    Returns:
+    - dict: The curve of the best number of bins found over time (seconds, number of bins), the time to reach
+            the target (None if it wasn't reached) and the final number of bins.
+    """
+    curve = []
+    best_solution, best_fitness = None, np.inf
+    time_to_reach = None
+
+    start = time.perf_counter()
+    for chunk in range(sys.maxsize):
+        solution, fitness = genetic_algo(items, bin_dimensions, POPULATION_SIZE, TIME_TO_TARGET_CHUNK, 0.7, 0.3, KAPPA, 1.0,
+                                         True, True, seed=BENCHMARK_SEED + chunk, initial_solutions=best_solution)
+        elapsed = time.perf_counter() - start
+
+        if fitness < best_fitness:
+            best_solution, best_fitness = solution.copy(), fitness
+            # The fitness is the number of bins plus a tie breaker below 1
+            if not curve or int(best_fitness) < curve[-1][1]:
+                curve.append((elapsed, int(best_fitness)))
+
+        if int(best_fitness) <= target:
+            time_to_reach = elapsed
+            break
+        if elapsed >= time_limit:
+            break
+
+    return {'target': target, 'time_to_target': time_to_reach, 'final_bins': int(best_fitness), 'curve': curve}
+
+def run_benchmarks(instances, min_time=MIN_BENCHMARK_TIME, thread_counts=None, time_limit=TIME_TO_TARGET_LIMIT, verbose=True):
+    """
+    Run every benchmark on the instances it is suited to.
+
+    - decoding: every instance.
+    - fitnesses, genetic_algo, time_to_target: the instances of at most SEARCH_MAX_ITEMS items.
+    - tabu_search: the instances of at most TABU_MAX_ITEMS items.
+
+    Parameters:
+    - instances (list): The instances (see load_benchmark_instances).
+    - min_time (float): Minimal duration of each throughput measurement, in seconds.
+    - thread_counts (tuple): Numbers of threads of the fitnesses benchmark, by default the powers of two up to
+                             the number of threads of Numba.
+    - time_limit (float): Time limit of each time to target run, in seconds.
+    - verbose (bool): Print the progress.
+
+    Returns:
+    - dict: The machine description and the results of each benchmark, by instance.
+    """
+
+    if thread_counts is None:
+        thread_counts = sorted({min(2 ** k, numba.config.NUMBA_NUM_THREADS)
+                                for k in range(int(np.log2(numba.config.NUMBA_NUM_THREADS)) + 2)})
+
+    results = {'machine': machine_description(), 'date': time.strftime("%Y-%m-%d %H:%M:%S"),
+               'decoding': {}, 'fitnesses': {}, 'genetic_algo': {}, 'tabu_search': {}, 'time_to_target': {}}
+
+    for name, bin_dimensions, items, target in instances:
+        if verbose:
+            print(f"{name} ({len(items)} items)", flush=True)
+
+        results['decoding'][name] = benchmark_decoding(items, bin_dimensions, min_time)
+
+        if len(items) <= SEARCH_MAX_ITEMS:
+            results['fitnesses'][name] = benchmark_fitnesses(items, bin_dimensions, thread_counts, min_time)
+            results['genetic_algo'][name] = benchmark_genetic_algo(items, bin_dimensions, min_time)
+            results['time_to_target'][name] = time_to_target(items, bin_dimensions, target, time_limit)
+
+        if len(items) <= TABU_MAX_ITEMS:
+            results['tabu_search'][name] = benchmark_tabu_search(items, bin_dimensions, min_time)
+
+    return results
+
+def flatten_metrics(results):
+    """
+    Returns:
+    - dict: The scalar metrics of benchmark results, by "benchmark/instance/metric" key.
+    """
+    metrics = {}
+    for benchmark, by_instance in results.items():
+        if benchmark in ('machine', 'date'):
+            continue
+        for instance, values in by_instance.items():
+            for metric, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    key = f"{benchmark}/{instance}/{metric}" if benchmark != 'fitnesses' else f"{benchmark}/{instance}/{metric}_threads"
+                    metrics[key] = value
+
+    return metrics
+
+def compare_benchmarks(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """
+    Compare benchmark results to a baseline. Throughputs ("per_second" metrics, and the fitnesses by number of
+    threads) should be higher, times to target and final numbers of bins lower.
+
+    Parameters:
+    - results (dict): The benchmark results.
+    - baseline (dict): The baseline results.
+    - tolerance (float): The relative change of a metric considered as noise.
+
+    Returns:
+    - tuple: The regressions and the improvements, as (key, baseline value, value, relative change) tuples.
+    """
+    current, reference = flatten_metrics(results), flatten_metrics(baseline)
+    regressions, improvements = [], []
+
+    for key in sorted(set(current) & set(reference)):
+        value, baseline_value = current[key], reference[key]
+        if key.endswith('/target') or baseline_value == 0:
+            continue
+
+        change = (value - baseline_value) / abs(baseline_value)
+        higher_is_better = key.endswith('per_second') or key.endswith('_threads')
+        if key.endswith('/final_bins'):
+            # A single bin more is a regression
+            worse, better = value > baseline_value, value < baseline_value
+        elif key.endswith('/time_to_target') and abs(value - baseline_value) < TIME_RESOLUTION:
+            continue
+        else:
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            better = change > tolerance if higher_is_better else change < -tolerance
+
+        if worse:
+            regressions.append((key, baseline_value, value, change))
+        elif better:
+            improvements.append((key, baseline_value, value, change))
+
+    # A target reached in the baseline but not anymore
+    for name, values in baseline.get('time_to_target', {}).items():
+        if values['time_to_target'] is not None and results.get('time_to_target', {}).get(name, {}).get('time_to_target', 0) is None:
+            regressions.append((f"time_to_target/{name}/time_to_target", values['time_to_target'], None, np.inf))
+
+    return regressions, improvements
+
+def print_benchmark_summary(results):
+    """
+    Print the main metric of each benchmark for each instance.
+    """
+    print(f"{'Instance':<24} {'Decodes/s':>10} {'Items/s':>11} {'Fitnesses/s':>20} {'Gen/s':>8} {'Iter/s':>8} {'Target':>7} {'Reached':>9}")
+
+    for name, decoding in results['decoding'].items():
+        fitnesses = results['fitnesses'].get(name)
+        genetic = results['genetic_algo'].get(name)
+        tabu = results['tabu_search'].get(name)
+        target = results['time_to_target'].get(name)
+
+        fitnesses_text = " ".join(f"{threads}:{value:.0f}" for threads, value in fitnesses.items()) if fitnesses else "-"
+        if target is None:
+            reached = "-"
+        elif target['time_to_target'] is None:
+            reached = f"no ({target['final_bins']})"
+        else:
+            reached = f"{target['time_to_target']:.2f}s"
+        print(f"{name:<24} {decoding['decodes_per_second']:>10.1f} {decoding['items_per_second']:>11.0f} {fitnesses_text:>20} "
+              f"{genetic['generations_per_second'] if genetic else float('nan'):>8.1f} "
+              f"{tabu['iterations_per_second'] if tabu else float('nan'):>8.1f} "
+              f"{target['target'] if target else '-':>7} {reached:>9}")
+
+def print_comparison(regressions, improvements):
+    for title, changes in (("Regressions", regressions), ("Improvements", improvements)):
+        print(f"\n{title}: {len(changes)}")
+        for key, baseline_value, value, change in changes:
+            print(f"  {key}: {baseline_value} -> {value} ({change:+.1%})")
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m binpacking.benchmark",
+                                     description="Benchmark the decoders and metaheuristics, and compare to a baseline.")
+    parser.add_argument("--data", default="data", help="directory of the .bp2d instances")
+    parser.add_argument("--sizes", nargs="+", type=int, default=BENCHMARK_SIZES, help="numbers of items of the generated instances")
+    parser.add_argument("--min-time", type=float, default=MIN_BENCHMARK_TIME, help="seconds of each throughput measurement")
+    parser.add_argument("--time-limit", type=float, default=TIME_TO_TARGET_LIMIT, help="seconds of each time to target run")
+    parser.add_argument("--output", help="JSON file of the results")
+    parser.add_argument("--baseline", help="JSON file of the baseline results, exits with 1 if a metric regressed")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    arguments = parser.parse_args()
+
+    instances = load_benchmark_instances(arguments.data, arguments.sizes)
+    results = run_benchmarks(instances, arguments.min_time, time_limit=arguments.time_limit)
+    print_benchmark_summary(results)
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, cls=NumpyEncoder, indent=2)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+        if baseline.get('machine') != results['machine']:
+            print("\nWarning: the baseline ran on another machine or with other versions")
+
+        regressions, improvements = compare_benchmarks(results, baseline, arguments.tolerance)
+        print_comparison(regressions, improvements)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+from typing import Tuple
+from binpacking.structures import *
+
+@njit(UniTuple(int32, 2)(int32, int32, int32), cache = True)
+def get_candidate_bins(bin_count: int, bin_selection: int, open_bins: int) -> Tuple[int, int]:
+    """
+    Get the positions, in the bin order, of the bins that may receive the next item.
+
+    Parameters:
+    - bin_count (int): Number of bins created so far.
+    - bin_selection (int): FIRST_FIT_SELECTION, BEST_FIT_SELECTION or LAST_K_SELECTION.
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+
+    Returns:
+    - (int): First position to try.
+    - (int): End of the positions to try (excluded).
+    """
+
+    # Only the last open_bins bins are open, the older ones are closed for good
+    if bin_selection == LAST_K_SELECTION and bin_count > open_bins:
+        return bin_count - open_bins, bin_count
+
+    return 0, bin_count
+
+@njit(void(int32[:], int64[:], int32, int64), cache = True)
+def update_best_fit_order(bin_order: np.ndarray, residual_areas: np.ndarray, position: int, placed_area: int) -> None:
+    """
+    Update the bin order of the Best Fit policy after placing an item.
+
+    The bin order is kept sorted by increasing residual area, then by bin index. Placing an item only
+    decreases the residual area of its bin, so the bin moves towards the front of the order.
+    A new bin has the largest residual area and index, so it is added at the end without any update.
+
+    Parameters:
+    - bin_order (np.ndarray): The bin indices, in the order they are tried.
+    - residual_areas (np.ndarray): The free area of each bin.
+    - position (int): Position of the bin receiving the item in the bin order.
+    - placed_area (int): Area of the placed item.
+    """
+
+    bin_idx = bin_order[position]
+    residual_areas[bin_idx] -= placed_area
+    residual = residual_areas[bin_idx]
+
+    while position > 0:
+        previous_idx = bin_order[position - 1]
+        if residual_areas[previous_idx] < residual or \
+           (residual_areas[previous_idx] == residual and previous_idx < bin_idx):
+            break
+
+        bin_order[position] = previous_idx
+        position -= 1
+
+    bin_order[position] = bin_idx
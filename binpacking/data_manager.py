@@ -1,7 +1,18 @@
+import hashlib
 import json
+import mmap
+import os
+import re
+import tempfile
+import warnings
 from binpacking.structures import *
 import numpy as np
 
+# Extension of the binary instance files, the other instance files are .bp2d text files
+BINARY_INSTANCE_EXTENSION = ".npz"
+# Start of a header line ("KEY: value"), item lines start with a digit
+HEADER_LINE = re.compile(rb'^[ \t]*[A-Za-z_]', re.MULTILINE)
+
 class NumpyEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, np.integer):
@@ -13,43 +24,230 @@ class NumpyEncoder(json.JSONEncoder):
         return json.JSONEncoder.default(self, obj)
 
 
+def create_items(ids, widths, heights):
+    """
+    Create the array of items of an instance at once, as create_item would for each of them.
+
+    Parameters:
+    - ids (np.ndarray): The IDs of the items.
+    - widths (np.ndarray): The widths of the items.
+    - heights (np.ndarray): The heights of the items.
+
+    Returns:
+    - np.ndarray: The array of items.
+    """
+    items = np.zeros(len(ids), dtype=Item)
+    
+    items['id'] = ids
+    items['width'] = widths
+    items['height'] = heights
+    items['rotated'] = False
+    items['corner_x'] = -1
+    items['corner_y'] = -1
+    
+    return items
+
+def parse_item_table(table, nb_items=None, name=""):
+    """
+    Parse the "id width height" lines of an instance in a single pass.
+
+    Parameters:
+    - table (bytes): The item table.
+    - nb_items (int): The number of items announced by the header, None if it doesn't give it.
+    - name (str): Name of the instance, for the error messages.
+
+    Returns:
+    - np.ndarray: The array of items.
+    """
+    try:
+        with warnings.catch_warnings():
+            # Older NumPy versions only warn and stop at the first invalid value, caught by the size checks below
+            warnings.simplefilter("ignore", DeprecationWarning)
+            values = np.fromstring(table, dtype=np.int64, sep=' ')
+    except ValueError:
+        raise ValueError(f"{name}: the item table has invalid values") from None
+    
+    if nb_items is None:
+        nb_items = sum(1 for line in table.splitlines() if line.strip())
+    
+    if len(values) != 3 * nb_items:
+        raise ValueError(f"{name}: expected {nb_items} items of 3 values, the item table is invalid "
+                         f"or has {len(values) / 3:g} items")
+    
+    values = values.reshape(nb_items, 3)
+    check_item_values(values[:, 0], values[:, 1], values[:, 2], name)
+    
+    return create_items(values[:, 0], values[:, 1], values[:, 2])
+
+def check_item_values(ids, widths, heights, name=""):
+    """
+    Check that the item IDs and dimensions read from an instance file are positive, and the IDs unique.
+
+    Raises:
+    - ValueError: If they aren't.
+    """
+    if np.any(ids < 1) or np.any(widths < 1) or np.any(heights < 1):
+        raise ValueError(f"{name}: item IDs and dimensions must be positive")
+    sorted_ids = np.sort(ids)
+    if np.any(sorted_ids[1:] == sorted_ids[:-1]):
+        raise ValueError(f"{name}: item IDs must be unique")
+
+def iter_instances_from_file(filename):
+    """
+    Read the instances of a .bp2d file one after the other.
+    
+    A file holds one instance or a stream of instances written one after the other, each one being a header
+    ("KEY: value" lines, ending with the "ITEMS" line) followed by its item table. The file is memory mapped
+    and each item table is parsed in a single pass, so only the current instance is held in memory.
+
+    Parameters:
+    - filename (str): The path to the file.
+
+    A binary instance file (BINARY_INSTANCE_EXTENSION) holds a single instance.
+
+    Yields:
+    - tuple: The header (dict of strings), bin width, bin height and array of items of each instance.
+    """
+    if filename.endswith(BINARY_INSTANCE_EXTENSION):
+        yield load_instance_from_binary(filename)
+        return
+    
+    if os.path.getsize(filename) == 0:
+        return
+    
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        position = 0
+        
+        while position < len(data):
+            header = {}
+            table_start = -1
+            
+            # Header lines, up to the line announcing the item table
+            while position < len(data):
+                line_end = data.find(b'\n', position)
+                line_end = len(data) if line_end == -1 else line_end
+                line = data[position:line_end].strip()
+                position = line_end + 1
+                
+                if line.startswith(b'ITEMS'):
+                    table_start = position
+                    break
+                if line:
+                    key, _, value = line.partition(b':')
+                    header[key.strip().decode()] = value.strip().decode()
+            
+            if table_start == -1:
+                if header:
+                    raise ValueError(f"{filename}: missing item table after {header}")
+                return
+            
+            # The item table ends with the header of the next instance
+            next_header = HEADER_LINE.search(data, table_start)
+            position = len(data) if next_header is None else next_header.start()
+            
+            name = f"{filename}: {header.get('NAME', 'instance')}"
+            if 'BIN_WIDTH' not in header or 'BIN_HEIGHT' not in header:
+                raise ValueError(f"{name}: missing BIN_WIDTH or BIN_HEIGHT")
+            
+            nb_items = int(header['NB_ITEMS']) if 'NB_ITEMS' in header else None
+            items = parse_item_table(data[table_start:position], nb_items, name)
+            
+            yield header, int(header['BIN_WIDTH']), int(header['BIN_HEIGHT']), items
+
 def load_items_from_file(filename):
-    with open(filename, 'r') as file:
-        lines = file.readlines()
-
-    # Variables to hold your parsed data
-    bin_width = 0
-    bin_height = 0
-    items = []
-
-    # Process lines
-    for line in lines:
-        if line.startswith('BIN_WIDTH'):
-            bin_width = int(line.split(':')[1].strip())
-        elif line.startswith('BIN_HEIGHT'):
-            bin_height = int(line.split(':')[1].strip())
-        elif line.startswith('ITEMS'):
-            continue
-        else:
-            parts = line.split()
-            if len(parts) == 3:
-                item_id = int(parts[0])
-                width = int(parts[1])
-                height = int(parts[2])
-                items.append(create_item(item_id, width, height))
-
-    items_array = np.array(items, dtype=Item)
-
-    return bin_width, bin_height, items_array
+    """
+    Load the single instance of a .bp2d file.
+
+    Parameters:
+    - filename (str): The path to the file.
+
+    Returns:
+    - tuple: The bin width, bin height and array of items.
+    """
+    instances = iter_instances_from_file(filename)
+    
+    instance = next(instances, None)
+    if instance is None:
+        raise ValueError(f"{filename}: no instance found")
+    if next(instances, None) is not None:
+        raise ValueError(f"{filename}: the file holds several instances, read them with iter_instances_from_file")
+    
+    _, bin_width, bin_height, items = instance
+    
+    return bin_width, bin_height, items
+
+def export_instance(items, bin_width, bin_height, file_path, header=None):
+    """
+    Export an instance to a .bp2d file.
+
+    Parameters:
+    - items (np.ndarray): The items of the instance.
+    - bin_width (int): The width of the bins.
+    - bin_height (int): The height of the bins.
+    - file_path (str): The path to the output file.
+    - header (dict): Other header lines ("KEY: value"), written before NB_ITEMS, like NAME or COMMENT.
+    """
+    header = dict(header or {})
+    header.update({'NB_ITEMS': len(items), 'BIN_WIDTH': bin_width, 'BIN_HEIGHT': bin_height})
+    
+    table = np.column_stack((items['id'], items['width'], items['height']))
+    
+    with open(file_path, 'w') as file:
+        file.writelines(f"{key}: {value}\n" for key, value in header.items())
+        file.write("\nITEMS [id width height]:\n")
+        np.savetxt(file, table, fmt='%d')
+
+def export_instance_to_binary(items, bin_width, bin_height, file_path, header=None):
+    """
+    Export an instance to a binary file (BINARY_INSTANCE_EXTENSION), much faster to read than a .bp2d file for
+    large instances.
+
+    Parameters:
+    - items (np.ndarray): The items of the instance.
+    - bin_width (int): The width of the bins.
+    - bin_height (int): The height of the bins.
+    - file_path (str): The path to the output file.
+    - header (dict): Other header lines, like NAME or COMMENT.
+    """
+    with open(file_path, 'wb') as file:
+        np.savez(file, header=np.array(json.dumps(header or {}, cls=NumpyEncoder)),
+                 bin_dimensions=np.array([bin_width, bin_height], dtype=np.int64),
+                 ids=items['id'], widths=items['width'], heights=items['height'])
+
+def load_instance_from_binary(file_path):
+    """
+    Load an instance from a binary file written by export_instance_to_binary.
+
+    Parameters:
+    - file_path (str): The path to the file.
+
+    Returns:
+    - tuple: The header (dict of strings), bin width, bin height and array of items.
+    """
+    try:
+        with np.load(file_path, allow_pickle=False) as data:
+            header = {key: str(value) for key, value in json.loads(str(data['header'])).items()}
+            bin_width, bin_height = (int(value) for value in data['bin_dimensions'])
+            ids, widths, heights = data['ids'], data['widths'], data['heights']
+    except (KeyError, ValueError) as error:
+        raise ValueError(f"{file_path}: not an instance file ({error})") from None
+    
+    if not len(ids) == len(widths) == len(heights):
+        raise ValueError(f"{file_path}: the item columns have different lengths")
+    check_item_values(ids, widths, heights, file_path)
+    
+    return header, bin_width, bin_height, create_items(ids, widths, heights)
 
 # Assuming your bins and items are structured using numpy's structured arrays
-def export_solutions_to_json(bins, file_path):
+def solution_to_json(bins):
     """
-    Exports a list of bins and their contents to a JSON file.
+    Convert a list of bins and their contents into the JSON data written by export_solutions_to_json.
 
     Parameters:
     - bins (list): A list of structured numpy arrays, where each array represents a bin with items.
-    - file_path (str): The path to the output JSON file.
+
+    Returns:
+    - list: One dictionary per bin, holding the list of its items (encode it with NumpyEncoder).
     """
     data_to_export = []
 
@@ -77,33 +275,235 @@ def export_solutions_to_json(bins, file_path):
         
         data_to_export.append(bin_info)
 
+    return data_to_export
+
+def export_solutions_to_json(bins, file_path):
+    """
+    Exports a list of bins and their contents to a JSON file.
+
+    Parameters:
+    - bins (list): A list of structured numpy arrays, where each array represents a bin with items.
+    - file_path (str): The path to the output JSON file.
+    """
+    data_to_export = solution_to_json(bins)
+
     # Write data to a JSON file
     with open(file_path, 'w') as f:
         json.dump(data_to_export, f, cls=NumpyEncoder, indent=4)
         
 
 def import_solution_from_json(file_path):
+    """
+    Import the bins of a solution from a JSON file written by export_solutions_to_json.
+
+    Parameters:
+    - file_path (str): The path to the JSON file.
+
+    Returns:
+    - list: The bins of the solution.
+    """
     
     with open(file_path, 'r') as file:
         data = json.load(file)
 
-    bins = []
-    for bin_data in data:
-        bin_id = bin_data['id']
-        bin_width = bin_data['width']
-        bin_height = bin_data['height']
-        
-        bin_obj = create_bin(bin_id=bin_id,
-                             width=bin_width,
-                             height=bin_height)
-        
-        for item_data in bin_data['items']:
-            item = create_item(item_data['id'],
-                               item_data['width'],
-                               item_data['height'])
-            
-            add_item_to_bin(bin_obj, item, item_data['corner_x'], item_data['corner_y'])
-        
-        bins.append(bin_obj)
+    records = np.array([(bin_data['id'], bin_data['width'], bin_data['height'], 
+                         item_data['id'], item_data['width'], item_data['height'], item_data.get('rotated', False), 
+                         item_data['corner_x'], item_data['corner_y'])
+                        for bin_data in data for item_data in bin_data['items']], dtype=SolutionRecord)
+
+    return list(records_to_solution(records))
+
+def solution_to_records(bins):
+    """
+    Flatten the bins of a solution into one record per placed item, in bin order.
+
+    Parameters:
+    - bins (np.ndarray): The bins of the solution (or a list of bins).
+
+    Returns:
+    - np.ndarray: The SolutionRecord array.
+    """
+    bins = np.asarray(bins, dtype=Bin)
+    
+    placed = bins['items']['width'] > 0
+    bin_index, _ = np.nonzero(placed)
+    items = bins['items'][placed]
+    
+    records = np.empty(len(items), dtype=SolutionRecord)
+    records['bin_id'] = bins['id'][bin_index]
+    records['bin_width'] = bins['width'][bin_index]
+    records['bin_height'] = bins['height'][bin_index]
+    for field in ('id', 'width', 'height', 'rotated', 'corner_x', 'corner_y'):
+        records[field] = items[field]
+    
+    return records
+
+def records_to_solution(records):
+    """
+    Rebuild the bins of a solution from its records, as import_solution_from_json would.
 
+    Parameters:
+    - records (np.ndarray): The SolutionRecord array.
+
+    Returns:
+    - np.ndarray: The bins of the solution.
+    """
+    nb_records = len(records)
+    bin_ids = np.asarray(records['bin_id'])
+    
+    # The records of a bin must be contiguous
+    if nb_records > 1 and np.any(bin_ids[1:] < bin_ids[:-1]):
+        records = records[np.argsort(bin_ids, kind='stable')]
+        bin_ids = np.asarray(records['bin_id'])
+    
+    starts = np.flatnonzero(np.r_[True, bin_ids[1:] != bin_ids[:-1]]) if nb_records else np.zeros(0, dtype=np.int64)
+    counts = np.diff(np.r_[starts, nb_records])
+    if nb_records and counts.max() > MAX_ITEMS:
+        raise ValueError(f"A bin holds more than {MAX_ITEMS} items")
+    
+    bins = np.zeros(len(starts), dtype=Bin)
+    bins['id'] = bin_ids[starts]
+    bins['width'] = records['bin_width'][starts]
+    bins['height'] = records['bin_height'][starts]
+    bins['list_of_free_rec']['width'][:, 0] = bins['width']
+    bins['list_of_free_rec']['height'][:, 0] = bins['height']
+    
+    # Position of each record in its bin
+    bin_index = np.repeat(np.arange(len(starts)), counts)
+    slot = np.arange(nb_records) - np.repeat(starts, counts)
+    for field in ('id', 'width', 'height', 'rotated', 'corner_x', 'corner_y'):
+        bins['items'][field][bin_index, slot] = records[field]
+    
     return bins
+
+def export_solution_to_binary(bins, file_path):
+    """
+    Export the bins of a solution to a .npy file, holding one SolutionRecord per placed item.
+
+    Parameters:
+    - bins (np.ndarray): The bins of the solution (or a list of bins).
+    - file_path (str): The path to the output file.
+    """
+    with open(file_path, 'wb') as file:
+        np.save(file, solution_to_records(bins), allow_pickle=False)
+
+def load_solution_records(file_path):
+    """
+    Memory map the records of a binary solution file, for reports which don't need the bins.
+
+    Parameters:
+    - file_path (str): The path to the .npy file.
+
+    Returns:
+    - np.ndarray: The read-only SolutionRecord array.
+    """
+    records = np.load(file_path, mmap_mode='r', allow_pickle=False)
+    
+    if records.dtype != SolutionRecord:
+        raise ValueError(f"{file_path}: not a solution file")
+    
+    return records
+
+def import_solution_from_binary(file_path):
+    """
+    Import the bins of a solution from a .npy file.
+
+    Parameters:
+    - file_path (str): The path to the .npy file.
+
+    Returns:
+    - np.ndarray: The bins of the solution.
+    """
+    return records_to_solution(load_solution_records(file_path))
+
+def export_solution(bins, file_path):
+    """
+    Export the bins of a solution, in binary for a .npy file and in JSON otherwise.
+    """
+    if file_path.endswith('.npy'):
+        export_solution_to_binary(bins, file_path)
+    else:
+        export_solutions_to_json(bins, file_path)
+
+def import_solution(file_path):
+    """
+    Import the bins of a solution, from binary for a .npy file (an array of bins) and from JSON otherwise (a list
+    of bins, see import_solution_from_json).
+    """
+    if file_path.endswith('.npy'):
+        return import_solution_from_binary(file_path)
+    return import_solution_from_json(file_path)
+
+def get_solution_records(solution):
+    """
+    Get the records of a solution given as a file, bins or records.
+
+    Parameters:
+    - solution (str | np.ndarray): The path of a solution file (JSON or binary), the bins of a solution or its records.
+
+    Returns:
+    - np.ndarray: The SolutionRecord array, memory mapped for a binary file.
+    """
+    if isinstance(solution, str):
+        return load_solution_records(solution) if solution.endswith('.npy') else solution_to_records(import_solution(solution))
+    if np.asarray(solution).dtype == SolutionRecord:
+        return np.asarray(solution)
+    return solution_to_records(solution)
+
+def compute_file_hash(file_path):
+    """
+    Compute the SHA-256 hash of the content of a file.
+
+    Parameters:
+    - file_path (str): The path to the file.
+
+    Returns:
+    - str: The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    
+    return digest.hexdigest()
+
+def load_manifest(file_path):
+    """
+    Load the manifest of a batch of solved instances.
+
+    Parameters:
+    - file_path (str): The path to the manifest file.
+
+    Returns:
+    - dict: The solved jobs, by job key. Empty if the manifest doesn't exist or can't be read.
+    """
+    try:
+        with open(file_path, 'r') as file:
+            return json.load(file)['jobs']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+def save_manifest(jobs, file_path):
+    """
+    Save the manifest of a batch of solved instances.
+    
+    The manifest is written to a temporary file which then replaces the previous one, 
+    so that a crash never leaves a partially written manifest.
+
+    Parameters:
+    - jobs (dict): The solved jobs, by job key.
+    - file_path (str): The path to the manifest file.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    
+    try:
+        with os.fdopen(file_descriptor, 'w') as file:
+            json.dump({'version': 1, 'jobs': jobs}, file, cls=NumpyEncoder, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, file_path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
@@ -0,0 +1,74 @@
+from binpacking.structures import *
+
+from binpacking.lgfi import lgfi
+from binpacking.maxrects import maxrects
+from binpacking.skyline import skyline
+
+@njit(from_dtype(Bin)[:](from_dtype(Item)[:], int32, int32, boolean, boolean, int32, int32, int32, int32), cache = True)
+def decode(items: np.ndarray, bin_width: int, bin_height: int, guillotine_cut: bool, rotation: bool,
+           engine: int, split_rule: int, bin_selection: int, open_bins: int) -> np.ndarray:
+    """
+    Pack an ordered sequence of items into bins with the selected placement engine.
+
+    Parameters:
+    - items (np.ndarray): Array of items to be packed, in placement order.
+    - bin_width (int): The width of each new bin.
+    - bin_height (int): The height of each new bin.
+    - guillotine_cut (bool): Should the guillotine cut rule be applied. Only LGFI supports it.
+    - rotation (bool): Should the items be able to rotate
+    - engine (int): LGFI_ENGINE, SKYLINE_ENGINE or MAXRECTS_ENGINE.
+    - split_rule (int): The rule deciding the orientation of the guillotine cuts of LGFI (one of the *_SPLIT constants).
+    - bin_selection (int): The policy choosing the bin receiving the next item (one of the *_SELECTION constants).
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+
+    Returns:
+    - np.ndarray: The bins containing the packed items.
+    """
+
+    if engine == LGFI_ENGINE:
+        return lgfi(items, bin_width, bin_height, guillotine_cut, rotation, split_rule, bin_selection, open_bins)
+
+    if guillotine_cut:
+        raise ValueError("Only the LGFI engine supports the guillotine cut rule")
+
+    if engine == SKYLINE_ENGINE:
+        return skyline(items, bin_width, bin_height, rotation, bin_selection, open_bins)
+    if engine == MAXRECTS_ENGINE:
+        return maxrects(items, bin_width, bin_height, rotation, bin_selection, open_bins)
+
+    raise ValueError("Unknown placement engine")
+
+def check_placement_engine(engine: int, guillotine_cut: bool) -> None:
+    """
+    Check that the placement engine exists and supports the requested options before starting a search.
+
+    Parameters:
+    - engine (int): LGFI_ENGINE, SKYLINE_ENGINE or MAXRECTS_ENGINE.
+    - guillotine_cut (bool): Should the guillotine cut rule be applied.
+    """
+    
+    if engine not in (LGFI_ENGINE, SKYLINE_ENGINE, MAXRECTS_ENGINE):
+        raise ValueError(f"Unknown placement engine: {engine}")
+    if guillotine_cut and engine != LGFI_ENGINE:
+        raise ValueError("Only the LGFI engine supports the guillotine cut rule")
+
+def check_bin_selection(bin_selection: int, open_bins: int, engine: int) -> None:
+    """
+    Check that the bin selection policy exists, is supported by the placement engine and has a valid number of
+    open bins before starting a search.
+
+    LGFI only opens a new bin once no item fits in the previous ones, so only its last bin ever receives items
+    and Best Fit would pack like First Fit.
+
+    Parameters:
+    - bin_selection (int): FIRST_FIT_SELECTION, BEST_FIT_SELECTION or LAST_K_SELECTION.
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+    - engine (int): LGFI_ENGINE, SKYLINE_ENGINE or MAXRECTS_ENGINE.
+    """
+    
+    if bin_selection not in (FIRST_FIT_SELECTION, BEST_FIT_SELECTION, LAST_K_SELECTION):
+        raise ValueError(f"Unknown bin selection policy: {bin_selection}")
+    if bin_selection == BEST_FIT_SELECTION and engine == LGFI_ENGINE:
+        raise ValueError("The LGFI engine doesn't support the Best Fit bin selection, it always fills its last bin")
+    if bin_selection == LAST_K_SELECTION and open_bins < 1:
+        raise ValueError("At least one bin must be kept open")
@@ -1,9 +1,10 @@
 from typing import Tuple
 from binpacking.structures import *
 
-from numba import prange
+from numba import get_thread_id, prange
 
-from binpacking.lgfi import lgfi
+from binpacking.decoder import decode
+from binpacking.lgfi import lgfi_with_counters
 from binpacking.population_generation import get_corresponding_sequence_by_id
 
 @njit(float64(from_dtype(Bin)), cache = True)
@@ -28,9 +29,56 @@ def calculate_bin_fill(bin: np.ndarray) -> int:
         
     return total_fill / (bin['width']*bin['height'])
 
-@njit(float64(from_dtype(Item)[:], int32[:], UniTuple(int32, 2), boolean, boolean), cache = True)
+@njit(int32(from_dtype(Item)[:], UniTuple(int32, 2)), cache = True)
+def compute_bin_lower_bound(items: np.ndarray, bin_dimensions: Tuple[int, int]) -> int:
+    """
+    Compute the continuous lower bound on the number of bins: ceil(sum of item areas / bin area).
+
+    Parameters:
+    - items (np.ndarray): An array of items to be packed.
+    - bin_dimensions (tuple): Tuple containing the width and height of the bin.
+
+    Returns:
+    - int: No packing of these items can use fewer bins than this.
+    """
+    
+    bin_width, bin_height = bin_dimensions
+    total_area = np.int64(0)
+    for i in range(len(items)):
+        total_area += np.int64(items[i]['width']) * np.int64(items[i]['height'])
+    
+    bin_area = np.int64(bin_width) * np.int64(bin_height)
+    
+    return np.int32((total_area + bin_area - 1) // bin_area)
+
+@njit(float64(from_dtype(Bin)[:]), cache = True)
+def compute_bins_fitness(solution: np.ndarray) -> float:
+    """
+    Calculate the fitness of the bins of a solution: their number, plus the mean squared waste of all the bins
+    but the last one, below 1, to break ties.
+
+    Parameters:
+    - solution (np.ndarray): The bins of the solution.
+
+    Returns:
+    - float: The fitness of the solution, whose integer part is its number of bins.
+    """
+    
+    squared_waste_sum = 0.0
+    # Calculate squared fill ratio for all bins except the last one
+    for i in range(solution.shape[0] - 1):  # Exclude the last bin
+        waste_fill_ratio = 1 - calculate_bin_fill(solution[i])
+        squared_waste_sum += waste_fill_ratio ** 2
+    
+    # Normalize squared_fill_sum to be between 0 and 1 (a single bin has no bin to average)
+    squared_fill_ratio = squared_waste_sum / (solution.shape[0] - 1) if solution.shape[0] > 1 else 0.0  # Average squared fill ratio
+    
+    return np.float64(solution.shape[0]) + squared_fill_ratio
+
+@njit(float64(from_dtype(Item)[:], int32[:], UniTuple(int32, 2), boolean, boolean, int32, int32, int32, int32), cache = True)
 def compute_fitness(items: np.ndarray, id_ordering: np.ndarray, bin_dimensions: Tuple[int, int], 
-                    guillotine_cut: bool, rotation: bool):
+                    guillotine_cut: bool, rotation: bool, engine: int, split_rule: int,
+                    bin_selection: int, open_bins: int):
     """
     Calculate the fitness of a bin packing solution using a specific order of items.
 
@@ -44,6 +92,10 @@ def compute_fitness(items: np.ndarray, id_ordering: np.ndarray, bin_dimensions:
     - bin_dimentions (tuple): Tuple containing the width and height of the bin.
     - guillotine_cut (bool): Indicates whether guillotine cuts are used for placing the items.
     - rotation (bool): Indicates whether rotation of items is allowed during placement.
+    - engine (int): The placement engine used to build the bins.
+    - split_rule (int): The rule deciding the orientation of the guillotine cuts.
+    - bin_selection (int): The policy choosing the bin receiving the next item.
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
 
     Returns:
     - float: The calculated fitness value of the bin packing solution, based on the number of bins used and the fill rate of the last bin.
@@ -53,25 +105,17 @@ def compute_fitness(items: np.ndarray, id_ordering: np.ndarray, bin_dimensions:
     # This gives an array of items with a specific ordering
     sequence = get_corresponding_sequence_by_id(items, id_ordering)
     # Apply the placement heuristic to get the bins
-    solution = lgfi(sequence, bin_width, bin_height, guillotine_cut, rotation)
+    solution = decode(sequence, bin_width, bin_height, guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)
     # Compute the fitness of this specfic solution (bins)
     # solution_fitness = np.float64(solution.shape[0]) + calculate_bin_fill(solution[-1])
     # return np.float64(solution_fitness)
     
-    squared_waste_sum = 0.0
-    # Calculate squared fill ratio for all bins except the last one
-    for i in range(solution.shape[0] - 1):  # Exclude the last bin
-        waste_fill_ratio = 1 - calculate_bin_fill(solution[i])
-        squared_waste_sum += waste_fill_ratio ** 2
-    
-    # Normalize squared_fill_sum to be between 0 and 1
-    squared_fill_ratio = squared_waste_sum / (solution.shape[0] - 1)  # Average squared fill ratio
-    
-    return np.float64(solution.shape[0]) + squared_fill_ratio
+    return compute_bins_fitness(solution)
 
-@njit(float64[:](int32[:, :], from_dtype(Item)[:], UniTuple(int32, 2), boolean, boolean), parallel = True, cache = True)
+@njit(float64[:](int32[:, :], from_dtype(Item)[:], UniTuple(int32, 2), boolean, boolean, int32, int32, int32, int32), parallel = True, cache = True)
 def compute_fitnesses(population: np.ndarray, items: np.ndarray, bin_dimensions: Tuple[int, int], 
-                      guillotine_cut: bool, rotation: bool) -> np.ndarray:
+                      guillotine_cut: bool, rotation: bool, engine: int, split_rule: int,
+                      bin_selection: int, open_bins: int) -> np.ndarray:
     """
     Calculate the fitnesses of a population of bin packing solutions.
 
@@ -81,6 +125,10 @@ def compute_fitnesses(population: np.ndarray, items: np.ndarray, bin_dimensions:
     - bin_dimentions (tuple): Tuple containing the width and height of the bin.
     - guillotine_cut (bool): Should the guillotine cut rule be applied.
     - rotation (bool): Should the items be able to rotate
+    - engine (int): The placement engine used to build the bins.
+    - split_rule (int): The rule deciding the orientation of the guillotine cuts.
+    - bin_selection (int): The policy choosing the bin receiving the next item.
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
 
     Returns:
     - np.ndarray: An array of fitness values for the population.
@@ -93,6 +141,81 @@ def compute_fitnesses(population: np.ndarray, items: np.ndarray, bin_dimensions:
     for i in prange(population_size):
         
         # Compute the fitness of this specfic solution (bins)
-        fitnesses[i] = compute_fitness(items, population[i], bin_dimensions, guillotine_cut, rotation)
+        fitnesses[i] = compute_fitness(items, population[i], bin_dimensions, guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)
         
-    return fitnesses
\ No newline at end of file
+    return fitnesses
+
+@njit(boolean(from_dtype(ControlBlock)[:]), nogil = True, cache = True)
+def is_stopped(control: np.ndarray) -> bool:
+    """
+    Parameters:
+    - control (np.ndarray): The control block of a search (one ControlBlock record).
+
+    Returns:
+    - bool: True if the search must stop. A call, so that the parallel loops read the flag again at each iteration
+            instead of hoisting it.
+    """
+    return control[0]['stop'] != 0
+
+@njit(float64[:](int32[:, :], from_dtype(Item)[:], UniTuple(int32, 2), boolean, boolean, int32, int32, int32, int32, from_dtype(ControlBlock)[:]), parallel = True, nogil = True, cache = True)
+def compute_fitnesses_with_control(population: np.ndarray, items: np.ndarray, bin_dimensions: Tuple[int, int],
+                                   guillotine_cut: bool, rotation: bool, engine: int, split_rule: int,
+                                   bin_selection: int, open_bins: int, control: np.ndarray) -> np.ndarray:
+    """
+    Calculate the fitnesses of a population of bin packing solutions, until the search is stopped.
+
+    The stop field of the control block is polled before each decode, the solutions not decoded yet once it is set
+    keep an infinite fitness. The GIL is released, so that other threads can set it meanwhile.
+
+    Parameters:
+    - population (np.ndarray): An array representing the population of solutions.
+    - items (np.ndarray): An array of items to be packed.
+    - bin_dimentions (tuple): Tuple containing the width and height of the bin.
+    - guillotine_cut (bool): Should the guillotine cut rule be applied.
+    - rotation (bool): Should the items be able to rotate
+    - engine (int): The placement engine used to build the bins.
+    - split_rule (int): The rule deciding the orientation of the guillotine cuts.
+    - bin_selection (int): The policy choosing the bin receiving the next item.
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+    - control (np.ndarray): The control block of the search (one ControlBlock record).
+
+    Returns:
+    - np.ndarray: An array of fitness values for the population, inf for the solutions skipped.
+    """
+
+    population_size = population.shape[0]
+
+    fitnesses = np.full(population_size, np.inf, dtype=np.float64)
+
+    for i in prange(population_size):
+
+        if not is_stopped(control):
+            fitnesses[i] = compute_fitness(items, population[i], bin_dimensions, guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)
+
+    return fitnesses
+
+@njit(void(int32[:, :], from_dtype(Item)[:], UniTuple(int32, 2), boolean, boolean, int32, int32, int32, from_dtype(DecoderCounters)[:]), parallel = True, cache = True)
+def count_lgfi_events(population: np.ndarray, items: np.ndarray, bin_dimensions: Tuple[int, int], guillotine_cut: bool, 
+                      rotation: bool, split_rule: int, bin_selection: int, open_bins: int, counters: np.ndarray) -> None:
+    """
+    Decode the orderings of a population with LGFI, adding the decoder counters of each thread to its own record.
+    The counters only change in the instrumentation build (see binpacking/instrumentation.py).
+
+    Parameters:
+    - population (np.ndarray): An array representing the population of solutions.
+    - items (np.ndarray): An array of items to be packed.
+    - bin_dimensions (tuple): Tuple containing the width and height of the bin.
+    - guillotine_cut (bool): Should the guillotine cut rule be applied.
+    - rotation (bool): Should the items be able to rotate
+    - split_rule (int): The rule deciding the orientation of the guillotine cuts.
+    - bin_selection (int): The policy choosing the bin receiving the next item.
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+    - counters (np.ndarray): The decoder counters (DecoderCounters) of each thread, at least one per thread.
+    """
+    
+    bin_width, bin_height = bin_dimensions
+    
+    for i in prange(population.shape[0]):
+        ordered_items = get_corresponding_sequence_by_id(items, population[i])
+        lgfi_with_counters(ordered_items, bin_width, bin_height, guillotine_cut, rotation, split_rule, bin_selection, 
+                           open_bins, counters[get_thread_id()])
@@ -51,6 +51,54 @@ def offspring_generation(parent1: np.ndarray, parent2: np.ndarray, fitness1: flo
 
     return offspring
 
+@njit(float64[:](int64, int64, float64), cache = True)
+def selection_probabilities(psize: int, num_crossover: int, delta: float) -> np.ndarray:
+    """
+    Roulette wheel probabilities of the crossover partners, the num_crossover best individuals by fitness rank.
+
+    Parameters:
+    - psize (int): The size of the population.
+    - num_crossover (int): The number of individuals generated by crossover.
+    - delta (float): Exponent used to adjust selection probabilities based on fitness ranking.
+
+    Returns:
+    - np.ndarray: The probability of selecting the individual of each rank.
+    """
+
+    probabilities = ((psize - np.arange(num_crossover)).astype(np.float64)) ** delta
+    probabilities /= probabilities.sum()
+
+    return probabilities
+
+@njit(int32[:](int32[:, :], float64[:], int64[:], int32[:], float64[:], int64), cache = True)
+def crossover_individual(population: np.ndarray, fitnesses: np.ndarray, sorted_indices: np.ndarray,
+                         pop_idx_array: np.ndarray, probabilities: np.ndarray, rank: int) -> np.ndarray:
+    """
+    Cross the individual of a fitness rank with a partner selected by roulette wheel.
+
+    Parameters:
+    - population (np.ndarray): Array of individual solutions, each a permutation of item indices.
+    - fitnesses (np.ndarray): Array of individual fitnesses.
+    - sorted_indices (np.ndarray): The indices of the individuals by increasing fitness.
+    - pop_idx_array (np.ndarray): The ranks of the population.
+    - probabilities (np.ndarray): The selection probabilities of the partners (see selection_probabilities).
+    - rank (int): The fitness rank of the first parent.
+
+    Returns:
+    - np.ndarray: The offspring.
+    """
+
+    idx = sorted_indices[rank]
+
+    # Select parent by roulette wheel selection
+    partner_idx = sorted_indices[custom_choice(pop_idx_array, p=probabilities)]
+
+    # A single selected individual can only be paired with itself
+    while partner_idx == idx and len(probabilities) > 1:
+        partner_idx = sorted_indices[custom_choice(pop_idx_array, p=probabilities)]
+
+    return offspring_generation(population[idx], population[partner_idx], fitnesses[idx], fitnesses[partner_idx])
+
 @njit(int32[:, :](int32[:, :], float64[:], float64, float64), parallel = True, cache = True)
 def crossover(population: np.ndarray, fitnesses: np.ndarray, crossover_rate: float, delta: float) -> np.ndarray:
     """
@@ -75,33 +123,14 @@ def crossover(population: np.ndarray, fitnesses: np.ndarray, crossover_rate: flo
     sorted_indices = np.argsort(fitnesses)
     
     # Probabilities to do roulette wheel selection
-    probabilities = ((psize - np.arange(num_crossover)).astype(np.float64)) ** delta
-    probabilities /= probabilities.sum()
-    probabilities = probabilities.astype(np.float64)
+    probabilities = selection_probabilities(psize, num_crossover, delta)
     
     new_population = np.empty((num_crossover, n), dtype=np.int32)
     
     pop_idx_array = np.arange(psize, dtype=np.int32)
     
     for i in prange(num_crossover):
-        
-        idx = sorted_indices[i]
-        
-        parent1 = population[idx]
-        
-        # Select parent by roulette wheel selection
-        sorted_idx = custom_choice(pop_idx_array, p=probabilities)
-        partner_idx = sorted_indices[sorted_idx]
-        
-        while partner_idx == idx:
-            sorted_idx = custom_choice(pop_idx_array, p=probabilities)
-            partner_idx = sorted_indices[sorted_idx]
-        
-        parent2 = population[partner_idx]
-        
-        offspring = offspring_generation(parent1, parent2, fitnesses[idx], fitnesses[partner_idx])
-        
-        new_population[i] = offspring
+        new_population[i] = crossover_individual(population, fitnesses, sorted_indices, pop_idx_array, probabilities, i)
         
     return new_population
 
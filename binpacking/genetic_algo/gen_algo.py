@@ -1,13 +1,26 @@
 import time
+from contextlib import nullcontext
 from typing import Tuple
 
-import tqdm
+from numba import config
+
 from binpacking.genetic_algo.mutation import *
 from binpacking.population_generation import *
 from binpacking.genetic_algo.crossover import *
 from binpacking.structures import *
 from binpacking.fitness import *
 from binpacking.lgfi import *
+from binpacking.skyline import *
+from binpacking.maxrects import *
+from binpacking.decoder import *
+from binpacking.bin_selection import *
+from binpacking.warm_start import check_orderings
+from binpacking.telemetry import TelemetryClock, population_diversity
+from binpacking.solve_control import SolveControl
+from binpacking.symmetry import class_sequences, distinct_class_sequences, hash_class_orderings, size_classes
+
+# Fitnesses of the orderings already decoded, kept until their sequences of size classes hold this many ids
+FITNESS_CACHE_SIZE = 10000000
 
 def genetic_algo(items: np.ndarray,
                  bin_dimensions: Tuple[int, int],
@@ -18,7 +31,16 @@ def genetic_algo(items: np.ndarray,
                  kappa: float,
                  delta: float,
                  guillotine_cut: bool,
-                 rotation: bool) -> Tuple[np.ndarray, float]:
+                 rotation: bool,
+                 engine: int = LGFI_ENGINE,
+                 split_rule: int = SHORTER_LEFTOVER_SPLIT,
+                 bin_selection: int = FIRST_FIT_SELECTION,
+                 open_bins: int = DEFAULT_OPEN_BINS,
+                 seed: int = None,
+                 initial_solutions: np.ndarray = None,
+                 telemetry=None,
+                 control: SolveControl = None,
+                 fitness_cache: bool = False) -> Tuple[np.ndarray, float]:
     """
     Apply the genetic algorithm to optimize the packing of items into bins.
 
@@ -33,35 +55,114 @@ def genetic_algo(items: np.ndarray,
     - delta (float): Parameter controlling the randomness in crossover.
     - guillotine_cut (bool): Should the guillotine cut rule be applied.
     - rotation (bool): Should the items be able to rotate
+    - engine (int): The placement engine used to build the bins.
+    - split_rule (int): The rule deciding the orientation of the guillotine cuts.
+    - bin_selection (int): The policy choosing the bin receiving the next item.
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+    - seed (int): Seed of the random generator, None for a non reproducible run.
+    - initial_solutions (np.ndarray): Id orderings seeding the first population (see solution_to_ordering),
+                                      at most population_size of them. The rest of the population is sampled.
+    - telemetry (callable): Called with the telemetry record of each generation (see binpacking.telemetry),
+                            None to disable it.
+    - control (SolveControl): Control to cancel the search, bound its time and follow its progress. A stopped search
+                              returns the best solution found so far, at least one ordering is always decoded.
+    - fitness_cache (bool): Keep the fitnesses of the decoded orderings, so that an ordering met again (small
+                            instances, converged populations, warm starts) isn't decoded twice, nor the orderings only
+                            differing by the ids of identical items. Only worth its bookkeeping when the population
+                            repeats itself.
 
     Returns:
     - tuple: A tuple containing the best solution found and its corresponding fitness.
     """
     
+    check_placement_engine(engine, guillotine_cut)
+    check_bin_selection(bin_selection, open_bins, engine)
+    
+    if seed is not None:
+        set_seed(seed)
+    
     population = generate_population(items, population_size, kappa)
     
+    # Warm start from known orderings
+    if initial_solutions is not None:
+        initial_solutions = check_orderings(initial_solutions, items, rotation)[:population_size]
+        population[:len(initial_solutions)] = initial_solutions
+    
     best_solution = np.zeros_like(population[0], dtype=np.int32)
     best_fitness = np.inf
     
+    # Fitness of each sequence of size classes, the sequence itself is the key so that two orderings only share a
+    # fitness if they decode to the same packing
+    cache = {} if fitness_cache else None
+    classes = size_classes(items) if fitness_cache else None
+    clock = TelemetryClock("genetic_algo") if telemetry is not None else None
     
-    for _ in range(nb_generations):
+    with control.watch(nb_generations) if control is not None else nullcontext():
+        for generation in range(nb_generations):
+            if control is not None and best_fitness < np.inf and control.should_stop():
+                break
+        
+            if cache is None:
+                evaluated = population
+            else:
+                if (len(cache) + population_size) * len(items) > FITNESS_CACHE_SIZE:
+                    cache.clear()
+                keys = [sequence.tobytes() for sequence in class_sequences(population, classes)]
+                
+                # First individual of each sequence missing from the cache
+                missing = {}
+                for i, key in enumerate(keys):
+                    if key not in cache and key not in missing:
+                        missing[key] = i
+                evaluated = population[np.fromiter(missing.values(), dtype=np.int64, count=len(missing))]
+            
+            new_fitnesses = np.zeros(0, dtype=np.float64)
+            if len(evaluated):
+                if control is None:
+                    new_fitnesses = compute_fitnesses(evaluated, items, bin_dimensions, guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)
+                else:
+                    new_fitnesses = compute_fitnesses_with_control(evaluated, items, bin_dimensions, guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins, control.block)
+                    # Stopped in the middle of the generation
+                    if np.isinf(new_fitnesses).any():
+                        if best_fitness == np.inf:
+                            # Stopped in the first generation: keep its best decoded ordering, decoding one if none was
+                            if np.isinf(new_fitnesses).all():
+                                new_fitnesses[0] = compute_fitness(items, evaluated[0], bin_dimensions, guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)
+                            best_index = np.argmin(new_fitnesses)
+                            best_fitness = new_fitnesses[best_index]
+                            best_solution[:] = evaluated[best_index]
+                            control.report(generation, best_fitness, int(np.isfinite(new_fitnesses).sum()), best_solution)
+                        break
+            
+            if cache is None:
+                fitnesses = new_fitnesses
+            else:
+                cache.update(zip(missing, new_fitnesses.tolist()))
+                fitnesses = np.array([cache[key] for key in keys], dtype=np.float64)
         
-        fitnesses = compute_fitnesses(population, items, bin_dimensions, guillotine_cut, rotation)
+            # Store best generation
+            best_index = np.argmin(fitnesses)
+            current_best_fitness = fitnesses[best_index]
+            if current_best_fitness < best_fitness:
+                best_fitness = current_best_fitness
+                best_solution[:] = population[best_index]
         
-        # Store best generation
-        best_index = np.argmin(fitnesses)
-        current_best_fitness = fitnesses[best_index]
-        if current_best_fitness < best_fitness:
-            best_fitness = current_best_fitness
-            best_solution[:] = population[best_index]
+            if control is not None:
+                control.report(generation + 1, best_fitness, len(evaluated), best_solution)
         
-        num_crossover = int(crossover_rate * population_size)
-        # Create the new population with crossover
-        population[:num_crossover] = crossover(population, fitnesses, np.float64(crossover_rate), delta)
-        # Fill the rest with a simple roulette wheel selection based on the deterministic sequence
-        population[num_crossover:] = generate_population(items, population_size - num_crossover, kappa)
+            if telemetry is not None:
+                clock.evaluations += len(evaluated)
+                clock.cache_hits += population_size - len(evaluated)
+                telemetry(clock.record(generation, best_fitness, current_best_fitness, mean_fitness=float(np.mean(fitnesses)),
+                                       diversity=population_diversity(population, best_index)))
         
-        population = mutation(population, mutation_rate)
+            num_crossover = int(crossover_rate * population_size)
+            # Create the new population with crossover
+            population[:num_crossover] = crossover(population, fitnesses, np.float64(crossover_rate), delta)
+            # Fill the rest with a simple roulette wheel selection based on the deterministic sequence
+            population[num_crossover:] = generate_population(items, population_size - num_crossover, kappa)
+        
+            population = mutation(population, mutation_rate, rotation)
         
     return best_solution, best_fitness 
     
@@ -74,10 +175,18 @@ def initialize_numba_functions(advanced=False):
     - advanced (bool): If True, prints detailed compilation times for each function. Default is False.
     """
     
+    # Progress bar and optional features, only loaded to compile them
+    import tqdm
+    from binpacking.batch import deterministic_sequence, evolve_population, solve_batch, solve_instance
+    from binpacking.online import insert_item_online
+    from binpacking.preprocessing import count_partners, find_pair_layout
+    from binpacking.validation import find_overlaps, is_guillotine
+
     if advanced:
         print("===================== Compilation (Advanced Mode) =====================",flush=True)
 
     bin = create_bin(1, 100, 100)
+    counters = np.zeros(1, dtype=DecoderCounters)[0] if INSTRUMENTATION else UNREPORTED_COUNTERS[0]
     
     # Functions to copmile with their corresponding dummy arguments
     functions_with_args = {
@@ -89,26 +198,66 @@ def initialize_numba_functions(advanced=False):
         remove_free_rect_from_bin: (bin, create_free_rectangle(0, 0, 0, 0)),
         remove_free_rect_from_bin_by_idx: (bin, 0),
         get_item_by_id: (np.zeros(5, dtype=Item), 1),
-        custom_choice: (np.arange(5), np.random.random(5).astype(np.float64)),
+        custom_choice: (np.arange(5, dtype=np.int32), np.random.random(5).astype(np.float64)),
         generate_population: (np.zeros(5, dtype=Item), 10, 0.5),
-        get_corresponding_sequence_by_id: (np.zeros(5, dtype=Item), np.arange(5)),
-        mutation: (np.zeros((5, 5), dtype=np.int32), 0.5),  
-        swap_individual: (np.arange(5),),  
-        rotate_individual: (np.arange(5),),  
+        get_corresponding_sequence_by_id: (np.zeros(5, dtype=Item), np.arange(5, dtype=np.int32)),
+        mutation: (np.zeros((5, 5), dtype=np.int32), 0.5, True),  
+        swap_individual: (np.arange(5, dtype=np.int32),),  
+        mutate_individual: (np.arange(5, dtype=np.int32), 0.5, True),
+        rotate_individual: (np.arange(5, dtype=np.int32),),  
         remove_item_from_remaining: (np.zeros(5, dtype=Item), 1),  
         spliting_process_guillotine: (True, bin, create_free_rectangle(0, 0, 0, 0), create_item(0, 0, 0)),  
-        merge_rec_guillotine: (bin,),  
-        handle_wastage: (bin, create_free_rectangle(0, 0, 0, 0), 0, 0),  
-        check_fit_and_rotation: (np.zeros(5, dtype=Item), 0, 0, True),  
-        perform_placement: (bin, np.zeros(5, dtype=Item), create_free_rectangle(0, 0, 0, 0), create_item(0, 0, 0), True, 0, 0, True, True),  
-        insert_item_lgfi: (bin, np.zeros(5, dtype=Item), True, True),  
-        find_current_position_idx: (bin,),  
-        lgfi: (np.empty(0, dtype=Item), 10, 10, True, True),
+        find_merge_partner: (np.zeros(5, dtype=FreeRectangle), 0, 1, 5),
+        merge_free_rects: (bin, 0, 1),
+        merge_rec_guillotine: (bin, counters),  
+        handle_wastage: (bin, create_free_rectangle(0, 0, 0, 0), 0, 0, counters),  
+        check_fit_and_rotation: (np.zeros(5, dtype=Item), 0, 0, True, counters),  
+        build_fit_index: (np.zeros(5, dtype=Item),),
+        build_fit_rows: (np.zeros((0, NB_FIT_COLUMNS), dtype=np.int64),),
+        mark_item_placed: (build_fit_index(np.array([create_item(1, 2, 2), create_item(2, 3, 1)])), np.zeros(0, dtype=np.int64), 0),
+        count_items_fit: (build_fit_index(np.array([create_item(1, 2, 2), create_item(2, 3, 1)])), 5, 5, True),
+        choose_cut_orientation: (create_free_rectangle(0, 0, 5, 5), create_item(0, 2, 2), build_fit_index(np.array([create_item(1, 2, 2), create_item(2, 3, 1)])), True),
+        is_split_horizontal: (create_free_rectangle(0, 0, 5, 5), create_item(0, 2, 2), build_fit_index(np.array([create_item(1, 2, 2), create_item(2, 3, 1)])), True, HYBRID_FIT_SPLIT),
+        perform_placement: (bin, create_free_rectangle(0, 0, 0, 0), create_item(0, 0, 0), True, 0, 0, True, True, SHORTER_LEFTOVER_SPLIT, np.zeros((0, NB_FIT_COLUMNS), dtype=np.int64), np.zeros(0, dtype=np.int64), counters),  
+        insert_item_lgfi: (bin, np.zeros(5, dtype=Item), True, True, SHORTER_LEFTOVER_SPLIT, np.zeros((0, NB_FIT_COLUMNS), dtype=np.int64), np.zeros(0, dtype=np.int64), counters),  
+        find_current_position_idx: (bin, counters),  
+        lgfi_with_counters: (np.empty(0, dtype=Item), 10, 10, True, True, SHORTER_LEFTOVER_SPLIT, FIRST_FIT_SELECTION, 1, counters),
+        lgfi: (np.empty(0, dtype=Item), 10, 10, True, True, SHORTER_LEFTOVER_SPLIT, FIRST_FIT_SELECTION, 1),
+        get_candidate_bins: (5, LAST_K_SELECTION, 2),
+        update_best_fit_order: (np.arange(5, dtype=np.int32), np.full(5, 100, dtype=np.int64), 2, 10),
+        find_skyline_position: (np.zeros(2, dtype=FreeRectangle), 1, 5, 5, 10, 10),
+        add_skyline_level: (np.zeros(2, dtype=FreeRectangle), 1, 0, 5, 5, 10),
+        insert_item_skyline: (bin, np.zeros(2, dtype=FreeRectangle), 1, create_item(0, 5, 5), True),
+        skyline: (np.empty(0, dtype=Item), 10, 10, True, FIRST_FIT_SELECTION, 1),
+        find_maxrects_position: (np.zeros(2, dtype=FreeRectangle), 1, 5, 5, True),
+        prune_free_rects: (np.zeros(2, dtype=FreeRectangle), 2),
+        split_free_rects: (np.zeros(2, dtype=FreeRectangle), 2, 0, 0, 5, 5),
+        maxrects: (np.empty(0, dtype=Item), 10, 10, True, FIRST_FIT_SELECTION, 1),
+        decode: (np.empty(0, dtype=Item), 10, 10, True, True, LGFI_ENGINE, SHORTER_LEFTOVER_SPLIT, FIRST_FIT_SELECTION, 1),
         calculate_bin_fill: (bin,),  
-        compute_fitness: (np.array([create_item(0, 6, 6), create_item(1, 6, 6), create_item(2, 4, 4), create_item(3, 3, 3)]), np.array([0, 1, 2, 3]), (10, 10), True, True),  
-        compute_fitnesses: (np.array([np.array([0, 1, 2])]), np.array([create_item(0, 6, 6),create_item(1, 6, 6),create_item(2, 4, 4)]), (10, 10), True, True),  
+        compute_bins_fitness: (np.zeros(1, dtype=Bin),),
+        compute_fitness: (np.array([create_item(0, 6, 6), create_item(1, 6, 6), create_item(2, 4, 4), create_item(3, 3, 3)]), np.array([0, 1, 2, 3], dtype=np.int32), (10, 10), True, True, LGFI_ENGINE, SHORTER_LEFTOVER_SPLIT, FIRST_FIT_SELECTION, 1),  
+        size_classes: (np.array([create_item(1, 2, 3), create_item(2, 3, 2)]),),
+        class_sequences: (np.array([[1, -2]], dtype=np.int32), np.zeros((3, 2), dtype=np.int32)),
+        hash_class_orderings: (np.array([[1, -2]], dtype=np.int32), np.zeros((3, 2), dtype=np.int32)),
+        distinct_class_sequences: (np.array([[1, -2], [2, -1]], dtype=np.int32), np.zeros((3, 2), dtype=np.int32)),
+        compute_fitnesses: (np.array([[0, 1, 2]], dtype=np.int32), np.array([create_item(0, 6, 6),create_item(1, 6, 6),create_item(2, 4, 4)]), (10, 10), True, True, LGFI_ENGINE, SHORTER_LEFTOVER_SPLIT, FIRST_FIT_SELECTION, 1),  
+        is_stopped: (SolveControl().block,),
+        compute_fitnesses_with_control: (np.array([[0, 1, 2]], dtype=np.int32), np.array([create_item(0, 6, 6),create_item(1, 6, 6),create_item(2, 4, 4)]), (10, 10), True, True, LGFI_ENGINE, SHORTER_LEFTOVER_SPLIT, FIRST_FIT_SELECTION, 1, SolveControl().block),
+        count_lgfi_events: (np.array([[0, 1, 2]], dtype=np.int32), np.array([create_item(0, 6, 6),create_item(1, 6, 6),create_item(2, 4, 4)]), (10, 10), True, True, SHORTER_LEFTOVER_SPLIT, FIRST_FIT_SELECTION, 1, np.zeros(config.NUMBA_NUM_THREADS, dtype=DecoderCounters)),
         offspring_generation: (np.zeros(5, dtype=np.int32), np.zeros(5, dtype=np.int32), 0, 0),  
+        selection_probabilities: (5, 2, 2.0),
+        crossover_individual: (np.array([[1, 2], [2, 1]], dtype=np.int32), np.array([1.0, 2.0]), np.arange(2), np.arange(2, dtype=np.int32), np.array([0.5, 0.5]), 0),
         crossover: (np.zeros((1, 1), dtype=np.int32), np.random.random(1).astype(np.float64), 0.5, 2.0),  
+        deterministic_sequence: (np.array([create_item(1, 2, 2), create_item(2, 3, 3)]),),
+        evolve_population: (np.array([[1, 2], [2, 1]], dtype=np.int32), np.array([1.0, 2.0]), np.array([create_item(1, 2, 2), create_item(2, 3, 3)]), 0.5, 0.5, 1.0, 1.0, True),
+        solve_instance: (np.array([create_item(1, 2, 2), create_item(2, 3, 3)]), 5, 5, 2, 1, 0.5, 0.5, 1.0, 1.0, True, True, LGFI_ENGINE, SHORTER_LEFTOVER_SPLIT, FIRST_FIT_SELECTION, 1),
+        solve_batch: (np.array([create_item(1, 2, 2), create_item(2, 3, 3)]), np.array([0, 2], dtype=np.int64), np.array([[5, 5]], dtype=np.int32), 2, 1, 0.5, 0.5, 1.0, 1.0, True, True, LGFI_ENGINE, SHORTER_LEFTOVER_SPLIT, FIRST_FIT_SELECTION, 1, 0),
+        find_overlaps: (np.zeros(2, dtype=np.int32), np.array([0, 1], dtype=np.int32), np.zeros(2, dtype=np.int32), np.full(2, 2, dtype=np.int32), np.full(2, 2, dtype=np.int32)),
+        insert_item_online: (np.zeros(1, dtype=Bin), 1, 0, 5, 5, True, True, SHORTER_LEFTOVER_SPLIT),
+        find_pair_layout: (2, 3, 3, 2, 5, 5, True),
+        count_partners: (np.array([create_item(1, 2, 2), create_item(2, 3, 3)]), np.ones(2, dtype=np.bool_), 5, 5, True),
+        is_guillotine: (np.array([0, 2], dtype=np.int32), np.zeros(2, dtype=np.int32), np.full(2, 2, dtype=np.int32), np.full(2, 2, dtype=np.int32)),
     }
     
     total_compilation_time: float = 0.0
@@ -35,14 +35,32 @@ def swap_individual(individual: np.ndarray) -> None:
     # Swap the elements
     individual[idx2], individual[idx1] = individual[idx1], individual[idx2]
 
-@njit(int32[:, :](int32[:, :], float64), parallel = True, cache=True)
-def mutation(population: np.ndarray, mutation_rate: float) -> np.ndarray:
+@njit(void(int32[:], float64, boolean), cache=True)
+def mutate_individual(individual: np.ndarray, mutation_rate: float, rotation: bool) -> None:
+    """
+    Mutate an individual with probability mutation_rate, by a swap or, half of the time if the items can rotate,
+    by a rotation.
+
+    Parameters:
+    - individual (np.ndarray): An individual solution.
+    - mutation_rate (float): Probability of mutation of the individual.
+    - rotation (bool): Should the items be able to rotate, otherwise only swaps are applied.
+    """
+    if np.random.random() < mutation_rate:
+        if not rotation or np.random.random() < 0.5:
+            swap_individual(individual)
+        else:
+            rotate_individual(individual)
+
+@njit(int32[:, :](int32[:, :], float64, boolean), parallel = True, cache=True)
+def mutation(population: np.ndarray, mutation_rate: float, rotation: bool) -> np.ndarray:
     """
     Perform mutation on a population by swapping elements in each individual.
 
     Parameters:
     - population (np.ndarray): Array of individual solutions.
     - mutation_rate (float): Probability of mutation for each individual.
+    - rotation (bool): Should the items be able to rotate, otherwise only swaps are applied.
 
     Returns:
     - np.ndarray: Mutated population.
@@ -51,11 +69,7 @@ def mutation(population: np.ndarray, mutation_rate: float) -> np.ndarray:
     population_size, individual_length = population.shape
     
     for i in prange(population_size):
-        if np.random.random() < mutation_rate:
-            if np.random.random() < 0.5:
-                swap_individual(mutated_population[i])
-            else:
-                rotate_individual(mutated_population[i])
+        mutate_individual(mutated_population[i], mutation_rate, rotation)
 
     return mutated_population
     
@@ -0,0 +1,205 @@
+import argparse
+import os
+
+import numpy as np
+
+from binpacking.data_manager import BINARY_INSTANCE_EXTENSION, create_items, export_instance, export_instance_to_binary
+
+# Parametric families of instances:
+# - "uniform": widths and heights uniform in [W/10, W/2] and [H/10, H/2], a few items per bin.
+# - "gcut": widths and heights uniform in [W/4, 3W/4] and [H/4, 3H/4], like the gcut instances of Beasley.
+# - "long_thin": half of the items wide and flat, the other half narrow and tall.
+# - "perfect_fit": the bins are cut into the items by guillotine cuts, the optimum is known.
+INSTANCE_FAMILIES = ("uniform", "gcut", "long_thin", "perfect_fit")
+# Number of items of the instances of a scaling study
+SCALING_SIZES = (100, 1000, 10000, 100000)
+
+DEFAULT_BIN_SIZE = 1000
+# Average number of items cut from each bin of a perfect fit instance
+PERFECT_FIT_ITEMS_PER_BIN = 8
+# Smallest side of the items cut from the bins of a perfect fit instance, relative to the bin side
+PERFECT_FIT_MIN_SIDE = 0.05
+
+def uniform_dimensions(rng, nb_items, bin_width, bin_height, low, high):
+    """
+    Draw item dimensions uniformly between low and high times the bin dimensions.
+
+    Returns:
+    - tuple: The widths and heights of the items.
+    """
+    widths = rng.integers(max(1, int(low * bin_width)), max(1, int(high * bin_width)) + 1, nb_items)
+    heights = rng.integers(max(1, int(low * bin_height)), max(1, int(high * bin_height)) + 1, nb_items)
+
+    return widths, heights
+
+def long_thin_dimensions(rng, nb_items, bin_width, bin_height):
+    """
+    Draw wide and flat items (width in [W/2, W], height in [H/20, H/5]) and narrow and tall items (the other way
+    round), half of each.
+
+    Returns:
+    - tuple: The widths and heights of the items.
+    """
+    long_sides = rng.uniform(0.5, 1.0, nb_items)
+    thin_sides = rng.uniform(0.05, 0.2, nb_items)
+    flat = rng.random(nb_items) < 0.5
+
+    widths = np.maximum(1, (np.where(flat, long_sides, thin_sides) * bin_width).astype(np.int64))
+    heights = np.maximum(1, (np.where(flat, thin_sides, long_sides) * bin_height).astype(np.int64))
+
+    return widths, heights
+
+def perfect_fit_dimensions(rng, nb_items, bin_width, bin_height, nb_bins):
+    """
+    Cut nb_bins bins into nb_items items by guillotine cuts. The items fill the bins exactly, so nb_bins is the
+    optimal number of bins, with or without rotation and with the guillotine rule.
+
+    Each round cuts the largest pieces in two, across their longest side more often, at a random position leaving
+    both parts at least PERFECT_FIT_MIN_SIDE of the bin side.
+
+    Returns:
+    - tuple: The widths and heights of the items.
+
+    Raises:
+    - ValueError: If the bins can't be cut into so many items.
+    """
+    min_width = max(1, int(PERFECT_FIT_MIN_SIDE * bin_width))
+    min_height = max(1, int(PERFECT_FIT_MIN_SIDE * bin_height))
+
+    widths = np.full(nb_bins, bin_width, dtype=np.int64)
+    heights = np.full(nb_bins, bin_height, dtype=np.int64)
+
+    while len(widths) < nb_items:
+        can_cut_width = widths >= 2 * min_width
+        can_cut_height = heights >= 2 * min_height
+        candidates = np.flatnonzero(can_cut_width | can_cut_height)
+        if len(candidates) == 0:
+            raise ValueError(f"Can't cut {nb_bins} bins into {nb_items} items of at least {min_width}x{min_height}")
+
+        # The largest pieces first, at most doubling the number of pieces per round
+        nb_cuts = min(len(candidates), nb_items - len(widths))
+        areas = widths[candidates] * heights[candidates]
+        pieces = candidates[np.argpartition(-areas, nb_cuts - 1)[:nb_cuts]] if nb_cuts < len(candidates) else candidates
+
+        piece_widths, piece_heights = widths[pieces], heights[pieces]
+        cut_width = can_cut_width[pieces] & (~can_cut_height[pieces] |
+                                            (rng.random(nb_cuts) < piece_widths / (piece_widths + piece_heights)))
+
+        # Width (or height) of the first part, the second one gets the rest
+        sides = np.where(cut_width, piece_widths, piece_heights)
+        min_sides = np.where(cut_width, min_width, min_height)
+        first = rng.integers(min_sides, sides - min_sides + 1)
+
+        widths[pieces] = np.where(cut_width, first, piece_widths)
+        heights[pieces] = np.where(cut_width, piece_heights, first)
+        widths = np.concatenate((widths, np.where(cut_width, piece_widths - first, piece_widths)))
+        heights = np.concatenate((heights, np.where(cut_width, piece_heights, piece_heights - first)))
+
+    order = rng.permutation(nb_items)
+
+    return widths[order], heights[order]
+
+def generate_instance(family, nb_items, seed=None, bin_width=DEFAULT_BIN_SIZE, bin_height=DEFAULT_BIN_SIZE, nb_bins=None):
+    """
+    Generate an instance of a family. The same family, size and seed always give the same instance.
+
+    Parameters:
+    - family (str): One of INSTANCE_FAMILIES.
+    - nb_items (int): The number of items.
+    - seed (int): Seed of the random generator, None for a random instance.
+    - bin_width (int): The width of the bins.
+    - bin_height (int): The height of the bins.
+    - nb_bins (int): Number of bins cut into items for "perfect_fit", by default one per PERFECT_FIT_ITEMS_PER_BIN items.
+
+    Returns:
+    - tuple: The header (NAME, COMMENT, FAMILY, SEED and, for "perfect_fit", OPTIMUM), bin width, bin height and array of items.
+    """
+
+    if family not in INSTANCE_FAMILIES:
+        raise ValueError(f"Unknown instance family: {family}, expected one of {', '.join(INSTANCE_FAMILIES)}")
+    if nb_items < 1:
+        raise ValueError(f"An instance needs at least one item, got {nb_items}")
+
+    # The instance only depends on the family, size and seed
+    entropy = [INSTANCE_FAMILIES.index(family), nb_items] + ([] if seed is None else [seed])
+    rng = np.random.default_rng(entropy if seed is not None else None)
+
+    header = {'NAME': f"{family}-{nb_items}" + ("" if seed is None else f"-{seed}"), 'FAMILY': family, 'SEED': seed}
+
+    if family == "uniform":
+        widths, heights = uniform_dimensions(rng, nb_items, bin_width, bin_height, 0.1, 0.5)
+        header['COMMENT'] = "dimensions uniform in [1/10, 1/2] of the bin"
+    elif family == "gcut":
+        widths, heights = uniform_dimensions(rng, nb_items, bin_width, bin_height, 0.25, 0.75)
+        header['COMMENT'] = "dimensions uniform in [1/4, 3/4] of the bin, like gcut"
+    elif family == "long_thin":
+        widths, heights = long_thin_dimensions(rng, nb_items, bin_width, bin_height)
+        header['COMMENT'] = "half wide and flat items, half narrow and tall items"
+    else:
+        nb_bins = nb_bins or max(1, -(-nb_items // PERFECT_FIT_ITEMS_PER_BIN))
+        widths, heights = perfect_fit_dimensions(rng, nb_items, bin_width, bin_height, nb_bins)
+        header['COMMENT'] = f"{nb_bins} bins cut into the items by guillotine cuts"
+        header['OPTIMUM'] = nb_bins
+
+    items = create_items(np.arange(1, nb_items + 1), widths, heights)
+
+    return header, bin_width, bin_height, items
+
+def write_instance(instance, output_directory, binary=False):
+    """
+    Write an instance to a .bp2d file named after its NAME, or a binary file (BINARY_INSTANCE_EXTENSION).
+
+    Parameters:
+    - instance (tuple): The header, bin width, bin height and array of items (see generate_instance).
+    - output_directory (str): The directory of the file, created if needed.
+    - binary (bool): Write a binary file instead of a .bp2d file.
+
+    Returns:
+    - str: The path of the file.
+    """
+    header, bin_width, bin_height, items = instance
+    os.makedirs(output_directory, exist_ok=True)
+
+    header = {key: value for key, value in header.items() if value is not None}
+    extension = BINARY_INSTANCE_EXTENSION if binary else ".bp2d"
+    file_path = os.path.join(output_directory, header['NAME'] + extension)
+
+    if binary:
+        export_instance_to_binary(items, bin_width, bin_height, file_path, header)
+    else:
+        export_instance(items, bin_width, bin_height, file_path, header)
+
+    return file_path
+
+def generate_instances(output_directory, families=INSTANCE_FAMILIES, sizes=SCALING_SIZES, seeds=(0,), binary=False):
+    """
+    Write an instance of each family, size and seed, for scaling studies.
+
+    Parameters:
+    - output_directory (str): The directory of the files, created if needed.
+    - families (tuple): The families of the instances (see INSTANCE_FAMILIES).
+    - sizes (tuple): The numbers of items of the instances.
+    - seeds (tuple): The seeds of the instances, one instance of each family and size per seed.
+    - binary (bool): Write binary files instead of .bp2d files.
+
+    Returns:
+    - list: The paths of the files.
+    """
+    return [write_instance(generate_instance(family, nb_items, seed), output_directory, binary)
+            for family in families for nb_items in sizes for seed in seeds]
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m binpacking.instance_generator",
+                                     description="Generate seeded instances for scaling studies.")
+    parser.add_argument("output_directory")
+    parser.add_argument("--families", nargs="+", choices=INSTANCE_FAMILIES, default=INSTANCE_FAMILIES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SCALING_SIZES, help="numbers of items")
+    parser.add_argument("--seeds", nargs="+", type=int, default=(0,))
+    parser.add_argument("--binary", action="store_true", help=f"write binary {BINARY_INSTANCE_EXTENSION} files instead of .bp2d files")
+    arguments = parser.parse_args()
+
+    files = generate_instances(arguments.output_directory, arguments.families, arguments.sizes, arguments.seeds, arguments.binary)
+    print(f"Wrote {len(files)} instances to {arguments.output_directory}")
+
+if __name__ == "__main__":
+    main()
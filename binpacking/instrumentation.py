@@ -0,0 +1,126 @@
+import argparse
+import os
+
+import numpy as np
+from numba.core import config
+
+# Environment variable selecting the instrumentation build of the LGFI decoder. It is read once, before the kernels
+# are compiled: the counters are compile-time constants, the normal build doesn't contain them at all.
+INSTRUMENTATION_ENV = "BINPACKING_INSTRUMENTATION"
+INSTRUMENTATION = os.environ.get(INSTRUMENTATION_ENV, "0") == "1"
+
+# Numba doesn't key its cache on the globals of the kernels, the instrumented kernels are cached apart
+INSTRUMENTATION_CACHE_SUBDIRECTORY = "instrumented"
+
+if INSTRUMENTATION and not (config.CACHE_DIR or "").endswith(INSTRUMENTATION_CACHE_SUBDIRECTORY):
+    config.CACHE_DIR = os.path.join(config.CACHE_DIR or os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__"),
+                                    INSTRUMENTATION_CACHE_SUBDIRECTORY)
+    # Kept when Numba reloads its configuration, and inherited by the worker processes
+    os.environ["NUMBA_CACHE_DIR"] = config.CACHE_DIR
+
+def check_instrumentation():
+    """
+    Raises:
+    - RuntimeError: If the kernels were compiled without the counters.
+    """
+    if not INSTRUMENTATION:
+        raise RuntimeError(f"The decoder counters are compiled out, set {INSTRUMENTATION_ENV}=1 before importing binpacking")
+
+def count_decoder_events(items, bin_dimensions, population, guillotine_cut, rotation, split_rule, bin_selection, open_bins):
+    """
+    Decode each ordering of a population with LGFI, in parallel, counting the hot path events of the decoder.
+
+    Parameters:
+    - items (np.ndarray): The items of the instance.
+    - bin_dimensions (tuple): The width and height of the bins.
+    - population (np.ndarray): The id orderings to decode, one per row.
+    - guillotine_cut (bool): Should the guillotine cut rule be applied.
+    - rotation (bool): Should the items be able to rotate.
+    - split_rule (int): The rule deciding the orientation of the guillotine cuts.
+    - bin_selection (int): The policy choosing the bin receiving the next item.
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+
+    Returns:
+    - np.ndarray: The counters of each thread (see DecoderCounters).
+
+    Raises:
+    - RuntimeError: If the kernels were compiled without the counters.
+    """
+    check_instrumentation()
+
+    # Kernels, only loaded once the cache directory is selected
+    from binpacking.fitness import count_lgfi_events
+    from binpacking.structures import DecoderCounters
+
+    counters = np.zeros(config.NUMBA_NUM_THREADS, dtype=DecoderCounters)
+    count_lgfi_events(np.ascontiguousarray(population, dtype=np.int32), items, bin_dimensions, guillotine_cut, rotation,
+                      split_rule, bin_selection, open_bins, counters)
+
+    return counters
+
+def format_counter_report(counters):
+    """
+    Format the counters of the decoder: the total of each counter, its mean per decode and per placed item,
+    and its share on each thread.
+
+    Parameters:
+    - counters (np.ndarray): The counters of each thread (see count_decoder_events).
+
+    Returns:
+    - str: The report, one line per counter.
+    """
+    names = counters.dtype.names
+    threads = np.flatnonzero(counters['decodes'])
+    nb_decodes = max(int(counters['decodes'].sum()), 1)
+    nb_placements = max(int(counters['placements'].sum()), 1)
+
+    name_width = max(len(name) for name in names)
+    lines = [f"{'Counter':<{name_width}} | {'Total':>14} | {'Per decode':>12} | {'Per item':>10} | Share per thread"]
+    lines.append("-" * len(lines[0]))
+
+    for name in names:
+        total = int(counters[name].sum())
+        shares = " ".join(f"{counters[name][thread] / total:.0%}" if total else "-" for thread in threads)
+        lines.append(f"{name:<{name_width}} | {total:>14} | {total / nb_decodes:>12.1f} | {total / nb_placements:>10.2f} | {shares}")
+
+    return "\n".join(lines)
+
+def main():
+    from binpacking.structures import DEFAULT_OPEN_BINS
+
+    parser = argparse.ArgumentParser(prog=f"{INSTRUMENTATION_ENV}=1 python -m binpacking.instrumentation",
+                                     description="Count the hot path events of the LGFI decoder on random orderings of instances.")
+    parser.add_argument("files", nargs="+", help="instance files (.bp2d or .npz)")
+    parser.add_argument("--orderings", type=int, default=100, help="number of random orderings decoded per instance")
+    parser.add_argument("--kappa", type=float, default=1.0)
+    parser.add_argument("--no-guillotine", action="store_true")
+    parser.add_argument("--no-rotation", action="store_true")
+    parser.add_argument("--split-rule", type=int, default=0, help="one of the *_SPLIT constants")
+    parser.add_argument("--bin-selection", type=int, default=0, help="one of the *_SELECTION constants")
+    parser.add_argument("--open-bins", type=int, default=DEFAULT_OPEN_BINS)
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    check_instrumentation()
+
+    from binpacking.data_manager import load_items_from_file
+    from binpacking.decoder import check_bin_selection
+    from binpacking.structures import LGFI_ENGINE
+    from binpacking.population_generation import generate_population, set_seed
+
+    check_bin_selection(arguments.bin_selection, arguments.open_bins, LGFI_ENGINE)
+
+    for file in arguments.files:
+        bin_width, bin_height, items = load_items_from_file(file)
+
+        set_seed(arguments.seed)
+        population = generate_population(items, arguments.orderings, arguments.kappa)
+        counters = count_decoder_events(items, (bin_width, bin_height), population, not arguments.no_guillotine,
+                                        not arguments.no_rotation, arguments.split_rule, arguments.bin_selection,
+                                        arguments.open_bins)
+
+        print(f"===================== {os.path.basename(file)} ({len(items)} items) =====================")
+        print(format_counter_report(counters) + "\n")
+
+if __name__ == "__main__":
+    main()
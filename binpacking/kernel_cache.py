@@ -0,0 +1,342 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import numba
+import numpy as np
+from numba.core import config
+from numba.core.caching import UserProvidedCacheLocator
+
+# Selects the cache directory of the instrumentation build, if enabled, before any kernel is loaded
+from binpacking.instrumentation import INSTRUMENTATION
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_FILE = "kernel_manifest.json"
+# Index and compiled code files written by Numba for each cached kernel
+CACHE_EXTENSIONS = (".nbi", ".nbc")
+
+# Seconds spent in each phase of the start of the program, filled by timed_phase
+STARTUP_TIMES = {}
+
+# Modules of the headless solve path, which must only load NumPy, Numba and the standard library,
+# besides the modules of the project
+HEADLESS_MODULES = ("binpacking.genetic_algo.gen_algo", "binpacking.tabu_search", "binpacking.validation",
+                    "binpacking.warm_start", "binpacking.server", "solutions_helper")
+ALLOWED_PACKAGES = ("binpacking", "solutions_helper", "numpy", "numba", "llvmlite")
+# Maximal time to import them once NumPy and Numba are loaded, with a built kernel cache
+IMPORT_TIME_BUDGET = 1.5
+
+@contextmanager
+def timed_phase(name):
+    """
+    Measure the time spent in a phase of the start of the program, recorded in STARTUP_TIMES.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMES[name] = STARTUP_TIMES.get(name, 0.0) + time.perf_counter() - start
+
+def print_startup_times():
+    """
+    Print the time spent in each phase of the start of the program.
+    """
+    if not STARTUP_TIMES:
+        return
+
+    name_length = max(len(name) for name in STARTUP_TIMES)
+    print("=========================== Startup ===========================")
+    for name, duration in STARTUP_TIMES.items():
+        print(f"{name:>{name_length}} -> {duration:<8.4f} seconds")
+    print(f"{'Total':>{name_length}} -> {sum(STARTUP_TIMES.values()):<8.4f} seconds")
+    print("===============================================================\n", flush=True)
+
+def kernel_cache_directory():
+    """
+    The directory of the kernel cache manifest: NUMBA_CACHE_DIR if it is set, else the __pycache__ of the package,
+    where Numba writes the compiled kernels by default. The instrumentation build has its own subdirectory.
+    """
+    return config.CACHE_DIR or os.path.join(PACKAGE_DIRECTORY, "__pycache__")
+
+def hash_sources():
+    """
+    Hash the source files of the package defining kernels, the other files don't change the compiled code.
+
+    Returns:
+    - dict: The SHA-256 of each source file defining kernels, by path relative to the package.
+    """
+    hashes = {}
+    for directory, _, files in os.walk(PACKAGE_DIRECTORY):
+        for file in files:
+            if file.endswith(".py"):
+                path = os.path.join(directory, file)
+                with open(path, "rb") as source:
+                    content = source.read()
+                if re.search(rb"^@njit", content, re.MULTILINE):
+                    hashes[os.path.relpath(path, PACKAGE_DIRECTORY).replace(os.sep, "/")] = hashlib.sha256(content).hexdigest()
+
+    return dict(sorted(hashes.items()))
+
+def cache_environment():
+    """
+    Describe what the compiled code depends on besides the sources: the versions of Python, NumPy and Numba, and
+    the target of the compiler (triple, CPU name and CPU features, see NUMBA_CPU_NAME), and the instrumentation build.
+
+    Returns:
+    - dict: The environment, JSON serializable.
+    """
+    from numba.core.registry import cpu_target
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'numba': numba.__version__,
+        'target': list(cpu_target.target_context.codegen().magic_tuple()),
+        'instrumentation': INSTRUMENTATION,
+    }
+
+def load_kernel_manifest():
+    """
+    Returns:
+    - dict: The manifest of the kernel cache, or None if there is none (or it is unreadable).
+    """
+    try:
+        with open(os.path.join(kernel_cache_directory(), MANIFEST_FILE)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def save_kernel_manifest(sources, environment, kernels=None):
+    """
+    Record which sources and environment the cached kernels were compiled from.
+
+    Parameters:
+    - sources (dict): The hashes of the source files (see hash_sources).
+    - environment (dict): The environment (see cache_environment).
+    - kernels (dict): The number of compiled signatures of each kernel, if the whole cache was built,
+                      else None for a cache only filled by the kernels compiled on first use.
+    """
+    directory = kernel_cache_directory()
+    os.makedirs(directory, exist_ok=True)
+
+    manifest = {'complete': kernels is not None, 'built': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'environment': environment, 'sources': sources, 'kernels': kernels or {}}
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as file:
+        json.dump(manifest, file, indent=2)
+
+def clear_kernel_cache():
+    """
+    Delete the compiled kernels of the package from the Numba cache.
+
+    Returns:
+    - int: The number of deleted files.
+    """
+    # The directory of the cache of each module
+    directories = {}
+    for file in hash_sources():
+        path = os.path.join(PACKAGE_DIRECTORY, file)
+        if config.CACHE_DIR:
+            directory = os.path.join(config.CACHE_DIR, UserProvidedCacheLocator.get_suitable_cache_subpath(path))
+        else:
+            directory = os.path.join(os.path.dirname(path), "__pycache__")
+        directories.setdefault(directory, set()).add(os.path.splitext(os.path.basename(path))[0])
+
+    nb_deleted = 0
+    for directory, modules in directories.items():
+        if not os.path.isdir(directory):
+            continue
+        for file in os.listdir(directory):
+            # Numba names the files "<module>.<function>-<line>.<python version>[.<index>].nbi/nbc"
+            if file.endswith(CACHE_EXTENSIONS) and file.split(".", 1)[0] in modules:
+                os.remove(os.path.join(directory, file))
+                nb_deleted += 1
+
+    return nb_deleted
+
+def check_kernel_cache(manifest, sources, environment):
+    """
+    Compare the kernel cache manifest to the current sources and environment.
+
+    Returns:
+    - tuple: The description of each problem found, and whether the cached kernels are stale.
+    """
+    if manifest is None:
+        return ["No kernel cache manifest, the kernels are compiled on first use"], True
+
+    problems = []
+    for key, value in environment.items():
+        if manifest['environment'].get(key) != value:
+            built_with = manifest['environment'].get(key)
+            if key == 'target':
+                built_with, value = built_with[:2] if built_with else None, value[:2]
+            problems.append(f"Kernels compiled for {key} {built_with}, running {value}")
+
+    changed = sorted(file for file in set(sources) | set(manifest['sources']) if sources.get(file) != manifest['sources'].get(file))
+    if changed:
+        problems.append(f"Sources changed since the kernels were compiled: {', '.join(changed)}")
+
+    stale = bool(problems)
+    if not stale and not manifest['complete']:
+        problems.append("The kernel cache isn't built, the kernels are compiled on first use")
+
+    return problems, stale
+
+def prepare_kernels():
+    """
+    Check the kernel cache before the kernels are loaded from it, so that it must be called before importing
+    the modules of the package holding kernels.
+
+    Numba only checks the source file of a kernel to know if its cache is outdated, not the files of the kernels it
+    calls, so a cache compiled from other sources can run outdated code. Such a cache is cleared and the kernels are
+    compiled again when first used, then the manifest records the current sources so that the processes started later
+    keep this cache.
+
+    Returns:
+    - list: The description of each problem found, empty if the kernel cache is built and up to date.
+    """
+    sources, environment = hash_sources(), cache_environment()
+    problems, stale = check_kernel_cache(load_kernel_manifest(), sources, environment)
+
+    if stale:
+        try:
+            clear_kernel_cache()
+            save_kernel_manifest(sources, environment)
+        except OSError as error:
+            problems.append(f"Can't clear the kernel cache: {error}")
+
+    return problems
+
+def compiled_kernels():
+    """
+    Returns:
+    - dict: The number of compiled signatures of each kernel of the loaded modules of the package.
+    """
+    kernels = {}
+    for name, module in sorted(sys.modules.items()):
+        if not name.startswith(__package__ + ".") or module is None:
+            continue
+        for attribute, value in vars(module).items():
+            if isinstance(value, numba.core.registry.CPUDispatcher) and value.__module__ == name:
+                kernels[f"{name}.{attribute}"] = len(value.signatures)
+
+    return kernels
+
+def build_kernel_cache(advanced=False):
+    """
+    Compile every kernel of the package into the Numba cache and record its manifest. The later runs load the
+    compiled kernels from the cache, for instance the containers started from an image where it was built.
+
+    Must run in a process which hasn't imported the kernels yet (see prepare_kernels).
+
+    Parameters:
+    - advanced (bool): If True, prints the compilation time of each kernel.
+
+    Returns:
+    - dict: The number of compiled signatures of each kernel.
+    """
+
+    if any(name in sys.modules for name in (f"{__package__}.structures", f"{__package__}.lgfi")):
+        raise RuntimeError("The kernel cache must be built before the kernels are imported")
+
+    sources, environment = hash_sources(), cache_environment()
+    clear_kernel_cache()
+
+    # Importing the kernels with an explicit signature compiles them
+    with timed_phase("Import and compilation"):
+        from binpacking.data_manager import create_items
+        from binpacking.genetic_algo.gen_algo import initialize_numba_functions
+        from binpacking.tabu_search import tabu_search
+
+    with timed_phase("Dummy calls"):
+        initialize_numba_functions(advanced)
+
+        # The tabu search kernels are compiled for the types of their first call
+        items = create_items(np.arange(1, 7), np.array([4, 3, 2, 2, 1, 5]), np.array([2, 3, 2, 1, 1, 5]))
+        tabu_search(items, (5, 5), 2, 2, 2.0, True, True, seed=0)
+        tabu_search(items, (5, 5), 20, 2, 2.0, True, True, seed=0, reactive=True, diversification_interval=1)
+
+    kernels = compiled_kernels()
+    save_kernel_manifest(sources, environment, kernels)
+
+    return kernels
+
+def check_headless_imports(budget=IMPORT_TIME_BUDGET):
+    """
+    Import the headless solve path in a new interpreter, and check that it only loads NumPy, Numba and the
+    standard library (no Matplotlib, Tkinter or tqdm) within the import time budget.
+
+    Parameters:
+    - budget (float): The maximal import time in seconds, NumPy and Numba excluded.
+
+    Returns:
+    - tuple: The description of each problem found, and the import time.
+    """
+    code = "\n".join([
+        "import json, sys, time",
+        "import numpy, numba",
+        "baseline = set(sys.modules)",
+        "start = time.perf_counter()",
+        f"import {', '.join(HEADLESS_MODULES)}",
+        "elapsed = time.perf_counter() - start",
+        "loaded = {name.split('.')[0] for name in set(sys.modules) - baseline} - set(sys.stdlib_module_names)",
+        "print(json.dumps({'time': elapsed, 'modules': sorted(loaded)}))",
+    ])
+    process = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(PACKAGE_DIRECTORY),
+                             capture_output=True, text=True)
+    if process.returncode != 0:
+        return [f"Can't import the headless modules: {process.stderr.strip().splitlines()[-1]}"], np.inf
+
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    problems = []
+
+    # Names like __mp_main__ are aliases of modules, not packages
+    unexpected = sorted(module for module in set(result['modules']) - set(ALLOWED_PACKAGES) if not module.startswith("__"))
+    if unexpected:
+        problems.append(f"The headless modules load optional packages: {', '.join(unexpected)}")
+    if result['time'] > budget:
+        problems.append(f"Importing the headless modules takes {result['time']:.3f} seconds, over the budget of {budget} seconds")
+
+    return problems, result['time']
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m binpacking.kernel_cache",
+                                     description="Build, check or clear the cache of compiled kernels "
+                                                 "(in NUMBA_CACHE_DIR if it is set), or check the imports "
+                                                 "of the headless solve path.")
+    parser.add_argument("command", choices=("build", "verify", "clear", "imports"))
+    parser.add_argument("--advanced", action="store_true", help="print the compilation time of each kernel")
+    arguments = parser.parse_args()
+
+    if arguments.command == "build":
+        kernels = build_kernel_cache(arguments.advanced)
+        print(f"Compiled {sum(kernels.values())} signatures of {len(kernels)} kernels into {kernel_cache_directory()}")
+        print_startup_times()
+
+    elif arguments.command == "verify":
+        problems, _ = check_kernel_cache(load_kernel_manifest(), hash_sources(), cache_environment())
+        for problem in problems:
+            print(problem)
+        if problems:
+            sys.exit(1)
+        print(f"The kernel cache in {kernel_cache_directory()} is built and up to date")
+
+    elif arguments.command == "clear":
+        print(f"Deleted {clear_kernel_cache()} files from the kernel cache")
+
+    else:
+        problems, import_time = check_headless_imports()
+        for problem in problems:
+            print(problem)
+        if problems:
+            sys.exit(1)
+        print(f"The headless modules import in {import_time:.3f} seconds, without optional packages")
+
+if __name__ == "__main__":
+    main()
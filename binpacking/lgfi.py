@@ -1,5 +1,18 @@
 from typing import Tuple
 from binpacking.structures import *
+from binpacking.bin_selection import get_candidate_bins
+
+# Columns of the fit index used by the Hybrid Fit splitting rule
+FIT_ID = 0
+FIT_WIDTH = 1
+FIT_HEIGHT = 2
+FIT_AREA = 3
+FIT_MIN_WIDTH = 4
+FIT_MIN_HEIGHT = 5
+FIT_MIN_SHORT = 6
+FIT_MIN_LONG = 7
+FIT_PLACED = 8
+NB_FIT_COLUMNS = 9
 
 @njit(from_dtype(Item)[:](from_dtype(Item)[:], int32), cache = True)
 def remove_item_from_remaining(remaining: np.ndarray, item_id: int) -> np.ndarray:
@@ -18,13 +31,14 @@ def remove_item_from_remaining(remaining: np.ndarray, item_id: int) -> np.ndarra
     
     return remaining
 
-@njit(int32(from_dtype(Bin)), cache = True)
-def find_current_position_idx(bin: np.ndarray) -> int:
+@njit(int32(from_dtype(Bin), from_dtype(DecoderCounters)), cache = True)
+def find_current_position_idx(bin: np.ndarray, counters: np.ndarray) -> int:
     """
     Find the index of the bottom leftmost free rectangle for placement in the bin.
 
     Parameters:
     - bin (np.ndarray): The bin being evaluated.
+    - counters (np.ndarray): The decoder counters, only updated by the instrumentation build.
 
     Returns:
     - (int): Index of the best free rectangle, or -1 if none are suitable.
@@ -36,8 +50,12 @@ def find_current_position_idx(bin: np.ndarray) -> int:
 
     for i in range(len(bin['list_of_free_rec'])):
         rec = bin['list_of_free_rec'][i]
+        if INSTRUMENTATION:
+            counters['free_rect_slots_scanned'] += 1
         if rec['width'] == 0:
             continue
+        if INSTRUMENTATION:
+            counters['free_rects_scanned'] += 1
         
         if best_free_rect_idx == -1 or rec['corner_y'] < lowest_y or \
            (rec['corner_y'] == lowest_y and rec['corner_x'] < lowest_x):
@@ -90,72 +108,119 @@ def spliting_process_guillotine(horizontal: bool, bin: np.ndarray, old_free_rect
     if changes == 0:
         remove_free_rect_from_bin(bin, old_free_rect)
         
-@njit(void(from_dtype(Bin)), cache = True)
-def merge_rec_guillotine(bin):
+@njit(int64(from_dtype(FreeRectangle)[:], int64, int64, int64), cache = True)
+def find_merge_partner(free_rects: np.ndarray, i: int, start: int, end: int) -> int:
+    """
+    Find the first free rectangle of a range sharing a whole edge with a given one.
+
+    Parameters:
+    - free_rects (np.ndarray): The free rectangles of the bin, the removed ones having a width of 0.
+    - i (int): Index of the free rectangle.
+    - start (int): Index of the first free rectangle to look at.
+    - end (int): Index after the last free rectangle to look at.
+
+    Returns:
+    - int: Index of the partner, or -1 if no free rectangle of the range can be merged with this one.
+    """
+    x, y, w, h = free_rects[i]['corner_x'], free_rects[i]['corner_y'], free_rects[i]['width'], free_rects[i]['height']
+    
+    for j in range(start, end):
+        other = free_rects[j]
+        if j == i or other['width'] == 0:
+            continue
+        
+        # One on top of the other, or side by side
+        if other['corner_x'] == x and other['width'] == w and \
+           (other['corner_y'] == y + h or other['corner_y'] + other['height'] == y):
+            return j
+        if other['corner_y'] == y and other['height'] == h and \
+           (other['corner_x'] == x + w or other['corner_x'] + other['width'] == x):
+            return j
+    
+    return -1
+
+@njit(void(from_dtype(Bin), int64, int64), cache = True)
+def merge_free_rects(bin: np.ndarray, i: int, j: int) -> None:
+    """
+    Merge a free rectangle into another one sharing a whole edge with it, and mark it as removed.
+
+    Parameters:
+    - bin (np.ndarray): The bin containing the free rectangles.
+    - i (int): Index of the free rectangle receiving the other one.
+    - j (int): Index of the merged free rectangle, removed.
+    """
+    first = bin['list_of_free_rec'][i]
+    second = bin['list_of_free_rec'][j]
+    
+    if first['width'] == second['width'] and first['corner_x'] == second['corner_x']:
+        first['corner_y'] = min(first['corner_y'], second['corner_y'])
+        first['height'] += second['height']
+    else:
+        first['corner_x'] = min(first['corner_x'], second['corner_x'])
+        first['width'] += second['width']
+    
+    second['width'] = 0
+
+@njit(void(from_dtype(Bin), from_dtype(DecoderCounters)), cache = True)
+def merge_rec_guillotine(bin, counters):
     """
     Merge free rectangles in the bin that can be combined either horizontally or vertically.
+    
+    Two free rectangles can be merged when they share a whole edge. Each pair of rectangles is compared
+    once. A merge only changes the rectangle receiving the other one, which is compared again with all the
+    others until it has no partner left, so the merges cascade locally instead of starting over from the
+    first rectangle. Merged rectangles are only marked, and the list is compacted once at the end.
 
     Parameters:
     - bin (np.ndarray): The bin containing the free rectangles.
+    - counters (np.ndarray): The decoder counters, only updated by the instrumentation build.
 
     Modifies the bin in-place by merging adjacent free rectangles to reduce fragmentation.
     """
     
+    if INSTRUMENTATION:
+        counters['merge_calls'] += 1
+    
     free_rects = bin['list_of_free_rec']
-    i = 0
-
-    while i < len(free_rects) and free_rects[i]['width'] > 0:
-
-        merged = False
-        first = free_rects[i] 
-        
-        # Try to find a rectangle that can be merged with 'first'
-        for j in range(i + 1, len(free_rects)):
-            
-            if free_rects[j]['width'] == 0:
-                break
-            
-            second = free_rects[j]
-            
-            # Check for vertical merge
-            if first['width'] == second['width'] and first['corner_x'] == second['corner_x']:
-    
-                # If the first is BELOW the second
-                if (first['corner_y'] + first['height'] == second['corner_y']):
-                    first['height'] += second['height']
-                    remove_free_rect_from_bin_by_idx(bin, j)
-                    merged = True
-                    break
-                
-                # If the first is ABOVE the second
-                if (second['corner_y'] + second['height'] == first['corner_y']):
-                    second['height'] += first['height']
-                    remove_free_rect_from_bin_by_idx(bin, i)
-                    merged = True
-                    break
-            
-            # Check for horizontal merge
-            if first['height'] == second['height'] and first['corner_y'] == second['corner_y']:
-                
-                # If the first is at the LEFT of the second
-                if (first['corner_x'] + first['width'] == second['corner_x']):
-                    first['width'] += second['width']
-                    remove_free_rect_from_bin_by_idx(bin, j)
-                    merged = True
-                    break
-                
-                # If the first is at the RIGTH of the second
-                if (second['corner_x'] + second['width'] == first['corner_x']):
-                    second['width'] += first['width']
-                    remove_free_rect_from_bin_by_idx(bin, i)
-                    merged = True
-                    break
+    
+    nb_free_rects = 0
+    while nb_free_rects < len(free_rects) and free_rects[nb_free_rects]['width'] > 0:
+        nb_free_rects += 1
+    
+    nb_merges = 0
+    for i in range(nb_free_rects):
+        if free_rects[i]['width'] == 0:
+            continue
         
-        # Start all over again if we merged something
-        i = 0 if merged else i+1
+        # The previous rectangles were already compared with this one
+        j = find_merge_partner(free_rects, i, i + 1, nb_free_rects)
+        while j != -1:
+            merge_free_rects(bin, i, j)
+            nb_merges += 1
+            if INSTRUMENTATION:
+                counters['merges'] += 1
+            j = find_merge_partner(free_rects, i, 0, nb_free_rects)
+    
+    if nb_merges == 0:
+        return
+    
+    # Compact the remaining rectangles once, keeping their order
+    count = 0
+    for i in range(nb_free_rects):
+        if free_rects[i]['width'] != 0:
+            if count != i:
+                free_rects[count] = free_rects[i]
+            count += 1
+    
+    for i in range(count, nb_free_rects):
+        free_rects[i]['width'] = 0
+        free_rects[i]['height'] = 0
+        free_rects[i]['corner_x'] = 0
+        free_rects[i]['corner_y'] = 0
         
-@njit(void(from_dtype(Bin), from_dtype(FreeRectangle), int32, int32), cache = True)
-def handle_wastage(bin: np.ndarray, current_free_rect: np.ndarray, current_y: int, vertical_gap: int) -> None:
+@njit(void(from_dtype(Bin), from_dtype(FreeRectangle), int32, int32, from_dtype(DecoderCounters)), cache = True)
+def handle_wastage(bin: np.ndarray, current_free_rect: np.ndarray, current_y: int, vertical_gap: int, 
+                   counters: np.ndarray) -> None:
     """
     Handle the situation where no items fit into the current free rectangle, potentially marking it as wasted.
 
@@ -164,6 +229,7 @@ def handle_wastage(bin: np.ndarray, current_free_rect: np.ndarray, current_y: in
     - current_free_rect (np.ndarray): The free rectangle that might be wasted.
     - current_y (int): The vertical starting point of the free rectangle.
     - vertical_gap (int): The height of the free rectangle.
+    - counters (np.ndarray): The decoder counters, only updated by the instrumentation build.
 
     Adjusts the free rectangle in the bin to account for wasted space.
     """
@@ -181,14 +247,15 @@ def handle_wastage(bin: np.ndarray, current_free_rect: np.ndarray, current_y: in
         current_free_rect['corner_y'] = current_y + wastage_height
         current_free_rect['height'] = vertical_gap - wastage_height
         
-        merge_rec_guillotine(bin)
+        merge_rec_guillotine(bin, counters)
         
     else:
         # Entire space is wasted, so remove it
         remove_free_rect_from_bin(bin, current_free_rect)
 
-@njit(UniTuple(int32, 2)(from_dtype(Item)[:], int32, int32, boolean), cache = True)
-def check_fit_and_rotation(items: np.ndarray, horizontal_gap: int, vertical_gap: int, rotation: bool) -> Tuple[int, bool]: 
+@njit(UniTuple(int32, 2)(from_dtype(Item)[:], int32, int32, boolean, from_dtype(DecoderCounters)), cache = True)
+def check_fit_and_rotation(items: np.ndarray, horizontal_gap: int, vertical_gap: int, rotation: bool, 
+                           counters: np.ndarray) -> Tuple[int, bool]: 
     """
     Check each item to see if it fits in the given gaps with or without rotation.
 
@@ -197,6 +264,7 @@ def check_fit_and_rotation(items: np.ndarray, horizontal_gap: int, vertical_gap:
     - horizontal_gap (int): The width of the current free space.
     - vertical_gap (int): The height of the current free space.
     - rotation (bool): Should the items be able to rotate
+    - counters (np.ndarray): The decoder counters, only updated by the instrumentation build.
 
     Returns:
     - (int): The index of the selectioned item. -1 otherwise.
@@ -212,6 +280,8 @@ def check_fit_and_rotation(items: np.ndarray, horizontal_gap: int, vertical_gap:
     for i in range(len(items)):
         
         current_item = items[i]
+        if INSTRUMENTATION:
+            counters['items_scanned'] += 1
         
         rotation_list = [False, True] if rotation else [False]
         
@@ -242,43 +312,133 @@ def check_fit_and_rotation(items: np.ndarray, horizontal_gap: int, vertical_gap:
     
     return best_fit_item_idx, best_fit_rotated
 
-@njit(UniTuple(float64, 2)(from_dtype(FreeRectangle)[:], from_dtype(Item)[:], from_dtype(Item), boolean), cache=True)
-def count_items_fit(free_rects, items, best_fit_item, rotation):
+@njit(int64[:, :](from_dtype(Item)[:]), cache = True)
+def build_fit_index(items: np.ndarray) -> np.ndarray:
+    """
+    Precompute the dimensions of the items, sorted by increasing area, to answer the fit queries of the
+    Hybrid Fit splitting rule without scanning every item.
+
+    Each row also stores the minimal width, height, shorter and longer side of the items from this row
+    to the last one. A query can stop as soon as these minimums are too large for the free rectangle.
+
+    Parameters:
+    - items (np.ndarray): The items to be placed.
+
+    Returns:
+    - np.ndarray: The fit index, one row per item (see the FIT_* columns).
+    """
+    
+    n = len(items)
+    fit_index = np.zeros((n, NB_FIT_COLUMNS), dtype=np.int64)
+    
+    areas = items['width'].astype(np.int64) * items['height'].astype(np.int64)
+    order = np.argsort(areas, kind='mergesort')
+    
+    for row in range(n):
+        item = items[order[row]]
+        fit_index[row, FIT_ID] = item['id']
+        fit_index[row, FIT_WIDTH] = item['width']
+        fit_index[row, FIT_HEIGHT] = item['height']
+        fit_index[row, FIT_AREA] = areas[order[row]]
+    
+    for row in range(n - 1, -1, -1):
+        width, height = fit_index[row, FIT_WIDTH], fit_index[row, FIT_HEIGHT]
+        fit_index[row, FIT_MIN_WIDTH] = width
+        fit_index[row, FIT_MIN_HEIGHT] = height
+        fit_index[row, FIT_MIN_SHORT] = min(width, height)
+        fit_index[row, FIT_MIN_LONG] = max(width, height)
+        
+        if row < n - 1:
+            fit_index[row, FIT_MIN_WIDTH] = min(width, fit_index[row + 1, FIT_MIN_WIDTH])
+            fit_index[row, FIT_MIN_HEIGHT] = min(height, fit_index[row + 1, FIT_MIN_HEIGHT])
+            fit_index[row, FIT_MIN_SHORT] = min(min(width, height), fit_index[row + 1, FIT_MIN_SHORT])
+            fit_index[row, FIT_MIN_LONG] = min(max(width, height), fit_index[row + 1, FIT_MIN_LONG])
+    
+    return fit_index
+
+@njit(int64[:](int64[:, :]), cache = True)
+def build_fit_rows(fit_index: np.ndarray) -> np.ndarray:
+    """
+    Map the ID of each item to its row in the fit index, so a placed item is found without a scan.
+
+    Parameters:
+    - fit_index (np.ndarray): The fit index.
+
+    Returns:
+    - np.ndarray: The row of each item ID in the fit index, -1 for the IDs without a row.
+    """
+    
+    max_id = 0
+    for row in range(len(fit_index)):
+        max_id = max(max_id, fit_index[row, FIT_ID])
+    
+    fit_rows = np.full(max_id + 1, -1, dtype=np.int64)
+    for row in range(len(fit_index)):
+        fit_rows[fit_index[row, FIT_ID]] = row
+    
+    return fit_rows
+
+@njit(void(int64[:, :], int64[:], int32), cache = True)
+def mark_item_placed(fit_index: np.ndarray, fit_rows: np.ndarray, item_id: int) -> None:
+    """
+    Exclude a placed item from the fit queries.
+
+    Parameters:
+    - fit_index (np.ndarray): The fit index.
+    - fit_rows (np.ndarray): The row of each item ID in the fit index (see build_fit_rows).
+    - item_id (int): The ID of the placed item.
+    """
+    if 0 <= item_id < len(fit_rows) and fit_rows[item_id] != -1:
+        fit_index[fit_rows[item_id], FIT_PLACED] = 1
+
+@njit(UniTuple(float64, 2)(int64[:, :], int32, int32, boolean), cache = True)
+def count_items_fit(fit_index: np.ndarray, width: int, height: int, rotation: bool) -> Tuple[float, float]:
     """
-    Evaluate the relevance of a specific split direction based on items that can fit in the new free rectangles.
+    Evaluate a free rectangle created by a split, based on the unpacked items that can fit in it.
+    
+    The fit index is sorted by increasing area, so the first item that fits gives the best fill percentage.
     
     Parameters:
-    - free_rects: A numpy array of FreeRectangle objects representing the available empty space.
-    - items: A numpy array of Item objects representing the items to be placed.
-    - best_fit_item: A single Item object representing the item with the best fit.
-    - rotation: A boolean value indicating whether rotation is allowed for the items.
+    - fit_index (np.ndarray): The fit index of the unpacked items.
+    - width (int): The width of the free rectangle.
+    - height (int): The height of the free rectangle.
+    - rotation (bool): A boolean value indicating whether rotation is allowed for the items.
     
     Returns:
-    - A tuple of two float values: the best fill percentage and the number of rect where at least one item fit.
+    - A tuple of two float values: the best fill percentage and 1 if at least one item fits (0 otherwise).
     """
     
-    best_fill_pct = 0
-    split_fit = 0
-    for free_rect in free_rects:
-        fit = 0
-        for item in items:
-            if item['width'] != 0 and item['id'] != best_fit_item['id']:
-                if (free_rect['width'] >= item['width'] and free_rect['height'] >= item['height']) or \
-                    (rotation and free_rect['width'] >= item['height'] and free_rect['height'] >= item['width']):
-                    best_fill_pct = max(best_fill_pct, np.float64(free_rect['width'] * free_rect['height']) / np.float64(item['width'] * item['height']))
-                    fit = 1
-        split_fit += fit
-    return best_fill_pct, np.float64(split_fit)
+    short_side, long_side = min(width, height), max(width, height)
+    
+    for row in range(len(fit_index)):
+        
+        # None of the remaining items can fit
+        if rotation:
+            if fit_index[row, FIT_MIN_SHORT] > short_side or fit_index[row, FIT_MIN_LONG] > long_side:
+                break
+        elif fit_index[row, FIT_MIN_WIDTH] > width or fit_index[row, FIT_MIN_HEIGHT] > height:
+            break
+        
+        if fit_index[row, FIT_PLACED]:
+            continue
+        
+        item_width, item_height = fit_index[row, FIT_WIDTH], fit_index[row, FIT_HEIGHT]
+        if (item_width <= width and item_height <= height) or \
+            (rotation and item_height <= width and item_width <= height):
+            return np.float64(width * height) / np.float64(fit_index[row, FIT_AREA]), 1.0
+    
+    return 0.0, 0.0
 
-@njit(boolean(from_dtype(FreeRectangle), from_dtype(Item)[:], from_dtype(Item), boolean), cache=True)
-def choose_cut_orientation(current_free_rect, items, best_fit_item, rotation):
+@njit(boolean(from_dtype(FreeRectangle), from_dtype(Item), int64[:, :], boolean), cache = True)
+def choose_cut_orientation(current_free_rect: np.ndarray, best_fit_item: np.ndarray, fit_index: np.ndarray, rotation: bool) -> bool:
     """
-    Chooses the orientation of the cut (horizontal or vertical).
+    Chooses the orientation of the cut (horizontal or vertical) with the Hybrid Fit rule.
 
     Parameters:
     - current_free_rect (np.ndarray): The current free rectangle to be split.
-    - items (list of np.ndarray): The list of items to be placed.
     - best_fit_item (np.ndarray): The best fit item to be placed.
+    - fit_index (np.ndarray): The fit index of the unpacked items, without the best fit item.
+    - rotation (bool): Should the items be able to rotate
 
     Returns:
     - bool: True if the horizontal cut is preferred, False otherwise.
@@ -286,37 +446,18 @@ def choose_cut_orientation(current_free_rect, items, best_fit_item, rotation):
     new_horizontal_gap = current_free_rect['width'] - best_fit_item['width']
     new_vertical_gap = current_free_rect['height'] - best_fit_item['height']
     
-    cf_x, cf_y = current_free_rect['corner_x'], current_free_rect['corner_y']
     cf_w, cf_h = current_free_rect['width'], current_free_rect['height']
     bfi_w, bfi_h = best_fit_item['width'], best_fit_item['height']
     
+    # Horizontal split: full width rectangle on top, item height rectangle on the right
+    top_fill_pct, top_fit = count_items_fit(fit_index, cf_w, new_vertical_gap, rotation)
+    right_fill_pct, right_fit = count_items_fit(fit_index, new_horizontal_gap, bfi_h, rotation)
+    horizontal_best_fill_pct, horizontal_split_fit = max(top_fill_pct, right_fill_pct), top_fit + right_fit
     
-    # Correctly create horizontal split rectangles
-    horizontal_split_rects = np.empty(2, dtype=FreeRectangle)
-    horizontal_split_rects[0]['corner_x'] = cf_x
-    horizontal_split_rects[0]['corner_y'] = cf_y + bfi_h
-    horizontal_split_rects[0]['width'] = cf_w
-    horizontal_split_rects[0]['height'] = new_vertical_gap
-    
-    horizontal_split_rects[1]['corner_x'] = cf_x + bfi_w
-    horizontal_split_rects[1]['corner_y'] = cf_y
-    horizontal_split_rects[1]['width'] = new_horizontal_gap
-    horizontal_split_rects[1]['height'] = bfi_h
-    
-    # Correctly create vertical split rectangles
-    vertical_split_rects = np.empty(2, dtype=FreeRectangle)
-    vertical_split_rects[0]['corner_x'] = cf_x + bfi_w
-    vertical_split_rects[0]['corner_y'] = cf_y
-    vertical_split_rects[0]['width'] = new_horizontal_gap
-    vertical_split_rects[0]['height'] = cf_h
-    
-    vertical_split_rects[1]['corner_x'] = cf_x
-    vertical_split_rects[1]['corner_y'] = cf_y + bfi_h
-    vertical_split_rects[1]['width'] = bfi_w
-    vertical_split_rects[1]['height'] = new_vertical_gap
-    
-    horizontal_best_fill_pct, horizontal_split_fit = count_items_fit(horizontal_split_rects, items, best_fit_item, rotation)
-    vertical_best_fill_pct, vertical_split_fit = count_items_fit(vertical_split_rects, items, best_fit_item, rotation)
+    # Vertical split: full height rectangle on the right, item width rectangle on top
+    right_fill_pct, right_fit = count_items_fit(fit_index, new_horizontal_gap, cf_h, rotation)
+    top_fill_pct, top_fit = count_items_fit(fit_index, bfi_w, new_vertical_gap, rotation)
+    vertical_best_fill_pct, vertical_split_fit = max(top_fill_pct, right_fill_pct), top_fit + right_fit
     
     if horizontal_split_fit > vertical_split_fit:
         return True
@@ -325,24 +466,64 @@ def choose_cut_orientation(current_free_rect, items, best_fit_item, rotation):
     else:
         return horizontal_best_fill_pct > vertical_best_fill_pct
 
-@njit(void(from_dtype(Bin), from_dtype(Item)[:], from_dtype(FreeRectangle), from_dtype(Item), boolean, int32, int32, boolean, boolean), cache = True)
-def perform_placement(bin: np.ndarray, items: np.ndarray, current_free_rect: np.ndarray, best_fit_item: np.ndarray, best_fit_rotated: bool, 
-                      current_x: int, current_y: int, guillotine_cut: bool, rotation: bool) -> None:
+@njit(boolean(from_dtype(FreeRectangle), from_dtype(Item), int64[:, :], boolean, int32), cache = True)
+def is_split_horizontal(current_free_rect: np.ndarray, best_fit_item: np.ndarray, fit_index: np.ndarray, 
+                        rotation: bool, split_rule: int) -> bool:
     """
-    Place the selected item into the bin, performing necessary updates to the free rectangles.
+    Decide the orientation of the guillotine cut with the selected splitting rule.
     
-    Splitting rule (Shorter Leftover): The guillotine cut is horizontal if the remaining horizontal space
-    is smaller than the remaining vertical space, and vertical otherwise.
+    Splitting rules:
+    - Shorter Leftover: horizontal if the remaining horizontal space is smaller than the remaining vertical space.
+    - Longer Leftover: horizontal if the remaining horizontal space is larger or equal.
+    - Min Area: horizontal if it makes the smallest of the two new free rectangles as small as possible.
+    - Max Area: the opposite of Min Area.
+    - Hybrid Fit: see choose_cut_orientation.
+
+    Parameters:
+    - current_free_rect (np.ndarray): The free rectangle where the item is placed.
+    - best_fit_item (np.ndarray): The placed item (already rotated).
+    - fit_index (np.ndarray): The fit index of the unpacked items, only used by the Hybrid Fit rule.
+    - rotation (bool): Should the items be able to rotate
+    - split_rule (int): One of the *_SPLIT constants.
+
+    Returns:
+    - bool: True if the horizontal cut is preferred, False otherwise.
+    """
+    
+    new_horizontal_gap = current_free_rect['width'] - best_fit_item['width']
+    new_vertical_gap = current_free_rect['height'] - best_fit_item['height']
+    
+    if split_rule == LONGER_LEFTOVER_SPLIT:
+        return new_horizontal_gap >= new_vertical_gap
+    if split_rule == MIN_AREA_SPLIT:
+        return new_horizontal_gap * best_fit_item['height'] > new_vertical_gap * best_fit_item['width']
+    if split_rule == MAX_AREA_SPLIT:
+        return new_horizontal_gap * best_fit_item['height'] <= new_vertical_gap * best_fit_item['width']
+    if split_rule == HYBRID_FIT_SPLIT:
+        return choose_cut_orientation(current_free_rect, best_fit_item, fit_index, rotation)
+    
+    return new_horizontal_gap < new_vertical_gap
+
+@njit(void(from_dtype(Bin), from_dtype(FreeRectangle), from_dtype(Item), boolean, int32, int32, boolean, boolean, int32, int64[:, :], int64[:], from_dtype(DecoderCounters)), cache = True)
+def perform_placement(bin: np.ndarray, current_free_rect: np.ndarray, best_fit_item: np.ndarray, best_fit_rotated: bool, 
+                      current_x: int, current_y: int, guillotine_cut: bool, rotation: bool, split_rule: int, 
+                      fit_index: np.ndarray, fit_rows: np.ndarray, counters: np.ndarray) -> None:
+    """
+    Place the selected item into the bin, performing necessary updates to the free rectangles.
 
     Parameters:
     - bin (np.ndarray): The bin where the item is being placed.
-    - items (np.ndarray): The list of items to be placed. (Including the item to be placed)
     - current_free_rect (np.ndarray): The free rectangle where the item will be placed.
     - best_fit_item (np.ndarray): The item to be placed.
     - best_fit_rotated (bool): Indicates if the item needs to be rotated for placement.
     - current_x (int): The horizontal starting point of the placement.
     - current_y (int): The vertical starting point of the placement.
     - guillotine_cut (bool): Should the guillotine cut rule be applied.
+    - rotation (bool): Should the items be able to rotate
+    - split_rule (int): The rule deciding the orientation of the guillotine cut (one of the *_SPLIT constants).
+    - fit_index (np.ndarray): The fit index of the unpacked items (may be empty if the split rule doesn't use it).
+    - fit_rows (np.ndarray): The row of each item ID in the fit index (see build_fit_rows).
+    - counters (np.ndarray): The decoder counters, only updated by the instrumentation build.
     """
     
     if best_fit_rotated:
@@ -351,26 +532,21 @@ def perform_placement(bin: np.ndarray, items: np.ndarray, current_free_rect: np.
 
     
     add_item_to_bin(bin, best_fit_item, current_x, current_y)
+    mark_item_placed(fit_index, fit_rows, best_fit_item['id'])
 
     new_horizontal_gap = current_free_rect['width'] - best_fit_item['width']
     new_vertical_gap = current_free_rect['height'] - best_fit_item['height']
     
-    # Splitting rule: Shorter Leftover
-    guillotine_horizontal = (new_horizontal_gap < new_vertical_gap) if guillotine_cut else False
-    
-    # Slitting rule: Min Area
-    # guillotine_horizontal = (new_horizontal_gap * best_fit_item['height'] > new_vertical_gap * best_fit_item['width']) if guillotine_cut else False
-    
-    # Slitting rule: Custom Hybrid Fit
-    # guillotine_horizontal = choose_cut_orientation(current_free_rect, items, best_fit_item, rotation) if guillotine_cut else False
+    guillotine_horizontal = is_split_horizontal(current_free_rect, best_fit_item, fit_index, rotation, split_rule) if guillotine_cut else False
 
     spliting_process_guillotine(guillotine_horizontal, bin, current_free_rect, best_fit_item)
 
     if new_horizontal_gap > 0 and new_vertical_gap > 0 and not guillotine_cut:
-        merge_rec_guillotine(bin)
+        merge_rec_guillotine(bin, counters)
 
-@njit(int32(from_dtype(Bin), from_dtype(Item)[:], boolean, boolean), cache = True)
-def insert_item_lgfi(bin: np.ndarray, items: np.ndarray, guillotine_cut: bool, rotation: bool) -> int:
+@njit(int32(from_dtype(Bin), from_dtype(Item)[:], boolean, boolean, int32, int64[:, :], int64[:], from_dtype(DecoderCounters)), cache = True)
+def insert_item_lgfi(bin: np.ndarray, items: np.ndarray, guillotine_cut: bool, rotation: bool, split_rule: int, 
+                     fit_index: np.ndarray, fit_rows: np.ndarray, counters: np.ndarray) -> int:
     """
     Attempt to insert an item into the given bin by finding the best fitting position.
 
@@ -379,12 +555,19 @@ def insert_item_lgfi(bin: np.ndarray, items: np.ndarray, guillotine_cut: bool, r
     - items (np.ndarray): Array of items to be placed.
     - guillotine_cut (bool): Should the guillotine cut rule be applied.
     - rotation (bool): Should the items be able to rotate
+    - split_rule (int): The rule deciding the orientation of the guillotine cut (one of the *_SPLIT constants).
+    - fit_index (np.ndarray): The fit index of the unpacked items (may be empty if the split rule doesn't use it).
+    - fit_rows (np.ndarray): The row of each item ID in the fit index (see build_fit_rows).
+    - counters (np.ndarray): The decoder counters, only updated by the instrumentation build.
 
     Returns:
     - int: The ID of the item that was inserted, or -1 if the insertion was unsuccessful.
     """
     
-    current_free_rect_idx = find_current_position_idx(bin)
+    if INSTRUMENTATION:
+        counters['bins_probed'] += 1
+    
+    current_free_rect_idx = find_current_position_idx(bin, counters)
     if current_free_rect_idx == -1:
         return -1
     
@@ -392,27 +575,31 @@ def insert_item_lgfi(bin: np.ndarray, items: np.ndarray, guillotine_cut: bool, r
     current_x, current_y = current_free_rect['corner_x'], current_free_rect['corner_y']
     horizontal_gap, vertical_gap = current_free_rect['width'], current_free_rect['height']
     
-    best_fit_item_id, best_fit_rotated = check_fit_and_rotation(items, horizontal_gap, vertical_gap, rotation)
+    best_fit_item_id, best_fit_rotated = check_fit_and_rotation(items, horizontal_gap, vertical_gap, rotation, counters)
     best_fit_item = get_item_by_id(items, best_fit_item_id)
     
     if best_fit_item['width'] == 0 or best_fit_item['height'] == 0:
+        if INSTRUMENTATION:
+            counters['failed_fits'] += 1
         
         if guillotine_cut:
             remove_free_rect_from_bin(bin, current_free_rect)
         else:
-            handle_wastage(bin, current_free_rect, current_y, vertical_gap)
+            handle_wastage(bin, current_free_rect, current_y, vertical_gap, counters)
             
         return -1
     
-    perform_placement(bin, items, current_free_rect, best_fit_item, best_fit_rotated, 
-                      current_x, current_y, guillotine_cut, rotation)
+    perform_placement(bin, current_free_rect, best_fit_item, best_fit_rotated, 
+                      current_x, current_y, guillotine_cut, rotation, split_rule, fit_index, fit_rows, counters)
     
     return best_fit_item_id
 
-@njit(from_dtype(Bin)[:](from_dtype(Item)[:], int32, int32, boolean, boolean), cache = True)
-def lgfi(items: np.ndarray, bin_width: int, bin_height: int, guillotine_cut: bool, rotation: bool) -> np.ndarray:
+@njit(from_dtype(Bin)[:](from_dtype(Item)[:], int32, int32, boolean, boolean, int32, int32, int32, from_dtype(DecoderCounters)), cache = True)
+def lgfi_with_counters(items: np.ndarray, bin_width: int, bin_height: int, guillotine_cut: bool, rotation: bool, 
+                       split_rule: int, bin_selection: int, open_bins: int, counters: np.ndarray) -> np.ndarray:
     """
-    Main function to apply the Level Guillotine Fit Insertion algorithm to pack items into bins.
+    Apply the Level Guillotine Fit Insertion algorithm to pack items into bins, counting the hot path events of the
+    decoder in the instrumentation build (see binpacking/instrumentation.py).
 
     Parameters:
     - items (np.ndarray): Array of items to be packed.
@@ -420,36 +607,95 @@ def lgfi(items: np.ndarray, bin_width: int, bin_height: int, guillotine_cut: boo
     - bin_height (int): The height of each new bin.
     - guillotine_cut (bool): Should the guillotine cut rule be applied.
     - rotation (bool): Should the items be able to rotate
+    - split_rule (int): The rule deciding the orientation of the guillotine cut (one of the *_SPLIT constants).
+    - bin_selection (int): FIRST_FIT_SELECTION or LAST_K_SELECTION, LGFI doesn't support BEST_FIT_SELECTION
+                           (see check_bin_selection).
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+    - counters (np.ndarray): The decoder counters (DecoderCounters), only updated by the instrumentation build.
 
     Returns:
     - list: A list of bins containing the packed items.
     """
     
+    if INSTRUMENTATION:
+        counters['decodes'] += 1
+    
     bins = np.empty(len(items), dtype=Bin)
     bin_count = 0
     unpacked_items = np.copy(items)
     
+    # Only the Hybrid Fit rule looks at the unpacked items
+    if guillotine_cut and split_rule == HYBRID_FIT_SPLIT:
+        fit_index = build_fit_index(items)
+    else:
+        fit_index = np.zeros((0, NB_FIT_COLUMNS), dtype=np.int64)
+    fit_rows = build_fit_rows(fit_index)
+    
     while unpacked_items.size > 0:
         
         item_id = -1
-        # Attempt to place an item in the existing bins
-        for i in range(bin_count):
+        start, end = get_candidate_bins(bin_count, bin_selection, open_bins)
+        
+        # Attempt to place an item in the open bins
+        for i in range(start, end):
             bin = bins[i]
-            item_id = insert_item_lgfi(bin, unpacked_items, guillotine_cut, rotation)
+            item_id = insert_item_lgfi(bin, unpacked_items, guillotine_cut, rotation, split_rule, fit_index, fit_rows, counters)
             
             # Numba Lists use copies and not views like standard Python
             bins[i] = bin
             
             # Remove the item from the remaining list if it has been placed
             if item_id != -1:
+                if INSTRUMENTATION:
+                    counters['placements'] += 1
+                
                 unpacked_items = remove_item_from_remaining(unpacked_items, item_id)
                 break
             
         if item_id == -1:
-            if bin_count == 0 or not np.any(np.array([bins[i]['list_of_free_rec'][0]['width'] != 0 for i in range(bin_count)], dtype=np.bool_)):
+            # Open a new bin once no open bin has free space left
+            has_free_space = False
+            for i in range(start, end):
+                if bins[i]['list_of_free_rec'][0]['width'] != 0:
+                    has_free_space = True
+                    break
+            
+            if not has_free_space:
                 new_bin = create_bin(bin_count, bin_width, bin_height)
                 bins[bin_count] = new_bin
                 bin_count += 1
+                if INSTRUMENTATION:
+                    counters['bins_opened'] += 1
                 
     return bins[:bin_count]
-    
\ No newline at end of file
+    
+
+@njit(from_dtype(Bin)[:](from_dtype(Item)[:], int32, int32, boolean, boolean, int32, int32, int32), cache = True)
+def lgfi(items: np.ndarray, bin_width: int, bin_height: int, guillotine_cut: bool, rotation: bool, split_rule: int, 
+         bin_selection: int, open_bins: int) -> np.ndarray:
+    """
+    Main function to apply the Level Guillotine Fit Insertion algorithm to pack items into bins.
+
+    Parameters:
+    - items (np.ndarray): Array of items to be packed.
+    - bin_width (int): The width of each new bin.
+    - bin_height (int): The height of each new bin.
+    - guillotine_cut (bool): Should the guillotine cut rule be applied.
+    - rotation (bool): Should the items be able to rotate
+    - split_rule (int): The rule deciding the orientation of the guillotine cut (one of the *_SPLIT constants).
+    - bin_selection (int): FIRST_FIT_SELECTION or LAST_K_SELECTION, LGFI doesn't support BEST_FIT_SELECTION
+                           (see check_bin_selection).
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+
+    Returns:
+    - list: A list of bins containing the packed items.
+    """
+    
+    # The counters of a single decode aren't reported, the normal build doesn't even touch them
+    if INSTRUMENTATION:
+        counters = np.zeros(1, dtype=DecoderCounters)[0]
+    else:
+        counters = UNREPORTED_COUNTERS[0]
+    
+    return lgfi_with_counters(items, bin_width, bin_height, guillotine_cut, rotation, split_rule, bin_selection, 
+                              open_bins, counters)
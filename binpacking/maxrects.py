@@ -0,0 +1,241 @@
+from typing import Tuple
+from binpacking.structures import *
+from binpacking.bin_selection import get_candidate_bins, update_best_fit_order
+
+@njit(UniTuple(int32, 2)(from_dtype(FreeRectangle)[:], int32, int32, int32, boolean), cache = True)
+def find_maxrects_position(free_rects: np.ndarray, nb_free_rects: int, width: int, height: int,
+                           rotation: bool) -> Tuple[int, bool]:
+    """
+    Find the free rectangle giving the bottom leftmost position for an item.
+
+    Parameters:
+    - free_rects (np.ndarray): The maximal free rectangles of the bin.
+    - nb_free_rects (int): Number of free rectangles in use.
+    - width (int): The width of the item.
+    - height (int): The height of the item.
+    - rotation (bool): Should the items be able to rotate
+
+    Returns:
+    - (int): Index of the selected free rectangle, -1 if the item doesn't fit anywhere.
+    - (bool): Whether the item needs to be rotated.
+    """
+
+    best_idx = -1
+    best_rotated = False
+
+    for i in range(nb_free_rects):
+        rect = free_rects[i]
+
+        if best_idx != -1:
+            best = free_rects[best_idx]
+            if rect['corner_y'] > best['corner_y'] or \
+               (rect['corner_y'] == best['corner_y'] and rect['corner_x'] >= best['corner_x']):
+                continue
+
+        if width <= rect['width'] and height <= rect['height']:
+            best_idx = i
+            best_rotated = False
+        elif rotation and height <= rect['width'] and width <= rect['height']:
+            best_idx = i
+            best_rotated = True
+
+    return best_idx, best_rotated
+
+@njit(int32(from_dtype(FreeRectangle)[:], int32), cache = True)
+def prune_free_rects(free_rects: np.ndarray, nb_free_rects: int) -> int:
+    """
+    Remove the free rectangles contained in another one, so that only maximal rectangles remain.
+
+    Parameters:
+    - free_rects (np.ndarray): The free rectangles of the bin.
+    - nb_free_rects (int): Number of free rectangles in use.
+
+    Returns:
+    - int: The new number of free rectangles, which are compacted at the start of the array.
+    """
+
+    removed = np.zeros(nb_free_rects, dtype=np.bool_)
+
+    for i in range(nb_free_rects):
+        if removed[i]:
+            continue
+        a = free_rects[i]
+        for j in range(nb_free_rects):
+            if i == j or removed[j]:
+                continue
+            b = free_rects[j]
+
+            if a['corner_x'] >= b['corner_x'] and a['corner_y'] >= b['corner_y'] and \
+               a['corner_x'] + a['width'] <= b['corner_x'] + b['width'] and \
+               a['corner_y'] + a['height'] <= b['corner_y'] + b['height']:
+                removed[i] = True
+                break
+
+    count = 0
+    for i in range(nb_free_rects):
+        if not removed[i]:
+            free_rects[count] = free_rects[i]
+            count += 1
+
+    return count
+
+@njit(from_dtype(FreeRectangle)[:](from_dtype(FreeRectangle)[:], int32, int32, int32, int32, int32), cache = True)
+def split_free_rects(free_rects: np.ndarray, nb_free_rects: int, x: int, y: int, width: int, height: int) -> np.ndarray:
+    """
+    Split every free rectangle overlapping a newly placed item into the (up to 4) maximal rectangles
+    around the item.
+
+    Parameters:
+    - free_rects (np.ndarray): The free rectangles of the bin.
+    - nb_free_rects (int): Number of free rectangles in use.
+    - x (int): The x coordinate of the item.
+    - y (int): The y coordinate of the item.
+    - width (int): The width of the item.
+    - height (int): The height of the item.
+
+    Returns:
+    - np.ndarray: The new free rectangles (not yet pruned).
+    """
+
+    new_free_rects = np.empty(4 * nb_free_rects, dtype=FreeRectangle)
+    count = 0
+
+    for i in range(nb_free_rects):
+        rect = free_rects[i]
+        rx, ry, rw, rh = rect['corner_x'], rect['corner_y'], rect['width'], rect['height']
+
+        if x >= rx + rw or x + width <= rx or y >= ry + rh or y + height <= ry:
+            new_free_rects[count] = rect
+            count += 1
+            continue
+
+        # Left side
+        if x > rx:
+            new_free_rects[count] = create_free_rectangle(rx, ry, x - rx, rh)
+            count += 1
+        # Right side
+        if x + width < rx + rw:
+            new_free_rects[count] = create_free_rectangle(x + width, ry, rx + rw - x - width, rh)
+            count += 1
+        # Bottom side
+        if y > ry:
+            new_free_rects[count] = create_free_rectangle(rx, ry, rw, y - ry)
+            count += 1
+        # Top side
+        if y + height < ry + rh:
+            new_free_rects[count] = create_free_rectangle(rx, y + height, rw, ry + rh - y - height)
+            count += 1
+
+    return new_free_rects[:count]
+
+@njit(from_dtype(Bin)[:](from_dtype(Item)[:], int32, int32, boolean, int32, int32), cache = True)
+def maxrects(items: np.ndarray, bin_width: int, bin_height: int, rotation: bool, bin_selection: int, open_bins: int) -> np.ndarray:
+    """
+    Pack items into bins with the MaxRects Bottom-Left heuristic.
+
+    Each bin keeps the list of its maximal free rectangles, which may overlap. Items are taken in the
+    given order and each one is placed at the lowest position of the first bin where it fits, the bins
+    being tried in the order of the bin selection policy.
+    Unlike a guillotine split, no space is lost when placing an item, but the packing isn't guillotine.
+
+    Parameters:
+    - items (np.ndarray): Array of items to be packed.
+    - bin_width (int): The width of each new bin.
+    - bin_height (int): The height of each new bin.
+    - rotation (bool): Should the items be able to rotate
+    - bin_selection (int): The policy choosing the bin receiving the next item (one of the *_SELECTION constants).
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+
+    Returns:
+    - np.ndarray: The bins containing the packed items.
+    """
+
+    n = len(items)
+    bins = np.empty(n, dtype=Bin)
+    capacity = 4 * MAX_ITEMS
+    free_rects = np.zeros((n, capacity), dtype=FreeRectangle)
+    nb_free_rects = np.zeros(n, dtype=np.int32)
+    nb_items = np.zeros(n, dtype=np.int32)
+    bin_count = 0
+
+    # Order in which the bins are tried, only rearranged by the Best Fit policy
+    bin_order = np.arange(n).astype(np.int32)
+    residual_areas = np.full(n, np.int64(bin_width) * np.int64(bin_height))
+
+    for k in range(n):
+        item = items[k]
+
+        best_bin = -1
+        best_idx = -1
+        best_rotated = False
+
+        start, end = get_candidate_bins(bin_count, bin_selection, open_bins)
+        for position in range(start, end):
+            i = bin_order[position]
+            if nb_items[i] == MAX_ITEMS:
+                continue
+
+            best_idx, best_rotated = find_maxrects_position(free_rects[i], nb_free_rects[i],
+                                                            item['width'], item['height'], rotation)
+            if best_idx != -1:
+                best_bin = i
+                if bin_selection == BEST_FIT_SELECTION:
+                    update_best_fit_order(bin_order, residual_areas, position,
+                                          np.int64(item['width']) * np.int64(item['height']))
+                break
+
+        if best_bin == -1:
+            bins[bin_count] = create_bin(bin_count, bin_width, bin_height)
+            free_rects[bin_count][0] = bins[bin_count]['list_of_free_rec'][0]
+            nb_free_rects[bin_count] = 1
+
+            best_idx, best_rotated = find_maxrects_position(free_rects[bin_count], 1,
+                                                            item['width'], item['height'], rotation)
+            if best_idx == -1:
+                raise ValueError("An item is larger than the bins")
+
+            best_bin = bin_count
+            if bin_selection == BEST_FIT_SELECTION:
+                update_best_fit_order(bin_order, residual_areas, bin_count,
+                                      np.int64(item['width']) * np.int64(item['height']))
+            bin_count += 1
+
+        placed_item = create_item(item['id'], item['width'], item['height'])
+        placed_item['rotated'] = item['rotated']
+        if best_rotated:
+            placed_item['width'], placed_item['height'] = item['height'], item['width']
+            placed_item['rotated'] = not item['rotated']
+
+        rect = free_rects[best_bin][best_idx]
+        x, y = rect['corner_x'], rect['corner_y']
+
+        bin = bins[best_bin]
+        add_item_to_bin(bin, placed_item, x, y)
+        bins[best_bin] = bin
+        nb_items[best_bin] += 1
+
+        new_free_rects = split_free_rects(free_rects[best_bin], nb_free_rects[best_bin],
+                                          x, y, placed_item['width'], placed_item['height'])
+        count = prune_free_rects(new_free_rects, len(new_free_rects))
+
+        # Grow the storage of every bin if this one has too many free rectangles
+        if count > capacity:
+            capacity = 2 * count
+            grown = np.zeros((n, capacity), dtype=FreeRectangle)
+            grown[:, :free_rects.shape[1]] = free_rects
+            free_rects = grown
+
+        free_rects[best_bin][:count] = new_free_rects[:count]
+        nb_free_rects[best_bin] = count
+
+    for i in range(bin_count):
+        bin = bins[i]
+        for j in range(MAX_ITEMS):
+            if j < nb_free_rects[i]:
+                bin['list_of_free_rec'][j] = free_rects[i][j]
+            else:
+                bin['list_of_free_rec'][j]['width'] = 0
+                bin['list_of_free_rec'][j]['height'] = 0
+        bins[i] = bin
+
+    return bins[:bin_count]
@@ -0,0 +1,339 @@
+import threading
+from concurrent.futures import Future
+
+from binpacking.structures import *
+from binpacking.lgfi import NB_FIT_COLUMNS, perform_placement
+from binpacking.decoder import decode
+from binpacking.population_generation import get_corresponding_sequence_by_id
+from binpacking.data_manager import solution_to_records
+from binpacking.process_pool import create_process_pool
+
+# Score of a free rectangle which can't hold the item
+NO_FIT = np.iinfo(np.int32).max
+
+@njit(int32(from_dtype(Bin)[:], int32, int32, int32, int32, boolean, boolean, int32), cache = True)
+def insert_item_online(bins: np.ndarray, nb_bins: int, item_id: int, width: int, height: int,
+                       guillotine_cut: bool, rotation: bool, split_rule: int) -> int:
+    """
+    Place an arriving item in the open bins, in the free rectangle where it leaves the shortest leftover side.
+
+    Unlike insert_item_lgfi, which only looks at the bottom-left free rectangle, every free rectangle of the
+    open bins is tried and none is wasted: the item never has to be chosen among other unpacked items.
+    The cost only depends on the number of open bins, not on the number of items packed so far.
+
+    Parameters:
+    - bins (np.ndarray): The open bins.
+    - nb_bins (int): Number of open bins at the start of the array.
+    - item_id (int): The ID of the item.
+    - width (int): The width of the item.
+    - height (int): The height of the item.
+    - guillotine_cut (bool): Should the guillotine cut rule be applied.
+    - rotation (bool): Should the items be able to rotate
+    - split_rule (int): The rule deciding the orientation of the guillotine cut (one of the *_SPLIT constants).
+
+    Returns:
+    - int: The index of the bin receiving the item, or -1 if it fits in none of them.
+    """
+
+    best_bin_idx = -1
+    best_rect_idx = -1
+    best_rotated = False
+    best_score = NO_FIT
+
+    for i in range(nb_bins):
+        # A bin holds at most MAX_ITEMS items
+        if bins[i]['items'][MAX_ITEMS - 1]['width'] != 0:
+            continue
+
+        free_rects = bins[i]['list_of_free_rec']
+        for j in range(len(free_rects)):
+            rect_width, rect_height = free_rects[j]['width'], free_rects[j]['height']
+            if rect_width == 0:
+                break
+
+            for rotated in (False, True):
+                if rotated and (not rotation or width == height):
+                    continue
+                item_width, item_height = (height, width) if rotated else (width, height)
+
+                if item_width <= rect_width and item_height <= rect_height:
+                    score = min(rect_width - item_width, rect_height - item_height)
+                    if score < best_score:
+                        best_bin_idx, best_rect_idx, best_rotated, best_score = i, j, rotated, score
+
+    if best_bin_idx == -1:
+        return -1
+
+    # The counters of an online placement aren't reported, the normal build doesn't even touch them
+    if INSTRUMENTATION:
+        counters = np.zeros(1, dtype=DecoderCounters)[0]
+    else:
+        counters = UNREPORTED_COUNTERS[0]
+
+    bin = bins[best_bin_idx]
+    free_rect = bin['list_of_free_rec'][best_rect_idx]
+    perform_placement(bin, free_rect, create_item(item_id, width, height), best_rotated, free_rect['corner_x'],
+                      free_rect['corner_y'], guillotine_cut, rotation, split_rule, np.zeros((0, NB_FIT_COLUMNS), dtype=np.int64),
+                      np.zeros(0, dtype=np.int64), counters)
+
+    # Numba Lists use copies and not views like standard Python
+    bins[best_bin_idx] = bin
+
+    return best_bin_idx
+
+def _reoptimize_items(items, ordering, bin_dimensions, guillotine_cut, rotation, split_rule, population_size,
+                      nb_generations, seed):
+    """
+    Search a better ordering of the items of the open bins inside the re-optimization process.
+    """
+    # Imported here, the packer itself doesn't need the metaheuristics
+    from binpacking.genetic_algo.gen_algo import genetic_algo
+
+    best_solution, _ = genetic_algo(items, bin_dimensions, population_size, nb_generations, crossover_rate=0.7,
+                                    mutation_rate=0.5, kappa=2.0, delta=1.0, guillotine_cut=guillotine_cut,
+                                    rotation=rotation, engine=LGFI_ENGINE, split_rule=split_rule, seed=seed,
+                                    initial_solutions=ordering)
+
+    return best_solution
+
+class OnlinePacker:
+    """
+    Pack items one at a time, as they arrive, with the LGFI placement primitives.
+
+    At most max_open_bins bins are open. An item goes to the free rectangle of the open bins where it fits best
+    (see insert_item_online), or to a new bin, which closes the oldest open bin if there are too many of them.
+    Closed bins never change, so the cost of an arrival doesn't grow with the number of packed items.
+
+    The open bins can be re-packed in a background process (reoptimize), every reoptimize_interval arrivals if
+    it isn't 0. The genetic algorithm starts from the current open bins, and its packing replaces them if it
+    uses fewer bins, or as many bins with more free space, and no item arrived in the meantime.
+    The bins emptied by a re-optimization are dropped, so the bin IDs may have gaps.
+    """
+
+    def __init__(self, bin_width, bin_height, guillotine_cut=True, rotation=True, split_rule=SHORTER_LEFTOVER_SPLIT,
+                 max_open_bins=3, reoptimize_interval=0, population_size=10, nb_generations=50, seed=None):
+        """
+        Parameters:
+        - bin_width (int): The width of each new bin.
+        - bin_height (int): The height of each new bin.
+        - guillotine_cut (bool): Should the guillotine cut rule be applied.
+        - rotation (bool): Should the items be able to rotate
+        - split_rule (int): The rule deciding the orientation of the guillotine cut. Hybrid Fit isn't supported,
+                            the upcoming items are unknown.
+        - max_open_bins (int): Number of bins kept open.
+        - reoptimize_interval (int): Number of arrivals between two re-optimizations (0 disables them).
+        - population_size (int): The population size of the re-optimizations.
+        - nb_generations (int): The number of generations of the re-optimizations.
+        - seed (int): Seed of the re-optimizations, None for non reproducible ones.
+        """
+
+        if split_rule == HYBRID_FIT_SPLIT:
+            raise ValueError("The Hybrid Fit splitting rule needs the unpacked items, it can't pack items online")
+        if max_open_bins < 1:
+            raise ValueError(f"max_open_bins must be at least 1, got {max_open_bins}")
+
+        self.bin_width = bin_width
+        self.bin_height = bin_height
+        self.guillotine_cut = guillotine_cut
+        self.rotation = rotation
+        self.split_rule = split_rule
+        self.max_open_bins = max_open_bins
+        self.reoptimize_interval = reoptimize_interval
+        self.population_size = population_size
+        self.nb_generations = nb_generations
+        self.seed = seed
+
+        # Open bins, oldest first, and closed bins in closing order
+        self._open_bins = np.empty(max_open_bins, dtype=Bin)
+        self._nb_open_bins = 0
+        self._closed_bins = np.empty(16, dtype=Bin)
+        self._nb_closed_bins = 0
+        self._next_bin_id = 0
+
+        # Original dimensions of the packed items, by ID
+        self._item_sizes = {}
+        self._nb_arrivals = 0
+
+        # Incremented by every change of the open bins, a re-optimization of an older state is discarded
+        self._version = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._reoptimization = None
+
+    def add_item(self, item_id, width, height):
+        """
+        Pack an arriving item.
+
+        Returns:
+        - int: The ID of the bin receiving the item. It is final once the bin is closed, a re-optimization may
+               move the items of the open bins.
+        """
+
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Item {item_id} must have a positive width and height, got {width}x{height}")
+        if not (width <= self.bin_width and height <= self.bin_height) and \
+           not (self.rotation and height <= self.bin_width and width <= self.bin_height):
+            raise ValueError(f"Item {item_id} ({width}x{height}) doesn't fit in a {self.bin_width}x{self.bin_height} bin")
+
+        with self._lock:
+            if item_id in self._item_sizes:
+                raise ValueError(f"Item {item_id} is already packed")
+
+            bin_idx = insert_item_online(self._open_bins, self._nb_open_bins, item_id, width, height,
+                                         self.guillotine_cut, self.rotation, self.split_rule)
+            if bin_idx == -1:
+                self._open_bin()
+                bin_idx = self._nb_open_bins - 1
+                insert_item_online(self._open_bins[bin_idx:], 1, item_id, width, height,
+                                   self.guillotine_cut, self.rotation, self.split_rule)
+
+            bin_id = int(self._open_bins[bin_idx]['id'])
+
+            # A bin which can't receive any other item is closed right away
+            bin = self._open_bins[bin_idx]
+            if bin['items'][MAX_ITEMS - 1]['width'] != 0 or bin['list_of_free_rec'][0]['width'] == 0:
+                self._close_bin(bin_idx)
+
+            self._item_sizes[item_id] = (width, height)
+            self._nb_arrivals += 1
+            self._version += 1
+            reoptimize = self.reoptimize_interval > 0 and self._nb_arrivals % self.reoptimize_interval == 0
+
+        if reoptimize:
+            self.reoptimize()
+
+        return bin_id
+
+    def _open_bin(self):
+        if self._nb_open_bins == self.max_open_bins:
+            self._close_bin(0)
+
+        # Built here rather than with create_bin, a record returned by a compiled function may not outlive it
+        new_bin = self._open_bins[self._nb_open_bins:self._nb_open_bins + 1]
+        new_bin[:] = np.zeros(1, dtype=Bin)
+        new_bin['id'], new_bin['width'], new_bin['height'] = self._next_bin_id, self.bin_width, self.bin_height
+        new_bin['list_of_free_rec'][:, 0]['width'] = self.bin_width
+        new_bin['list_of_free_rec'][:, 0]['height'] = self.bin_height
+        self._nb_open_bins += 1
+        self._next_bin_id += 1
+
+    def _close_bin(self, bin_idx):
+        if self._nb_closed_bins == len(self._closed_bins):
+            self._closed_bins = np.concatenate([self._closed_bins, np.empty(len(self._closed_bins), dtype=Bin)])
+
+        self._closed_bins[self._nb_closed_bins] = self._open_bins[bin_idx]
+        self._nb_closed_bins += 1
+
+        self._open_bins[bin_idx:self._nb_open_bins - 1] = self._open_bins[bin_idx + 1:self._nb_open_bins].copy()
+        self._nb_open_bins -= 1
+
+    def _open_items(self):
+        """
+        Returns:
+        - np.ndarray: The items of the open bins, with their original dimensions.
+        - np.ndarray: The id ordering replaying the open bins (see records_to_orderings).
+        """
+        records = solution_to_records(self._open_bins[:self._nb_open_bins])
+
+        sizes = np.array([self._item_sizes[item_id] for item_id in records['id']], dtype=np.int32).reshape(-1, 2)
+        items = np.zeros(len(records), dtype=Item)
+        items['id'] = records['id']
+        items['width'], items['height'] = sizes[:, 0], sizes[:, 1]
+        items['corner_x'] = items['corner_y'] = -1
+        ordering = np.where(records['rotated'], -records['id'], records['id']).astype(np.int32)
+
+        return items, ordering
+
+    def reoptimize(self):
+        """
+        Start re-packing the open bins in a background process, unless a re-optimization is already running.
+
+        Returns:
+        - Future: The running re-optimization. Its result is True if its packing replaced the open bins, False
+                  if it was discarded. None if there are no open bins.
+        """
+
+        with self._lock:
+            if self._reoptimization is not None and not self._reoptimization.done():
+                return self._reoptimization
+            if self._nb_open_bins == 0:
+                return None
+
+            items, ordering = self._open_items()
+            version = self._version
+            reoptimization = self._reoptimization = Future()
+
+            if self._executor is None:
+                self._executor = create_process_pool(1)
+            executor = self._executor
+
+        search = executor.submit(_reoptimize_items, items, ordering, (self.bin_width, self.bin_height),
+                                 self.guillotine_cut, self.rotation, self.split_rule, self.population_size,
+                                 self.nb_generations, self.seed)
+        # Applied from a thread of the executor, the caller doesn't wait for the search
+        search.add_done_callback(lambda search: self._apply_reoptimization(search, items, version, reoptimization))
+
+        return reoptimization
+
+    def _apply_reoptimization(self, search, items, version, reoptimization):
+        try:
+            reoptimization.set_result(not search.cancelled() and self._replace_open_bins(search.result(), items, version))
+        except Exception as error:
+            reoptimization.set_exception(error)
+
+    def _replace_open_bins(self, ordering, items, version):
+        sequence = get_corresponding_sequence_by_id(items, ordering)
+        bins = decode(sequence, self.bin_width, self.bin_height, self.guillotine_cut, self.rotation, LGFI_ENGINE,
+                      self.split_rule, FIRST_FIT_SELECTION, 1)
+
+        with self._lock:
+            # Items arrived during the search, its packing is stale
+            if version != self._version:
+                return False
+
+            # Fewer bins, or more room for the next items
+            old_bins = self._open_bins[:self._nb_open_bins]
+            if (len(bins), -free_area(bins)) >= (self._nb_open_bins, -free_area(old_bins)):
+                return False
+
+            # The new bins take the IDs of the replaced ones
+            bins['id'] = np.sort(old_bins['id'])[:len(bins)]
+            self._open_bins[:len(bins)] = bins
+            self._nb_open_bins = len(bins)
+            self._version += 1
+
+            return True
+
+    def solution(self):
+        """
+        Returns:
+        - np.ndarray: A copy of the bins, closed ones first.
+        """
+        with self._lock:
+            return np.concatenate([self._closed_bins[:self._nb_closed_bins], self._open_bins[:self._nb_open_bins]])
+
+    def close(self):
+        """
+        Close every open bin and stop the re-optimization process.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+        with self._lock:
+            while self._nb_open_bins > 0:
+                self._close_bin(0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def free_area(bins):
+    """
+    Returns:
+    - int: The total area of the free rectangles of the bins.
+    """
+    free_rects = bins['list_of_free_rec']
+    return int(np.sum(free_rects['width'].astype(np.int64) * free_rects['height']))
@@ -1,5 +1,18 @@
 from binpacking.structures import *
 
+@njit(void(int64), cache = True)
+def set_seed(seed: int) -> None:
+    """
+    Seed the random generator used inside compiled functions.
+    
+    Numba keeps its own generator state, so calling np.random.seed from Python does not affect it.
+
+    Parameters:
+    - seed (int): The seed value.
+    """
+    
+    np.random.seed(seed)
+
 @njit(int32(int32[:], float64[:]), cache = True)
 def custom_choice(indices: np.ndarray, p: np.ndarray) -> int:
     """
@@ -0,0 +1,256 @@
+from numba import prange
+from numba.types import Tuple
+
+from binpacking.structures import *
+from binpacking.data_manager import records_to_solution, solution_to_records
+
+# Layouts of two items sharing a bin, returned by find_pair_layout
+NO_LAYOUT = -1
+SIDE_BY_SIDE = 0 # The second item on the right of the first one
+STACKED = 1 # The second item above the first one
+# Passes of the reductions, each one fixes at least an item and the data instances need at most 2
+MAX_REDUCTION_PASSES = 16
+
+@njit(UniTuple(int32, 3)(int32, int32, int32, int32, int32, int32, boolean), cache = True)
+def find_pair_layout(width_a: int, height_a: int, width_b: int, height_b: int, bin_width: int, bin_height: int,
+                     rotation: bool) -> tuple:
+    """
+    Find how two items can share a bin. Two rectangles which don't overlap are separated by a vertical or a
+    horizontal line, so two items fit in a bin if and only if they fit side by side or stacked, which is also a
+    guillotine packing.
+
+    Parameters:
+    - width_a, height_a (int): The dimensions of the first item.
+    - width_b, height_b (int): The dimensions of the second item.
+    - bin_width, bin_height (int): The dimensions of the bin.
+    - rotation (bool): Are the items allowed to rotate.
+
+    Returns:
+    - tuple: The layout (NO_LAYOUT if they can't share a bin, SIDE_BY_SIDE or STACKED), and whether the first and
+             the second item are rotated in it.
+    """
+
+    nb_orientations = 2 if rotation else 1
+
+    for rotate_a in range(nb_orientations):
+        placed_width_a, placed_height_a = (height_a, width_a) if rotate_a else (width_a, height_a)
+
+        for rotate_b in range(nb_orientations):
+            placed_width_b, placed_height_b = (height_b, width_b) if rotate_b else (width_b, height_b)
+
+            if placed_width_a + placed_width_b <= bin_width and max(placed_height_a, placed_height_b) <= bin_height:
+                return np.int32(SIDE_BY_SIDE), np.int32(rotate_a), np.int32(rotate_b)
+
+            if placed_height_a + placed_height_b <= bin_height and max(placed_width_a, placed_width_b) <= bin_width:
+                return np.int32(STACKED), np.int32(rotate_a), np.int32(rotate_b)
+
+    return np.int32(NO_LAYOUT), np.int32(0), np.int32(0)
+
+@njit(Tuple((int32[:], int32[:]))(from_dtype(Item)[:], boolean[:], int32, int32, boolean), parallel = True, cache = True)
+def count_partners(items: np.ndarray, active: np.ndarray, bin_width: int, bin_height: int,
+                   rotation: bool) -> tuple:
+    """
+    Count the active items each active item can share a bin with, up to 2: the reductions only need to know
+    whether an item has no partner, a single one or more.
+
+    Side by side or stacked, the short sides of two items sharing a bin add up to at most the long side of the
+    bin. The items are scanned by increasing short side, so the scan of an item stops at the first item too wide
+    to be its partner, and the small items, which have the most partners, come first: the scan also stops at the
+    second partner.
+
+    Parameters:
+    - items (np.ndarray): The items of the instance.
+    - active (np.ndarray): Which items are still in the instance.
+    - bin_width, bin_height (int): The dimensions of the bin.
+    - rotation (bool): Are the items allowed to rotate.
+
+    Returns:
+    - tuple: The number of partners of each item (0, 1 or 2 for 2 or more, 0 for the inactive items), and the
+             index of its first partner (-1 if it has none).
+    """
+
+    nb_items = len(items)
+    counts = np.zeros(nb_items, dtype=np.int32)
+    partners = np.full(nb_items, -1, dtype=np.int32)
+
+    short_sides = np.minimum(items['width'], items['height'])
+    order = np.argsort(short_sides)
+    max_short_sides = max(bin_width, bin_height)
+
+    for i in prange(nb_items):
+        if not active[i]:
+            continue
+
+        for position in range(nb_items):
+            j = order[position]
+            if short_sides[i] + short_sides[j] > max_short_sides:
+                break
+            if j == i or not active[j]:
+                continue
+
+            layout, _, _ = find_pair_layout(items[i]['width'], items[i]['height'], items[j]['width'], items[j]['height'],
+                                            bin_width, bin_height, rotation)
+            if layout != NO_LAYOUT:
+                if counts[i] == 0:
+                    partners[i] = j
+                counts[i] += 1
+                if counts[i] == 2:
+                    break
+
+    return counts, partners
+
+class InstanceReduction:
+    """
+    The items of an instance removed from the search by reduce_instance, packed in fixed bins, and the reduced
+    instance searched instead.
+
+    Attributes:
+    - items (np.ndarray): The items of the reduced instance, in canonical orientation if rotation is allowed.
+    - nb_items (int): Number of items of the original instance.
+    - fixed_records (np.ndarray): The SolutionRecord array of the fixed bins, numbered from 0.
+    - nb_single_bins (int): Number of fixed bins holding an item no other item fits with.
+    - nb_pair_bins (int): Number of fixed bins holding a pair of items.
+    """
+
+    def __init__(self, items, nb_items, swapped_ids, fixed_records, nb_single_bins, nb_pair_bins):
+        self.items = items
+        self.nb_items = nb_items
+        self.swapped_ids = swapped_ids
+        self.fixed_records = fixed_records
+        self.nb_single_bins = nb_single_bins
+        self.nb_pair_bins = nb_pair_bins
+
+    @property
+    def nb_fixed_bins(self):
+        return self.nb_single_bins + self.nb_pair_bins
+
+    @property
+    def nb_fixed_items(self):
+        return len(self.fixed_records)
+
+    def reduce_ordering(self, ordering):
+        """
+        Convert an id ordering of the original instance into an id ordering of the reduced one, to warm start a
+        search: the fixed items are dropped, and the rotation of the items in canonical orientation is flipped.
+
+        Parameters:
+        - ordering (np.ndarray): The id ordering of the original instance.
+
+        Returns:
+        - np.ndarray: The id ordering of the reduced instance.
+        """
+        ordering = np.asarray(ordering, dtype=np.int32)
+        ordering = ordering[np.isin(np.abs(ordering), self.items['id'])]
+
+        return np.where(np.isin(np.abs(ordering), self.swapped_ids), -ordering, ordering).astype(np.int32)
+
+    def restore_solution(self, bins):
+        """
+        Stitch the fixed bins and the bins of a solution of the reduced instance into a solution of the original one.
+
+        The fixed bins come first. The bins of the reduced solution are numbered after them, and the items in
+        canonical orientation are flagged rotated relative to their original orientation.
+
+        Parameters:
+        - bins (np.ndarray): The bins of a solution of the reduced instance (or a list of bins).
+
+        Returns:
+        - np.ndarray: The bins of the solution of the original instance.
+        """
+        records = solution_to_records(bins)
+        _, bin_index = np.unique(records['bin_id'], return_inverse=True)
+        records['bin_id'] = bin_index.reshape(-1) + self.nb_fixed_bins
+        records['rotated'] ^= np.isin(records['id'], self.swapped_ids)
+
+        return records_to_solution(np.concatenate((self.fixed_records, records)))
+
+def reduce_instance(items, bin_dimensions, rotation):
+    """
+    Remove from an instance the items whose bin is known in advance, without losing any optimal packing.
+
+    Two reductions are repeated until neither applies (at most MAX_REDUCTION_PASSES times), each on the items left
+    by the previous ones:
+    - An item no other item fits with (too large to pair, or filling the bin exactly) is alone in its bin in every
+      packing, it gets its own fixed bin.
+    - An item fitting with a single other item shares its bin with that item alone, or is alone. Moving the other
+      item into its bin never adds a bin, so some optimal packing holds the pair in a bin of its own.
+    The fixed bins hold one or two items side by side or stacked, which are guillotine packings.
+
+    If rotation is allowed, the remaining items are then put in a canonical orientation, landscape (width not
+    lower than height), so that the orientation an ordering gives to an item means the same for all the items.
+
+    Parameters:
+    - items (np.ndarray): The items of the instance.
+    - bin_dimensions (tuple): Tuple containing the width and height of the bin.
+    - rotation (bool): Are the items allowed to rotate.
+
+    Returns:
+    - InstanceReduction: The reduced instance and the fixed bins.
+    """
+
+    bin_width, bin_height = bin_dimensions
+
+    fits = (items['width'] <= bin_width) & (items['height'] <= bin_height)
+    if rotation:
+        fits |= (items['height'] <= bin_width) & (items['width'] <= bin_height)
+    if not np.all(fits):
+        raise ValueError("Some items don't fit in a bin")
+
+    active = np.ones(len(items), dtype=np.bool_)
+    fixed_bins = [] # Indices of the items of each fixed bin
+
+    changed = True
+    nb_passes = 0
+    while changed and nb_passes < MAX_REDUCTION_PASSES:
+        changed = False
+        nb_passes += 1
+        counts, partners = count_partners(items, active, bin_width, bin_height, rotation)
+
+        # The counts of the items whose partners are fixed during this pass are only updated by the next one
+        for i in np.flatnonzero(active & (counts < 2)):
+            if not active[i]:
+                continue
+
+            if counts[i] == 0:
+                fixed_bins.append((i,))
+                active[i] = False
+                changed = True
+            elif active[partners[i]]:
+                fixed_bins.append((i, partners[i]))
+                active[i] = active[partners[i]] = False
+                changed = True
+
+    fixed_records = np.zeros(sum(len(bin_items) for bin_items in fixed_bins), dtype=SolutionRecord)
+    record = 0
+    for bin_id, bin_items in enumerate(fixed_bins):
+        if len(bin_items) == 1:
+            item = items[bin_items[0]]
+            # Rotated only if it doesn't fit otherwise
+            rotated = item['width'] > bin_width or item['height'] > bin_height
+            placements = ((item, rotated, 0, 0),)
+        else:
+            item_a, item_b = items[bin_items[0]], items[bin_items[1]]
+            layout, rotate_a, rotate_b = find_pair_layout(item_a['width'], item_a['height'], item_b['width'],
+                                                          item_b['height'], bin_width, bin_height, rotation)
+            width_a, height_a = (item_a['height'], item_a['width']) if rotate_a else (item_a['width'], item_a['height'])
+            placements = ((item_a, rotate_a, 0, 0),
+                          (item_b, rotate_b, width_a, 0) if layout == SIDE_BY_SIDE else (item_b, rotate_b, 0, height_a))
+
+        for item, rotated, x, y in placements:
+            fixed_records[record] = (bin_id, bin_width, bin_height, item['id'],
+                                     item['height'] if rotated else item['width'],
+                                     item['width'] if rotated else item['height'], rotated, x, y)
+            record += 1
+
+    reduced_items = items[active].copy()
+    swapped_ids = np.zeros(0, dtype=np.int32)
+    if rotation:
+        swapped = reduced_items['height'] > reduced_items['width']
+        swapped_ids = reduced_items['id'][swapped].copy()
+        reduced_items['width'][swapped], reduced_items['height'][swapped] = \
+            reduced_items['height'][swapped], reduced_items['width'][swapped]
+
+    nb_pair_bins = sum(len(bin_items) == 2 for bin_items in fixed_bins)
+
+    return InstanceReduction(reduced_items, len(items), swapped_ids, fixed_records,
+                             len(fixed_bins) - nb_pair_bins, nb_pair_bins)
@@ -0,0 +1,47 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from numba import set_num_threads
+
+def count_workers(nb_jobs, nb_workers=None):
+    """
+    Number of worker processes running nb_jobs jobs.
+
+    Parameters:
+    - nb_jobs (int): Number of jobs to run.
+    - nb_workers (int): Number of worker processes asked for, None for the number of CPUs.
+
+    Returns:
+    - int: The number of worker processes, no more than the number of jobs.
+    """
+
+    return min(nb_jobs, nb_workers or os.cpu_count() or 1)
+
+def _init_worker(nb_threads, initializer, initargs):
+    """
+    Initialize a worker process: cap its Numba threads, then run the initializer of the pool.
+    """
+    set_num_threads(nb_threads)
+    if initializer is not None:
+        initializer(*initargs)
+
+def create_process_pool(nb_workers, initializer=None, initargs=()):
+    """
+    Create a pool of worker processes sharing the CPUs.
+
+    The workers are spawned, forking a process that already started Numba's thread pool is unsafe. Each
+    worker gets an equal share of the CPUs for its Numba threads, so that the workers don't oversubscribe them.
+
+    Parameters:
+    - nb_workers (int): Number of worker processes.
+    - initializer (callable): Picklable function run in each worker once its threads are capped, None for none.
+    - initargs (tuple): Arguments of the initializer.
+
+    Returns:
+    - ProcessPoolExecutor: The pool, to be shut down by the caller.
+    """
+
+    nb_threads = max(1, (os.cpu_count() or 1) // nb_workers)
+    return ProcessPoolExecutor(max_workers=nb_workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(nb_threads, initializer, initargs))
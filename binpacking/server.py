@@ -0,0 +1,441 @@
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from binpacking.structures import *
+from binpacking.data_manager import NumpyEncoder, create_items, solution_to_json
+from binpacking.decoder import check_bin_selection, check_placement_engine, decode
+from binpacking.fitness import compute_bin_lower_bound
+from binpacking.genetic_algo.gen_algo import genetic_algo
+from binpacking.population_generation import get_corresponding_sequence_by_id
+from binpacking.process_pool import count_workers, create_process_pool
+from binpacking.symmetry import canonical_ordering
+from binpacking.solve_control import SolveControl, allocate_control_blocks
+from binpacking.tabu_search import tabu_search
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Jobs queued or running at the same time, each one owns a control block
+MAX_ACTIVE_JOBS = 1024
+# Finished jobs kept for GET /jobs/<id>
+MAX_FINISHED_JOBS = 1024
+
+# Parameters of a request, and their default values
+DEFAULT_PARAMETERS = {
+    'metaheuristic': "ga",
+    'guillotine': True,
+    'rotation': True,
+    'engine': LGFI_ENGINE,
+    'split_rule': SHORTER_LEFTOVER_SPLIT,
+    'bin_selection': FIRST_FIT_SELECTION,
+    'open_bins': DEFAULT_OPEN_BINS,
+    'kappa': 2.0,
+    'seed': None,
+    'time_limit': None,
+    # Genetic algorithm
+    'population_size': 10,
+    'nb_generations': 100,
+    'crossover_rate': 0.7,
+    'mutation_rate': 0.5,
+    'delta': 1.0,
+    # Tabu search
+    'iteration_number': 100,
+    'tabu_list_size': 5,
+    'reactive': False,
+    'diversification_interval': 0,
+}
+
+# Type of each parameter, None is only accepted for the parameters defaulting to it
+PARAMETER_TYPES = {
+    'metaheuristic': str,
+    'guillotine': bool,
+    'rotation': bool,
+    'engine': int,
+    'split_rule': int,
+    'bin_selection': int,
+    'open_bins': int,
+    'kappa': float,
+    'seed': int,
+    'time_limit': float,
+    'population_size': int,
+    'nb_generations': int,
+    'crossover_rate': float,
+    'mutation_rate': float,
+    'delta': float,
+    'iteration_number': int,
+    'tabu_list_size': int,
+    'reactive': bool,
+    'diversification_interval': int,
+}
+
+# Largest item ID and dimension, the items are stored on 32 bits
+MAX_DIMENSION = np.iinfo(np.int32).max
+
+# Control blocks of the jobs shared with the parent process, set in each worker
+_worker_control_blocks = None
+
+def _init_solve_worker(control_blocks):
+    """
+    Initialize a solve worker process: share the control blocks of the jobs.
+    """
+    global _worker_control_blocks
+    _worker_control_blocks = control_blocks
+
+def _warm_up():
+    """
+    Load the compiled kernels of the common solve paths in a worker, from the Numba cache.
+    """
+    items = create_items(np.arange(1, 5), np.array([4, 3, 2, 2]), np.array([2, 3, 2, 1]))
+    for engine in (LGFI_ENGINE, SKYLINE_ENGINE, MAXRECTS_ENGINE):
+        genetic_algo(items, (5, 5), 2, 2, 0.5, 0.5, 2.0, 1.0, engine == LGFI_ENGINE, True, engine=engine, seed=0,
+                     control=SolveControl())
+    tabu_search(items, (5, 5), 1, 2, 2.0, True, True, seed=0)
+
+    return os.getpid()
+
+def _is_int(value):
+    # JSON true and false are Python bools, which are also ints
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _is_number(value):
+    # Python's JSON parser also reads NaN and Infinity
+    return _is_int(value) or (isinstance(value, float) and math.isfinite(value))
+
+def parse_solve_request(request):
+    """
+    Check a solve request and complete it with the default parameters.
+
+    A request holds the bin dimensions ("bin_width", "bin_height"), the items as [id, width, height] triples
+    ("items") and any of the DEFAULT_PARAMETERS. The item IDs must be positive, a negative ID stands for a rotated
+    item in the orderings.
+
+    Returns:
+    - tuple: The items, the bin dimensions and the parameters.
+
+    Raises:
+    - ValueError: If the request is invalid.
+    """
+
+    if not isinstance(request, dict):
+        raise ValueError("The request must be a JSON object")
+
+    unknown = set(request) - set(DEFAULT_PARAMETERS) - {'bin_width', 'bin_height', 'items', 'wait'}
+    if unknown:
+        raise ValueError(f"Unknown request fields: {', '.join(sorted(unknown))}")
+
+    bin_width, bin_height, rows = request.get('bin_width'), request.get('bin_height'), request.get('items')
+    if not _is_int(bin_width) or not _is_int(bin_height):
+        raise ValueError("The request needs bin_width and bin_height as integers")
+    if not isinstance(rows, list) or not all(isinstance(row, list) and len(row) == 3 and all(_is_int(value) for value in row)
+                                             for row in rows):
+        raise ValueError("The request needs items as [id, width, height] triples of integers")
+    if 'wait' in request and not isinstance(request['wait'], bool):
+        raise ValueError("wait must be true or false")
+
+    if not 0 < bin_width <= MAX_DIMENSION or not 0 < bin_height <= MAX_DIMENSION:
+        raise ValueError(f"The bin dimensions must be between 1 and {MAX_DIMENSION}, got {bin_width}x{bin_height}")
+    if len(rows) == 0:
+        raise ValueError("The request has no items")
+
+    table = np.array(rows, dtype=np.int64).reshape(-1, 3)
+    if np.any(table <= 0) or np.any(table > MAX_DIMENSION):
+        raise ValueError(f"The item IDs and dimensions must be between 1 and {MAX_DIMENSION}")
+    if len(np.unique(table[:, 0])) != len(table):
+        raise ValueError("The item IDs must be unique")
+
+    parameters = dict(DEFAULT_PARAMETERS)
+    parameters.update({key: value for key, value in request.items() if key in DEFAULT_PARAMETERS})
+
+    for name, expected in PARAMETER_TYPES.items():
+        value = parameters[name]
+        if value is None and DEFAULT_PARAMETERS[name] is None:
+            continue
+        if (expected is bool and not isinstance(value, bool)) or (expected is int and not _is_int(value)) \
+                or (expected is float and not _is_number(value)) or (expected is str and not isinstance(value, str)):
+            raise ValueError(f"Invalid {name}: expected {expected.__name__}, got {json.dumps(value)}")
+
+    if parameters['metaheuristic'] not in ("ga", "tabu"):
+        raise ValueError(f"Unknown metaheuristic: {parameters['metaheuristic']}, expected \"ga\" or \"tabu\"")
+    if parameters['time_limit'] is not None and parameters['time_limit'] <= 0:
+        raise ValueError(f"The time limit must be positive, got {parameters['time_limit']}")
+    if parameters['seed'] is not None and not 0 <= parameters['seed'] < 2 ** 32:
+        raise ValueError(f"The seed must be between 0 and 2^32 - 1, got {parameters['seed']}")
+    if parameters['split_rule'] not in (SHORTER_LEFTOVER_SPLIT, LONGER_LEFTOVER_SPLIT, MIN_AREA_SPLIT, MAX_AREA_SPLIT,
+                                        HYBRID_FIT_SPLIT):
+        raise ValueError(f"Unknown split rule: {parameters['split_rule']}")
+    for name in ('population_size', 'nb_generations', 'iteration_number', 'tabu_list_size', 'kappa', 'delta'):
+        if parameters[name] < 1:
+            raise ValueError(f"{name} must be at least 1, got {parameters[name]}")
+    for name in ('crossover_rate', 'mutation_rate'):
+        if not 0 <= parameters[name] <= 1:
+            raise ValueError(f"{name} must be between 0 and 1, got {parameters[name]}")
+    if parameters['diversification_interval'] < 0:
+        raise ValueError(f"diversification_interval can't be negative, got {parameters['diversification_interval']}")
+    check_placement_engine(parameters['engine'], parameters['guillotine'])
+    check_bin_selection(parameters['bin_selection'], parameters['open_bins'], parameters['engine'])
+
+    items = create_items(table[:, 0], table[:, 1], table[:, 2])
+
+    rotated_fits = parameters['rotation'] & (items['height'] <= bin_width) & (items['width'] <= bin_height)
+    if np.any(((items['width'] > bin_width) | (items['height'] > bin_height)) & ~rotated_fits):
+        raise ValueError("Some items don't fit in a bin")
+
+    return items, (bin_width, bin_height), parameters
+
+def solve_job(slot, items, bin_dimensions, parameters):
+    """
+    Solve a request inside a worker process, until it is done, out of time or cancelled.
+
+    The job is controlled through its control block (see SolveControl), which stops the search even in the middle of
+    a generation. A request which runs out of time or is cancelled still returns the best solution found so far.
+
+    Returns:
+    - dict: The status ("done", "timeout" or "cancelled"), number of bins, lower bound, elapsed time,
+            number of generations (or iterations) run and bins of the solution.
+    """
+
+    start = time.perf_counter()
+    control = SolveControl() if _worker_control_blocks is None else SolveControl.attach(_worker_control_blocks, slot)
+    if parameters['time_limit'] is not None:
+        control.set_time_limit(parameters['time_limit'])
+
+    # Cancelled before it started
+    if control.should_stop():
+        return {'status': control.status(), 'time': time.perf_counter() - start}
+
+    ga = parameters['metaheuristic'] == "ga"
+
+    if ga:
+        best_solution, _ = genetic_algo(items, bin_dimensions, parameters['population_size'], parameters['nb_generations'],
+                                        parameters['crossover_rate'], parameters['mutation_rate'],
+                                        parameters['kappa'], parameters['delta'], parameters['guillotine'],
+                                        parameters['rotation'], parameters['engine'], parameters['split_rule'],
+                                        parameters['bin_selection'], parameters['open_bins'], parameters['seed'],
+                                        control=control)
+    else:
+        best_solution, _ = tabu_search(items, bin_dimensions, parameters['iteration_number'],
+                                       min(parameters['tabu_list_size'], 3 * len(items) - 1),
+                                       parameters['kappa'], parameters['guillotine'], parameters['rotation'],
+                                       seed=parameters['seed'], reactive=parameters['reactive'],
+                                       diversification_interval=parameters['diversification_interval'],
+                                       engine=parameters['engine'], split_rule=parameters['split_rule'],
+                                       bin_selection=parameters['bin_selection'], open_bins=parameters['open_bins'],
+                                       control=control)
+
+    status = control.status()
+    bin_width, bin_height = bin_dimensions
+    # The ids of identical items are only bound to the packing here
+    best_solution = canonical_ordering(best_solution, items, parameters['rotation'])
+    bins = decode(get_corresponding_sequence_by_id(items, best_solution), bin_width, bin_height,
+                  parameters['guillotine'], parameters['rotation'], parameters['engine'], parameters['split_rule'],
+                  parameters['bin_selection'], parameters['open_bins'])
+
+    return {
+        'status': "done" if status == "running" else status,
+        'nb_bins': len(bins),
+        'lower_bound': int(compute_bin_lower_bound(items, bin_dimensions)),
+        'time': time.perf_counter() - start,
+        'generations' if ga else 'iterations': int(control.block[0]['step']),
+        'bins': solution_to_json(bins)
+    }
+
+class SolveServer(ThreadingHTTPServer):
+    """
+    Local HTTP solve service, keeping a pool of worker processes with their compiled kernels loaded.
+
+    Endpoints (JSON bodies and responses):
+    - POST /solve: solve a request (see parse_solve_request). With "wait": false, answer at once with the
+                   job ID instead of waiting for the solution.
+    - GET /jobs/<id>: status of a job, with its progress while it runs and its solution once it is finished.
+    - DELETE /jobs/<id>: cancel a job. A running job stops within a decode, with its best solution.
+    - GET /health: number of workers and of active jobs.
+
+    The requests are queued and dispatched to the first free worker.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, nb_workers=None):
+        super().__init__((host, port), SolveRequestHandler)
+
+        self.nb_workers = count_workers(MAX_ACTIVE_JOBS, nb_workers)
+
+        self.control_blocks = allocate_control_blocks(MAX_ACTIVE_JOBS)
+        self.executor = create_process_pool(self.nb_workers, _init_solve_worker, (self.control_blocks,))
+
+        self.jobs = OrderedDict()
+        self.free_slots = list(range(MAX_ACTIVE_JOBS))
+        self.job_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+        # Start every worker and load its kernels before accepting requests
+        warm_ups = [self.executor.submit(_warm_up) for _ in range(self.nb_workers)]
+        for warm_up in warm_ups:
+            warm_up.result()
+
+    def submit(self, items, bin_dimensions, parameters):
+        """
+        Queue a job.
+
+        Returns:
+        - dict: The job.
+
+        Raises:
+        - RuntimeError: If there are already MAX_ACTIVE_JOBS active jobs.
+        """
+
+        with self.lock:
+            if not self.free_slots:
+                raise RuntimeError(f"Too many active jobs ({MAX_ACTIVE_JOBS})")
+
+            slot = self.free_slots.pop()
+            job = {'id': str(next(self.job_ids)), 'slot': slot, 'nb_items': len(items), 'submitted': time.time(),
+                   'control': SolveControl(buffer=self.control_blocks, index=slot)}
+            job['future'] = self.executor.submit(solve_job, slot, items, bin_dimensions, parameters)
+            self.jobs[job['id']] = job
+
+        job['future'].add_done_callback(lambda future: self._release(job))
+
+        return job
+
+    def _release(self, job):
+        with self.lock:
+            self.free_slots.append(job['slot'])
+
+            # Forget the oldest finished jobs
+            finished = [job_id for job_id, old_job in self.jobs.items() if old_job['future'].done()]
+            for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self.jobs[job_id]
+
+    def cancel(self, job):
+        """
+        Cancel a queued job, or ask a running job to stop.
+        """
+        if not job['future'].cancel():
+            with self.lock:
+                if not job['future'].done():
+                    job['control'].cancel()
+
+    def describe(self, job):
+        """
+        Returns:
+        - dict: The ID and status of a job, with its result once it is finished.
+        """
+        future = job['future']
+        description = {'job_id': job['id'], 'nb_items': job['nb_items']}
+
+        if future.cancelled():
+            description['status'] = "cancelled"
+        elif not future.done():
+            description['status'] = "running" if future.running() else "queued"
+            with self.lock:
+                if description['status'] == "running" and not future.done():
+                    progress = job['control'].progress()
+                    description['progress'] = {key: progress[key] for key in ('step', 'nb_steps', 'nb_bins', 'evaluations')}
+        elif future.exception() is not None:
+            description.update({'status': "error", 'error': str(future.exception())})
+        else:
+            description.update(future.result())
+
+        return description
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(cancel_futures=True)
+
+class SolveRequestHandler(BaseHTTPRequestHandler):
+
+    def send_json(self, status, data):
+        body = json.dumps(data, cls=NumpyEncoder).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def find_job(self):
+        job = self.server.jobs.get(self.path[len("/jobs/"):]) if self.path.startswith("/jobs/") else None
+        if job is None:
+            self.send_json(404, {'error': f"Unknown job or path: {self.path}"})
+        return job
+
+    def do_GET(self):
+        if self.path == "/health":
+            with self.server.lock:
+                nb_active = MAX_ACTIVE_JOBS - len(self.server.free_slots)
+            self.send_json(200, {'status': "ok", 'workers': self.server.nb_workers, 'active_jobs': nb_active})
+            return
+
+        job = self.find_job()
+        if job is not None:
+            self.send_json(200, self.server.describe(job))
+
+    def do_DELETE(self):
+        job = self.find_job()
+        if job is not None:
+            self.server.cancel(job)
+            self.send_json(200, self.server.describe(job))
+
+    def do_POST(self):
+        if self.path != "/solve":
+            self.send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+
+        # Any malformed body is answered with a 400, the handler must not die without a response
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            items, bin_dimensions, parameters = parse_solve_request(request)
+        except (ValueError, TypeError, OverflowError) as error:
+            self.send_json(400, {'error': str(error)})
+            return
+
+        try:
+            job = self.server.submit(items, bin_dimensions, parameters)
+        except RuntimeError as error:
+            self.send_json(503, {'error': str(error)})
+            return
+
+        if not request.get('wait', True):
+            self.send_json(202, self.server.describe(job))
+            return
+
+        try:
+            job['future'].result()
+        except (CancelledError, Exception):
+            pass
+        self.send_json(200, self.server.describe(job))
+
+    def log_message(self, format, *args):
+        pass
+
+def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, nb_workers=None):
+    """
+    Run the solve service until it is interrupted (Ctrl+C).
+
+    Parameters:
+    - host (str): The address to listen on, the local machine only by default.
+    - port (int): The port to listen on.
+    - nb_workers (int): Number of worker processes (defaults to the number of CPUs).
+    """
+
+    start = time.perf_counter()
+    server = SolveServer(host, port, nb_workers)
+    print(f"Solve server ready on http://{host}:{port} with {server.nb_workers} workers "
+          f"({time.perf_counter() - start:.1f} seconds to start)", flush=True)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    run_server()
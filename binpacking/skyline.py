@@ -0,0 +1,246 @@
+from typing import Tuple
+from binpacking.structures import *
+from binpacking.bin_selection import get_candidate_bins, update_best_fit_order
+
+@njit(UniTuple(int32, 2)(from_dtype(FreeRectangle)[:], int32, int32, int32, int32, int32), cache = True)
+def find_skyline_position(skyline: np.ndarray, nb_segments: int, width: int, height: int,
+                          bin_width: int, bin_height: int) -> Tuple[int, int]:
+    """
+    Find the bottom leftmost position where an item can rest on the skyline of a bin.
+
+    The skyline is the height profile of the bin: a list of segments sorted by x, each one being
+    stored as the free rectangle going from the top of the items below it to the top of the bin.
+    Each segment is tried as the left end of the item, looking at the segments under the item. A bin
+    holds at most MAX_ITEMS segments, so the cost doesn't grow with the number of items to pack.
+
+    Parameters:
+    - skyline (np.ndarray): The segments of the skyline.
+    - nb_segments (int): Number of segments in use.
+    - width (int): The width of the item.
+    - height (int): The height of the item.
+    - bin_width (int): The width of the bin.
+    - bin_height (int): The height of the bin.
+
+    Returns:
+    - (int): Index of the segment where the left side of the item rests, -1 if the item doesn't fit.
+    - (int): The y coordinate of the item.
+    """
+
+    best_idx = -1
+    best_y = bin_height
+
+    for i in range(nb_segments):
+        x = skyline[i]['corner_x']
+        if x + width > bin_width:
+            break
+
+        # The item rests on the highest segment below it
+        y = 0
+        remaining_width = width
+        j = i
+        while remaining_width > 0 and y + height <= bin_height:
+            y = max(y, skyline[j]['corner_y'])
+            remaining_width -= skyline[j]['width']
+            j += 1
+
+        # Segments are sorted by x, so only a strictly lower position is better
+        if y + height <= bin_height and (best_idx == -1 or y < best_y):
+            best_idx = i
+            best_y = y
+
+    return best_idx, best_y
+
+@njit(int32(from_dtype(FreeRectangle)[:], int32, int32, int32, int32, int32), cache = True)
+def add_skyline_level(skyline: np.ndarray, nb_segments: int, idx: int, width: int, top_y: int, bin_height: int) -> int:
+    """
+    Raise the skyline over an item placed on the segment of index idx.
+
+    Parameters:
+    - skyline (np.ndarray): The segments of the skyline.
+    - nb_segments (int): Number of segments in use.
+    - idx (int): Index of the segment where the left side of the item rests.
+    - width (int): The width of the item.
+    - top_y (int): The y coordinate of the top of the item.
+    - bin_height (int): The height of the bin.
+
+    Returns:
+    - int: The new number of segments.
+    """
+
+    x = skyline[idx]['corner_x']
+    end = x + width
+
+    # Segments entirely covered by the item
+    j = idx
+    while j < nb_segments and skyline[j]['corner_x'] + skyline[j]['width'] <= end:
+        j += 1
+
+    # Segment partially covered by the item
+    if j < nb_segments and skyline[j]['corner_x'] < end:
+        skyline[j]['width'] -= end - skyline[j]['corner_x']
+        skyline[j]['corner_x'] = end
+
+    # Replace the covered segments [idx, j) by a single one
+    removed = j - idx
+    if removed == 0:
+        skyline[idx+1:nb_segments+1] = skyline[idx:nb_segments].copy()
+        nb_segments += 1
+    elif removed > 1:
+        skyline[idx+1:nb_segments-removed+1] = skyline[j:nb_segments].copy()
+        nb_segments -= removed - 1
+
+    skyline[idx]['corner_x'] = x
+    skyline[idx]['corner_y'] = top_y
+    skyline[idx]['width'] = width
+    skyline[idx]['height'] = bin_height - top_y
+
+    # Merge with the neighbors at the same level
+    if idx + 1 < nb_segments and skyline[idx+1]['corner_y'] == top_y:
+        skyline[idx]['width'] += skyline[idx+1]['width']
+        skyline[idx+1:nb_segments-1] = skyline[idx+2:nb_segments].copy()
+        nb_segments -= 1
+
+    if idx > 0 and skyline[idx-1]['corner_y'] == top_y:
+        skyline[idx-1]['width'] += skyline[idx]['width']
+        skyline[idx:nb_segments-1] = skyline[idx+1:nb_segments].copy()
+        nb_segments -= 1
+
+    return nb_segments
+
+@njit(int32(from_dtype(Bin), from_dtype(FreeRectangle)[:], int32, from_dtype(Item), boolean), cache = True)
+def insert_item_skyline(bin: np.ndarray, skyline: np.ndarray, nb_segments: int, item: np.ndarray, rotation: bool) -> int:
+    """
+    Attempt to place an item at the bottom leftmost position of the skyline of a bin.
+
+    The skyline of a bin holds as many segments as its list of free rectangles. A placement needing one
+    more segment than a full skyline holds is refused, the item then goes to another bin.
+
+    Parameters:
+    - bin (np.ndarray): The bin to attempt item insertion.
+    - skyline (np.ndarray): The segments of the skyline of the bin.
+    - nb_segments (int): Number of segments in use.
+    - item (np.ndarray): The item to place.
+    - rotation (bool): Should the items be able to rotate
+
+    Returns:
+    - int: The new number of segments, or -1 if the item doesn't fit.
+    """
+
+    best_idx, best_y = find_skyline_position(skyline, nb_segments, item['width'], item['height'],
+                                             bin['width'], bin['height'])
+    best_rotated = False
+
+    if rotation and item['width'] != item['height']:
+        idx, y = find_skyline_position(skyline, nb_segments, item['height'], item['width'],
+                                       bin['width'], bin['height'])
+
+        if idx != -1 and (best_idx == -1 or y < best_y or
+                          (y == best_y and skyline[idx]['corner_x'] < skyline[best_idx]['corner_x'])):
+            best_idx, best_y = idx, y
+            best_rotated = True
+
+    if best_idx == -1:
+        return -1
+
+    # An item narrower than its segment splits it, unless it joins the level of the segment on its left
+    placed_width = item['height'] if best_rotated else item['width']
+    if nb_segments == len(skyline) and skyline[best_idx]['width'] > placed_width:
+        top_y = best_y + (item['width'] if best_rotated else item['height'])
+        if best_idx == 0 or skyline[best_idx - 1]['corner_y'] != top_y:
+            return -1
+
+    placed_item = create_item(item['id'], item['width'], item['height'])
+    placed_item['rotated'] = item['rotated']
+    if best_rotated:
+        placed_item['width'], placed_item['height'] = item['height'], item['width']
+        placed_item['rotated'] = not item['rotated']
+
+    add_item_to_bin(bin, placed_item, skyline[best_idx]['corner_x'], best_y)
+
+    return add_skyline_level(skyline, nb_segments, best_idx, placed_item['width'],
+                             best_y + placed_item['height'], bin['height'])
+
+@njit(from_dtype(Bin)[:](from_dtype(Item)[:], int32, int32, boolean, int32, int32), cache = True)
+def skyline(items: np.ndarray, bin_width: int, bin_height: int, rotation: bool, bin_selection: int, open_bins: int) -> np.ndarray:
+    """
+    Pack items into bins with the Skyline Bottom-Left heuristic.
+
+    Items are taken in the given order and each one is placed at the lowest position of the first bin
+    where it fits, the bins being tried in the order of the bin selection policy. A bin only keeps its
+    height profile, so the space below the skyline is lost, but finding a position only looks at its
+    segments, at most MAX_ITEMS of them. The packing isn't guillotine.
+
+    Parameters:
+    - items (np.ndarray): Array of items to be packed.
+    - bin_width (int): The width of each new bin.
+    - bin_height (int): The height of each new bin.
+    - rotation (bool): Should the items be able to rotate
+    - bin_selection (int): The policy choosing the bin receiving the next item (one of the *_SELECTION constants).
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+
+    Returns:
+    - np.ndarray: The bins containing the packed items.
+    """
+
+    n = len(items)
+    bins = np.empty(n, dtype=Bin)
+    # The segments of a skyline become the free rectangles of its bin, at most MAX_ITEMS of them
+    skylines = np.zeros((n, MAX_ITEMS), dtype=FreeRectangle)
+    nb_segments = np.zeros(n, dtype=np.int32)
+    nb_items = np.zeros(n, dtype=np.int32)
+    bin_count = 0
+
+    # Order in which the bins are tried, only rearranged by the Best Fit policy
+    bin_order = np.arange(n).astype(np.int32)
+    residual_areas = np.full(n, np.int64(bin_width) * np.int64(bin_height))
+
+    for k in range(n):
+        item = items[k]
+        placed = False
+
+        start, end = get_candidate_bins(bin_count, bin_selection, open_bins)
+        for position in range(start, end):
+            i = bin_order[position]
+            if nb_items[i] == MAX_ITEMS:
+                continue
+
+            bin = bins[i]
+            segments = insert_item_skyline(bin, skylines[i], nb_segments[i], item, rotation)
+            bins[i] = bin
+
+            if segments != -1:
+                nb_segments[i] = segments
+                nb_items[i] += 1
+                placed = True
+                if bin_selection == BEST_FIT_SELECTION:
+                    update_best_fit_order(bin_order, residual_areas, position,
+                                          np.int64(item['width']) * np.int64(item['height']))
+                break
+
+        if not placed:
+            bin = create_bin(bin_count, bin_width, bin_height)
+            skylines[bin_count][0] = bin['list_of_free_rec'][0]
+            segments = insert_item_skyline(bin, skylines[bin_count], 1, item, rotation)
+            if segments == -1:
+                raise ValueError("An item is larger than the bins")
+
+            bins[bin_count] = bin
+            nb_segments[bin_count] = segments
+            nb_items[bin_count] = 1
+            if bin_selection == BEST_FIT_SELECTION:
+                update_best_fit_order(bin_order, residual_areas, bin_count,
+                                      np.int64(item['width']) * np.int64(item['height']))
+            bin_count += 1
+
+    # The free rectangles of a bin are the spaces above its skyline
+    for i in range(bin_count):
+        bin = bins[i]
+        for j in range(MAX_ITEMS):
+            if j < nb_segments[i]:
+                bin['list_of_free_rec'][j] = skylines[i][j]
+            else:
+                bin['list_of_free_rec'][j]['width'] = 0
+                bin['list_of_free_rec'][j]['height'] = 0
+        bins[i] = bin
+
+    return bins[:bin_count]
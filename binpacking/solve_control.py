@@ -0,0 +1,218 @@
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing.sharedctypes import RawArray
+
+import numpy as np
+
+from binpacking.structures import ControlBlock
+
+# Values of the stop field of a control block
+RUNNING = 0
+CANCELLED = 1
+DEADLINE_REACHED = 2
+
+STOP_STATUSES = {RUNNING: "running", CANCELLED: "cancelled", DEADLINE_REACHED: "timeout"}
+
+# Longest sleep of the deadline watchdog, bounds the delay to notice a deadline moved earlier
+WATCHDOG_INTERVAL = 0.1
+
+def allocate_control_blocks(nb_blocks):
+    """
+    Parameters:
+    - nb_blocks (int): Number of control blocks.
+
+    Returns:
+    - RawArray: Shared memory holding the blocks, which can be passed to spawned worker processes
+                (see SolveControl.attach).
+    """
+    return RawArray('b', nb_blocks * ControlBlock.itemsize)
+
+class SolveControl:
+    """
+    Control of a running search (genetic_algo or tabu_search), shared with the threads or processes which cancel it,
+    move its deadline or follow its progress.
+
+    Its state is a ControlBlock record in shared memory: the kernels poll its stop field between two decodes, the
+    searches check it between two generations (or iterations) and report their progress in it. The kernels have no
+    clock, a watchdog thread sets the stop field when the deadline is reached (see watch).
+
+    The best solution is only kept in the process running the search.
+    """
+
+    def __init__(self, time_limit=None, buffer=None, index=0):
+        """
+        Parameters:
+        - time_limit (float): Seconds before the search stops, None for no deadline.
+        - buffer (RawArray): Shared control blocks (see allocate_control_blocks), a new one by default.
+        - index (int): The block of the buffer controlling the search, it is reset.
+        """
+        self._attach(allocate_control_blocks(1) if buffer is None else buffer, index)
+
+        record = self.block[0]
+        record['stop'] = RUNNING
+        record['deadline'] = np.inf
+        record['step'] = 0
+        record['nb_steps'] = 0
+        record['best_fitness'] = np.inf
+        record['evaluations'] = 0
+
+        if time_limit is not None:
+            self.set_time_limit(time_limit)
+
+    @classmethod
+    def attach(cls, buffer, index=0):
+        """
+        Returns:
+        - SolveControl: The control of an existing block, left as it is (used in the worker process running the search).
+        """
+        control = cls.__new__(cls)
+        control._attach(buffer, index)
+        return control
+
+    def _attach(self, buffer, index):
+        self.buffer = buffer
+        self.index = index
+        self.block = np.frombuffer(buffer, dtype=ControlBlock)[index:index + 1]
+        self._lock = threading.Lock()
+        self._best_solution = None
+
+    def __getstate__(self):
+        return (self.buffer, self.index)
+
+    def __setstate__(self, state):
+        self._attach(*state)
+
+    def cancel(self):
+        """
+        Ask the search to stop, it returns the best solution found so far.
+        """
+        if self.block[0]['stop'] == RUNNING:
+            self.block[0]['stop'] = CANCELLED
+
+    def set_deadline(self, deadline):
+        """
+        Parameters:
+        - deadline (float): The time.monotonic time at which the search stops, inf for none.
+        """
+        self.block[0]['deadline'] = deadline
+
+    def set_time_limit(self, time_limit):
+        """
+        Parameters:
+        - time_limit (float): Seconds from now before the search stops.
+        """
+        self.set_deadline(time.monotonic() + time_limit)
+
+    def extend_deadline(self, seconds):
+        """
+        Postpone the deadline, if the search didn't reach it yet (no effect without a deadline).
+
+        Parameters:
+        - seconds (float): Seconds added to the deadline.
+        """
+        self.block[0]['deadline'] += seconds
+
+    def remaining_time(self):
+        """
+        Returns:
+        - float: Seconds before the deadline, inf without one.
+        """
+        return self.block[0]['deadline'] - time.monotonic()
+
+    def should_stop(self):
+        """
+        Check the stop field, setting it first if the deadline is reached.
+
+        Returns:
+        - bool: True if the search must stop.
+        """
+        record = self.block[0]
+        if record['stop'] == RUNNING and time.monotonic() >= record['deadline']:
+            record['stop'] = DEADLINE_REACHED
+        return record['stop'] != RUNNING
+
+    def status(self):
+        """
+        Returns:
+        - str: "running", "cancelled" or "timeout".
+        """
+        return STOP_STATUSES[int(self.block[0]['stop'])]
+
+    def report(self, step, best_fitness, nb_evaluations, best_solution=None):
+        """
+        Report the progress of the search, called after each generation (or iteration).
+
+        Parameters:
+        - step (int): Generations (or iterations) done, the most advanced trajectory is kept with several of them.
+        - best_fitness (float): The best fitness found so far.
+        - nb_evaluations (int): Orderings decoded since the last report.
+        - best_solution (np.ndarray): The best solution, only copied when it improved or none is known in this process yet.
+        """
+        record = self.block[0]
+        record['step'] = max(record['step'], step)
+        record['evaluations'] += nb_evaluations
+
+        improved = best_fitness < record['best_fitness']
+        if improved:
+            record['best_fitness'] = best_fitness
+
+        if best_solution is not None and (improved or self._best_solution is None):
+            with self._lock:
+                self._best_solution = best_solution.copy()
+
+    def progress(self):
+        """
+        Returns:
+        - dict: The status, generations (or iterations) done out of the planned ones, best fitness and its number
+                of bins, evaluations and remaining time of the search.
+        """
+        record = self.block[0].copy()
+        best_fitness = float(record['best_fitness'])
+
+        return {
+            'status': STOP_STATUSES[int(record['stop'])],
+            'step': int(record['step']),
+            'nb_steps': int(record['nb_steps']),
+            'best_fitness': best_fitness,
+            'nb_bins': int(best_fitness) if np.isfinite(best_fitness) else None,
+            'evaluations': int(record['evaluations']),
+            'remaining_time': max(0.0, float(record['deadline']) - time.monotonic()) if np.isfinite(record['deadline']) else None
+        }
+
+    def best(self):
+        """
+        Read a copy of the best solution reported so far, while the search runs.
+
+        Returns:
+        - tuple: The best solution (or None if nothing was reported yet in this process) and its fitness.
+        """
+        with self._lock:
+            best_solution = None if self._best_solution is None else self._best_solution.copy()
+        return best_solution, float(self.block[0]['best_fitness'])
+
+    @contextmanager
+    def watch(self, nb_steps):
+        """
+        Run a search under this control, with a watchdog thread setting the stop field as soon as the deadline is
+        reached, even in the middle of a kernel.
+
+        Parameters:
+        - nb_steps (int): The generations (or iterations) planned.
+        """
+        self.block[0]['step'] = 0
+        self.block[0]['nb_steps'] = nb_steps
+
+        finished = threading.Event()
+        watchdog = threading.Thread(target=self._watchdog, args=(finished,), name="solve-control-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            yield self
+        finally:
+            finished.set()
+            watchdog.join()
+
+    def _watchdog(self, finished):
+        while not self.should_stop():
+            if finished.wait(max(0.0, min(self.remaining_time(), WATCHDOG_INTERVAL))):
+                return
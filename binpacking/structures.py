@@ -1,9 +1,30 @@
 import numpy as np
-from numba import njit, int32, boolean, void, from_dtype, float64, optional
+from numba import njit, int32, int64, boolean, void, from_dtype, float64, optional
 from numba.types import UniTuple
 
+from binpacking.instrumentation import INSTRUMENTATION
+
 MAX_ITEMS = 50
 
+# Placement engines used to decode an ordering of items into bins
+LGFI_ENGINE = 0
+SKYLINE_ENGINE = 1
+MAXRECTS_ENGINE = 2
+
+# Rules deciding the orientation of the guillotine cut after placing an item with LGFI
+SHORTER_LEFTOVER_SPLIT = 0
+LONGER_LEFTOVER_SPLIT = 1
+MIN_AREA_SPLIT = 2
+MAX_AREA_SPLIT = 3
+HYBRID_FIT_SPLIT = 4
+
+# Policies choosing the bin receiving the next item
+FIRST_FIT_SELECTION = 0
+BEST_FIT_SELECTION = 1
+LAST_K_SELECTION = 2
+# Bins kept open by LAST_K_SELECTION unless asked otherwise
+DEFAULT_OPEN_BINS = 3
+
 Item = np.dtype([
     ('id', np.int32), 
     ('width', np.int32), 
@@ -28,6 +49,54 @@ Bin = np.dtype([
     ('list_of_free_rec', FreeRectangle, (MAX_ITEMS,)) 
 ])
 
+# Hot path counters of the LGFI decoder, only updated by the instrumentation build (see binpacking/instrumentation.py)
+DecoderCounters = np.dtype([
+    ('decodes', np.int64),
+    ('placements', np.int64),
+    ('bins_opened', np.int64),
+    ('bins_probed', np.int64), # Calls of insert_item_lgfi
+    ('free_rect_slots_scanned', np.int64), # By find_current_position_idx, empty or not
+    ('free_rects_scanned', np.int64),
+    ('items_scanned', np.int64), # By check_fit_and_rotation
+    ('failed_fits', np.int64), # Free rectangles no remaining item fits in
+    ('merge_calls', np.int64),
+    ('merges', np.int64) # Free rectangles merged by merge_rec_guillotine
+])
+
+# Counters passed by the decodes whose counters aren't reported, so that they allocate nothing. A global array is a
+# read-only constant in the kernels: only the normal build, which never writes the counters, may pass it.
+UNREPORTED_COUNTERS = np.zeros(1, dtype=DecoderCounters)
+
+# Control block of a running search, shared with the threads or processes controlling it (see binpacking/solve_control.py)
+ControlBlock = np.dtype([
+    ('stop', np.int64), # Polled by the kernels, 0 while the search runs, else the reason it stops
+    ('deadline', np.float64), # On the time.monotonic clock, inf for none
+    ('step', np.int64), # Generations or iterations done
+    ('nb_steps', np.int64),
+    ('best_fitness', np.float64),
+    ('evaluations', np.int64)
+])
+
+# Result of an instance solved by the batch kernel (see binpacking/batch.py)
+BatchResult = np.dtype([
+    ('nb_bins', np.int32),
+    ('lower_bound', np.int32),
+    ('fitness', np.float64)
+])
+
+# Flat record of a placed item, used to store solutions in binary files
+SolutionRecord = np.dtype([
+    ('bin_id', np.int32),
+    ('bin_width', np.int32),
+    ('bin_height', np.int32),
+    ('id', np.int32),
+    ('width', np.int32),
+    ('height', np.int32),
+    ('rotated', np.bool_),
+    ('corner_x', np.int32),
+    ('corner_y', np.int32)
+])
+
 @njit(from_dtype(Bin)(int32, int32, int32), cache=True)
 def create_bin(bin_id: int, width: int, height: int) -> np.ndarray:
     """
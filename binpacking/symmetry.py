@@ -0,0 +1,190 @@
+from numba.types import Tuple
+
+from binpacking.structures import *
+
+@njit(int32[:, :](from_dtype(Item)[:]), cache = True)
+def size_classes(items: np.ndarray) -> np.ndarray:
+    """
+    Number the distinct dimensions of the items, in both orientations.
+
+    The decoders only look at the dimensions of the items of an ordering, never at their ids, so the orderings
+    giving the same sequence of size classes decode to the same packing, up to the ids of identical items.
+    An item of 3x5 and a rotated item of 5x3 have the same size class.
+
+    Parameters:
+    - items (np.ndarray): The items of the instance.
+
+    Returns:
+    - np.ndarray: The size class of each item id, not rotated (column 0) and rotated (column 1), -1 for the ids
+                  of no item.
+    """
+
+    nb_items = len(items)
+    max_id = 0
+    max_side = 0
+    for i in range(nb_items):
+        max_id = max(max_id, items[i]['id'])
+        max_side = max(max_side, items[i]['width'], items[i]['height'])
+
+    # Both orientations of each item: row 2 * i is item i as it is, row 2 * i + 1 rotated
+    keys = np.empty(2 * nb_items, dtype=np.int64)
+    for i in range(nb_items):
+        width, height = np.int64(items[i]['width']), np.int64(items[i]['height'])
+        keys[2 * i] = width * (max_side + 1) + height
+        keys[2 * i + 1] = height * (max_side + 1) + width
+
+    classes = np.full((max_id + 1, 2), -1, dtype=np.int32)
+    order = np.argsort(keys, kind='mergesort')
+    size_class = -1
+    for rank in range(len(order)):
+        row = order[rank]
+        if rank == 0 or keys[row] != keys[order[rank - 1]]:
+            size_class += 1
+        classes[items[row // 2]['id'], row % 2] = size_class
+
+    return classes
+
+@njit(int32[:, :](int32[:, :], int32[:, :]), cache = True)
+def class_sequences(population: np.ndarray, classes: np.ndarray) -> np.ndarray:
+    """
+    Replace each id of the orderings of a population by its size class, in the orientation of the ordering.
+
+    Parameters:
+    - population (np.ndarray): The id orderings, one per row.
+    - classes (np.ndarray): The size classes of the item ids (see size_classes).
+
+    Returns:
+    - np.ndarray: The sequence of size classes of each ordering, one per row.
+    """
+    sequences = np.empty_like(population)
+    for i in range(population.shape[0]):
+        for j in range(population.shape[1]):
+            value = population[i, j]
+            sequences[i, j] = classes[abs(value), 1 if value < 0 else 0]
+    return sequences
+
+@njit(int64(int32[:], int32[:, :]), cache = True)
+def hash_class_sequence(solution: np.ndarray, classes: np.ndarray) -> int:
+    """
+    Compute a 64 bits FNV-1a hash of the sequence of size classes of an id ordering, the same for all the orderings
+    decoding to the same packing up to the ids of identical items.
+
+    Parameters:
+    - solution (np.ndarray): The id ordering to hash.
+    - classes (np.ndarray): The size classes of the item ids (see size_classes).
+
+    Returns:
+    - int: The hash of the sequence of size classes.
+    """
+    h = np.uint64(14695981039346656037)
+    for value in solution:
+        h ^= np.uint64(np.uint32(classes[abs(value), 1 if value < 0 else 0]))
+        h *= np.uint64(1099511628211)
+    return np.int64(h)
+
+@njit(int64[:](int32[:, :], int32[:, :]), cache = True)
+def hash_class_orderings(population: np.ndarray, classes: np.ndarray) -> np.ndarray:
+    """
+    Hash the sequence of size classes of each id ordering of a population (see hash_class_sequence).
+
+    Parameters:
+    - population (np.ndarray): The id orderings, one per row.
+    - classes (np.ndarray): The size classes of the item ids (see size_classes).
+
+    Returns:
+    - np.ndarray: The hash of each ordering.
+    """
+    hashes = np.empty(population.shape[0], dtype=np.int64)
+    for i in range(population.shape[0]):
+        hashes[i] = hash_class_sequence(population[i], classes)
+    return hashes
+
+@njit(Tuple((int64[:], int64[:]))(int32[:, :], int32[:, :]), cache = True)
+def distinct_class_sequences(population: np.ndarray, classes: np.ndarray) -> tuple:
+    """
+    Group the orderings of a population by sequence of size classes, so that a single ordering of each is decoded.
+
+    The orderings are sorted by the hash of their sequence, and the sequences with equal hashes are compared, so
+    that a hash collision never shares a fitness between two packings.
+
+    Parameters:
+    - population (np.ndarray): The id orderings, one per row.
+    - classes (np.ndarray): The size classes of the item ids (see size_classes).
+
+    Returns:
+    - tuple: The rows of the first ordering of each sequence of size classes, and for each row the index of its
+             sequence among them.
+    """
+    sequences = class_sequences(population, classes)
+    keys = hash_class_orderings(population, classes)
+    order = np.argsort(keys, kind='mergesort')
+
+    first_rows = np.empty(len(keys), dtype=np.int64)
+    sequence_of_row = np.empty(len(keys), dtype=np.int64)
+    nb_sequences = 0
+    # The sequences found since the hash of the rows last changed
+    first_colliding = 0
+    for rank in range(len(order)):
+        row = order[rank]
+        if rank == 0 or keys[row] != keys[order[rank - 1]]:
+            first_colliding = nb_sequences
+
+        sequence = -1
+        for candidate in range(first_colliding, nb_sequences):
+            if np.array_equal(sequences[row], sequences[first_rows[candidate]]):
+                sequence = candidate
+                break
+
+        if sequence == -1:
+            sequence = nb_sequences
+            first_rows[nb_sequences] = row
+            nb_sequences += 1
+        sequence_of_row[row] = sequence
+
+    # The rows of a sequence are sorted by index, its first row comes first
+    return first_rows[:nb_sequences], sequence_of_row
+
+def canonical_ordering(ordering, items, rotation):
+    """
+    Assign the ids of identical items to an ordering in a canonical way: the k-th item of the ordering with given
+    dimensions (in any orientation if rotation is allowed) becomes the one with the k-th lowest id, in the same
+    orientation as the item it replaces. The ordering decodes to the same packing, and all the orderings with the
+    same sequence of size classes give the same one, so the ids of the parts are only bound to the packing once it
+    is exported.
+
+    Parameters:
+    - ordering (np.ndarray): The id ordering.
+    - items (np.ndarray): The items of the instance.
+    - rotation (bool): Are the items allowed to rotate.
+
+    Returns:
+    - np.ndarray: The canonical id ordering.
+    """
+    ordering = np.asarray(ordering, dtype=np.int32)
+    if len(ordering) == 0:
+        return ordering.copy()
+
+    item_index = np.argsort(items['id'], kind='stable')
+    item_index = item_index[np.searchsorted(items['id'][item_index], np.abs(ordering))]
+    widths, heights = items['width'][item_index], items['height'][item_index]
+    placed_widths = np.where(ordering < 0, heights, widths)
+
+    # Identical items, in any orientation by their shorter and longer sides
+    if rotation:
+        shapes = np.stack((np.minimum(widths, heights), np.maximum(widths, heights)), axis=1)
+    else:
+        shapes = np.stack((widths, heights), axis=1)
+    _, shape_of_position = np.unique(shapes, axis=0, return_inverse=True)
+    shape_of_position = shape_of_position.reshape(-1)
+
+    # The positions of each shape in order, and the ids of its items in increasing order
+    positions = np.lexsort((np.arange(len(ordering)), shape_of_position))
+    ids = np.lexsort((np.abs(ordering), shape_of_position))
+    new_index = np.empty_like(item_index)
+    new_index[positions] = item_index[ids]
+
+    canonical = items['id'][new_index].astype(np.int32)
+    # Rotated if the dimensions of the new item are the other way around
+    rotated = items['width'][new_index] != placed_widths
+
+    return np.where(rotated, -canonical, canonical).astype(np.int32)
@@ -1,15 +1,31 @@
 import faulthandler
-import os
+from contextlib import nullcontext
+from multiprocessing.sharedctypes import RawArray
 from binpacking.data_manager import load_items_from_file
 from binpacking.structures import Tabu, Neighbor
 from binpacking.population_generation import *
-from binpacking.fitness import compute_fitness, compute_fitnesses
+from binpacking.decoder import check_bin_selection, check_placement_engine
+from binpacking.fitness import compute_bin_lower_bound, compute_fitness, compute_fitnesses
+from binpacking.process_pool import count_workers, create_process_pool
+from binpacking.symmetry import distinct_class_sequences, hash_class_sequence, size_classes
+from binpacking.telemetry import TelemetryClock
+from binpacking.warm_start import check_orderings
 from numba import njit
 
 faulthandler.enable()
 
 MIN_INT32 = np.int32(-2147483647)
 
+# Reactive tabu tenure: growth factor when a solution is revisited, shrink factor otherwise
+TENURE_INCREASE = 1.2
+TENURE_DECREASE = 0.9
+# Number of visits of a same solution after which the search escapes with a diversification
+MAX_REPETITIONS = 3
+
+# Incumbent and control shared with the parent process, set in each multi-start worker
+_worker_incumbent = None
+_worker_control = None
+
 @njit(cache = True)
 def  create_tabu_list(size):
     # Initialize the tabu_list with the specified size
@@ -141,39 +157,51 @@ def get_insertion_neighborhood(solution, tabu_list):
 
 
 @njit(cache = True)
-def get_neighborhood(solution, tabu_list):
+def get_neighborhood(solution, tabu_list, rotation):
     """
     Generate the complete neighborhood for a given solution.
 
     Args:
         solution (np.ndarray): The current solution.
         tabu_list (np.ndarray): The current tabu list.
+        rotation (bool): Whether rotation is allowed, otherwise the rotation neighborhood is left out.
     Returns:
         np.ndarray: The complete neighborhood, combining permutation, rotation, and insertion neighborhoods.
     """
     
     # permutation_neighborhood = get_permutation_neighborhood(solution, tabu_list)
-    rotation_neighborhood = get_rotation_neighborhood(solution, tabu_list)
     insertion_neighborhood = get_insertion_neighborhood(solution, tabu_list)
     permutation_neighborhood = get_permutation_neighborhood(solution, tabu_list)
     
+    if not rotation:
+        return np.concatenate((permutation_neighborhood, insertion_neighborhood))
+    
+    rotation_neighborhood = get_rotation_neighborhood(solution, tabu_list)
     
     return np.concatenate((permutation_neighborhood, rotation_neighborhood, insertion_neighborhood))
 
 @njit(cache = True)
-def get_best_neighbor(neighborhood, items, bin_dimensions, guillotine_cut, rotation):
+def get_best_neighbor(neighborhood, items, classes, bin_dimensions, guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins):
     """
     Find the best neighbor in the neighborhood based on fitness.
 
+    The neighbors only differing by the ids of identical items decode to the same packing, a single one of them
+    is decoded.
+
     Args:
         neighborhood (np.ndarray): The neighborhood of solutions.
         items (list): The list of items.
+        classes (np.ndarray): The size classes of the item ids (see size_classes).
         bin_dimensions (tuple): Dimensions of the bin (width, height).
         guillotine_cut (bool): Whether guillotine cut is allowed.
         rotation (bool): Whether rotation is allowed.
+        engine (int): The placement engine used to build the bins.
+        split_rule (int): The rule deciding the orientation of the guillotine cuts.
+        bin_selection (int): The policy choosing the bin receiving the next item.
+        open_bins (int): Number of bins kept open with LAST_K_SELECTION.
 
     Returns:
-        np.ndarray: The best neighbor solution.
+        tuple: The index of the best neighbor solution, and the number of neighbors decoded.
     """
     len_solution = len(neighborhood[0]['solution'][neighborhood[0]['solution'] != MIN_INT32])
     solutions = neighborhood['solution']
@@ -183,8 +211,9 @@ def get_best_neighbor(neighborhood, items, bin_dimensions, guillotine_cut, rotat
     solutions_fixed = np.zeros((len(neighborhood), len_solution), dtype=np.int32)
     solutions_fixed[:, :] = solutions
     
-    # Compute fitnesses for all neighbors
-    fitnesses = compute_fitnesses(solutions_fixed, items, bin_dimensions, guillotine_cut, rotation)
+    # Compute fitnesses for all neighbors, decoding each sequence of size classes once
+    first_rows, sequence_of_row = distinct_class_sequences(solutions_fixed, classes)
+    fitnesses = compute_fitnesses(solutions_fixed[first_rows], items, bin_dimensions, guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)[sequence_of_row]
     
     # Find the best fitness value
     best_fitness = np.min(fitnesses)
@@ -194,8 +223,7 @@ def get_best_neighbor(neighborhood, items, bin_dimensions, guillotine_cut, rotat
     # Randomly select one of these indices
     random_index = np.random.choice(best_indices)
     
-    # Return the corresponding neighbor
-    return neighborhood[random_index]
+    return random_index, len(first_rows)
 
 
 
@@ -240,25 +268,216 @@ def add_tabu_list(tabu_list, tabu):
     
     return tabu_list
 
-def tabu_search(items, bin_dimensions, iteration_number, tabu_list_size, kappa, guillotine_cut, rotation) :
+@njit(cache = True)
+def resize_tabu_list(tabu_list, size):
     """
-    Perform tabu search for the bin packing problem.
+    Resize the tabu list, keeping its most recent moves.
+
+    Args:
+        tabu_list (np.ndarray): The current tabu list.
+        size (int): The new size of the tabu list.
+
+    Returns:
+        np.ndarray: The resized tabu list.
+    """
+    new_tabu_list = create_tabu_list(size)
+    
+    # Moves are stored from the oldest to the most recent, empty spots are at the end
+    nb_moves = 0
+    while nb_moves < len(tabu_list) and not id_tabu_empty(tabu_list[nb_moves]):
+        nb_moves += 1
+    
+    kept = min(nb_moves, size)
+    for i in range(kept):
+        new_tabu_list[i] = tabu_list[nb_moves - kept + i]
+    
+    return new_tabu_list
+
+@njit(cache = True)
+def update_frequency_memory(frequencies, solution, sorted_ids):
+    """
+    Record in the long-term memory which item occupies each position of the solution.
+
+    Args:
+        frequencies (np.ndarray): Matrix counting how often each item (column) was at each position (row).
+        solution (np.ndarray): The current solution.
+        sorted_ids (np.ndarray): The sorted item ids, giving the column of each item.
+    """
+    for position in range(len(solution)):
+        frequencies[position, np.searchsorted(sorted_ids, abs(solution[position]))] += 1
+
+@njit(cache = True)
+def get_diversified_solution(frequencies, sorted_ids, reference_solution):
+    """
+    Build a solution that places every item where it was the least often during the search.
+
+    Positions are filled in order with the unused item of lowest frequency, ties being broken at random.
+    Items keep their orientation from the reference solution.
+
+    Args:
+        frequencies (np.ndarray): Matrix counting how often each item (column) was at each position (row).
+        sorted_ids (np.ndarray): The sorted item ids, giving the column of each item.
+        reference_solution (np.ndarray): The solution giving the orientation of the items.
+
+    Returns:
+        np.ndarray: The diversified solution.
+    """
+    n = len(reference_solution)
+    
+    signs = np.ones(n, dtype=np.int32)
+    for value in reference_solution:
+        if value < 0:
+            signs[np.searchsorted(sorted_ids, -value)] = -1
+    
+    used = np.zeros(n, dtype=np.bool_)
+    new_solution = np.empty(n, dtype=np.int32)
+    
+    for position in range(n):
+        best_idx = -1
+        best_score = np.inf
+        for idx in range(n):
+            if used[idx]:
+                continue
+            # Noise below 1 only breaks ties between equal counts
+            score = frequencies[position, idx] + np.random.random()
+            if score < best_score:
+                best_score = score
+                best_idx = idx
+        
+        used[best_idx] = True
+        new_solution[position] = signs[best_idx] * sorted_ids[best_idx]
+    
+    return new_solution
+
+class SharedIncumbent:
+    """
+    Best solutions of concurrent tabu trajectories, shared across processes without locks.
+
+    Each trajectory owns one slot and is the only process writing to it, readers scan all the slots.
+    Every slot has a sequence counter that is odd while a write is in progress, so a reader that sees
+    the counter change (or odd) during its copy simply retries.
+    """
+    
+    def __init__(self, nb_slots, len_solution, target_fitness=-np.inf, buffers=None):
+        """
+        Parameters:
+        - nb_slots (int): Number of trajectories sharing the incumbent.
+        - len_solution (int): Number of items in a solution.
+        - target_fitness (float): Trajectories stop as soon as the global best fitness reaches this value.
+        - buffers (tuple): Shared buffers of an existing incumbent (used to rebuild it in a worker process).
+        """
+        
+        fresh = buffers is None
+        if fresh:
+            fitnesses = RawArray('d', nb_slots)
+            sequences = RawArray('q', nb_slots)
+            solutions = RawArray('i', nb_slots * len_solution)
+            buffers = (fitnesses, sequences, solutions)
+        
+        self.buffers = buffers
+        self.nb_slots = nb_slots
+        self.len_solution = len_solution
+        self.target_fitness = target_fitness
+        
+        self._fitnesses = np.frombuffer(buffers[0], dtype=np.float64)
+        self._sequences = np.frombuffer(buffers[1], dtype=np.int64)
+        self._solutions = np.frombuffer(buffers[2], dtype=np.int32).reshape(nb_slots, len_solution)
+        
+        if fresh:
+            self._fitnesses[:] = np.inf
+    
+    def __getstate__(self):
+        return (self.nb_slots, self.len_solution, self.target_fitness, self.buffers)
+    
+    def __setstate__(self, state):
+        nb_slots, len_solution, target_fitness, buffers = state
+        self.__init__(nb_slots, len_solution, target_fitness, buffers)
+    
+    def publish(self, slot, solution, fitness):
+        """
+        Publish the best solution found by the trajectory owning the slot.
+
+        Parameters:
+        - slot (int): The slot owned by the calling trajectory.
+        - solution (np.ndarray): The solution to publish.
+        - fitness (float): Its fitness.
+        """
+        
+        self._sequences[slot] += 1
+        self._solutions[slot] = solution
+        self._fitnesses[slot] = fitness
+        self._sequences[slot] += 1
+    
+    def best_fitness(self):
+        """
+        Returns:
+        - float: The best fitness published by any trajectory.
+        """
+        return self._fitnesses.min()
+    
+    def best(self):
+        """
+        Read a consistent copy of the best published solution.
+
+        Returns:
+        - tuple: The best solution (or None if nothing was published yet) and its fitness.
+        """
+        
+        while True:
+            slot = int(np.argmin(self._fitnesses))
+            sequence = self._sequences[slot]
+            if sequence == 0:
+                return None, np.inf
+            if sequence % 2 == 1:
+                continue
+            
+            solution = self._solutions[slot].copy()
+            fitness = self._fitnesses[slot]
+            
+            if self._sequences[slot] == sequence:
+                return solution, fitness
+    
+    def should_stop(self):
+        """
+        Returns:
+        - bool: True if a trajectory already reached the target fitness.
+        """
+        return self.best_fitness() <= self.target_fitness
+
+def tabu_trajectory(items, bin_dimensions, iteration_number, tabu_list_size, initial_solution, guillotine_cut, rotation,
+                    incumbent=None, slot=0, restart_interval=0, reactive=False, diversification_interval=0,
+                    engine=LGFI_ENGINE, split_rule=SHORTER_LEFTOVER_SPLIT, bin_selection=FIRST_FIT_SELECTION, open_bins=DEFAULT_OPEN_BINS,
+                    telemetry=None, control=None):
+    """
+    Run a single tabu search trajectory from a given starting solution.
 
     Args:
         items (list): The list of items.
         bin_dimensions (tuple): Dimensions of the bin (width, height).
         iteration_number (int): Number of iterations.
         tabu_list_size (int): Size of the tabu list.
-        kappa (int): Parameter for solution generation.
+        initial_solution (np.ndarray): The starting id ordering.
         guillotine_cut (bool): Whether guillotine cut is allowed.
         rotation (bool): Whether rotation is allowed.
+        incumbent (SharedIncumbent): Global best shared with other trajectories, if any.
+        slot (int): Slot of this trajectory in the incumbent.
+        restart_interval (int): Number of iterations without improvement after which the trajectory restarts
+                                from the elite solution (0 disables restarts).
+        reactive (bool): Adapt the tabu tenure to the revisited solutions, starting from tabu_list_size.
+        diversification_interval (int): Number of iterations without improvement after which the trajectory restarts
+                                        from a solution built with the long-term frequency memory (0 disables it).
+        engine (int): The placement engine used to build the bins.
+        split_rule (int): The rule deciding the orientation of the guillotine cuts.
+        bin_selection (int): The policy choosing the bin receiving the next item.
+        open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+        telemetry (callable): Called with the telemetry record of each iteration (see binpacking.telemetry),
+                              None to disable it.
+        control (SolveControl): Control polled before each iteration, and receiving the progress of the trajectory.
 
     Returns:
         tuple: Best solution and its fitness value.
     """
     
-    assert tabu_list_size < 3*len(items), "Tabu list size must be lower than 3 x number of items"
-    
     bin_width, bin_height = bin_dimensions
     
     # Create initial solution
@@ -268,29 +487,106 @@ def tabu_search(items, bin_dimensions, iteration_number, tabu_list_size, kappa,
     solution['tabu']['permutation'][1] = MIN_INT32
     solution['tabu']['rotation'] = MIN_INT32
     
-    initial_solution = generate_population(items, 1, kappa)[0]
     len_solution = len(initial_solution)
     solution['solution'][:len_solution] = initial_solution
     solution['solution'][len_solution:] = MIN_INT32  # Mark unused spots as min value int32
     best_solution = np.zeros(len_solution, dtype=np.int32)
     best_solution[:] = initial_solution
     
-    solution_fixed = np.zeros(len_solution, dtype=np.int32)
-    solution_fixed[:] = solution['solution'][:len_solution]
+    # The neighbors only differing by the ids of identical items are decoded once
+    classes = size_classes(items)
 
     # Compute fitness
-    fitness = compute_fitness(items, solution['solution'][:len_solution], (bin_width, bin_height), guillotine_cut, rotation)
+    fitness = compute_fitness(items, solution['solution'][:len_solution], (bin_width, bin_height), guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)
     best_fitness = fitness
+    if incumbent is not None:
+        incumbent.publish(slot, best_solution, best_fitness)
+    if control is not None:
+        control.report(0, best_fitness, 1, best_solution)
+    
+    clock = TelemetryClock("tabu_search", slot=slot) if telemetry is not None else None
+    evaluations = 1
+    reported_evaluations = 1
+    
     # Create empty tabu list
-    tabu_list = create_tabu_list(tabu_list_size)
+    tenure = tabu_list_size
+    tabu_list = create_tabu_list(tenure)
+    last_improvement = 0
+    
+    # Reactive tenure: hash of the sequence of size classes of a solution -> (last visit, number of visits)
+    max_tenure = max(tabu_list_size, (3*len_solution - 2) // 2)
+    visited = {}
+    last_tenure_change = 0
+    average_cycle_length = np.float64(len_solution)
+    escape = False
+    
+    # Long-term memory: how often each item was at each position
+    use_frequencies = reactive or diversification_interval > 0
+    sorted_ids = np.sort(items['id']).astype(np.int32)
+    frequencies = np.zeros((len_solution, len_solution), dtype=np.int64)
     
     for i in range(iteration_number):
+        if incumbent is not None and incumbent.should_stop():
+            break
+        if control is not None and control.should_stop():
+            break
+        
+        # Restart from the elite if the trajectory has been stuck for too long
+        if restart_interval > 0 and i - last_improvement >= restart_interval:
+            elite_solution, elite_fitness = (None, np.inf) if incumbent is None else incumbent.best()
+            if elite_solution is None or elite_fitness > best_fitness:
+                elite_solution, elite_fitness = best_solution, best_fitness
+            
+            solution['solution'][:len_solution] = elite_solution
+            fitness = elite_fitness
+            tabu_list = create_tabu_list(tenure)
+            visited.clear()
+            escape = False
+            last_improvement = i
+        
+        # Move to the least explored region if the search cycles or stagnates
+        elif escape or (diversification_interval > 0 and i - last_improvement >= diversification_interval):
+            solution['solution'][:len_solution] = get_diversified_solution(frequencies, sorted_ids, best_solution)
+            fitness = compute_fitness(items, solution['solution'][:len_solution], (bin_width, bin_height), guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)
+            tabu_list = create_tabu_list(tenure)
+            visited.clear()
+            escape = False
+            last_improvement = i
+            evaluations += 1
+        
         # Create neighborhood
-        neighborhood = get_neighborhood(solution['solution'][:len_solution], tabu_list)
+        neighborhood = get_neighborhood(solution['solution'][:len_solution], tabu_list, rotation)
         # Find best neighbor
-        solution = get_best_neighbor(neighborhood, items, (bin_width, bin_height), guillotine_cut, rotation)
+        best_index, nb_decoded = get_best_neighbor(neighborhood, items, classes, (bin_width, bin_height), guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)
+        solution = neighborhood[best_index]
         old_fitness = fitness
-        fitness = compute_fitness(items, solution['solution'][:len_solution], (bin_width, bin_height), guillotine_cut, rotation)
+        fitness = compute_fitness(items, solution['solution'][:len_solution], (bin_width, bin_height), guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)
+        evaluations += nb_decoded + 1
+        
+        if use_frequencies:
+            update_frequency_memory(frequencies, solution['solution'][:len_solution], sorted_ids)
+        
+        if reactive:
+            key = hash_class_sequence(solution['solution'][:len_solution], classes)
+            new_tenure = tenure
+            
+            # Revisiting a solution means the tenure is too short to leave the current plateau
+            if key in visited:
+                last_visit, nb_visits = visited[key]
+                average_cycle_length = 0.1 * (i - last_visit) + 0.9 * average_cycle_length
+                new_tenure = min(max_tenure, int(tenure * TENURE_INCREASE) + 1)
+                last_tenure_change = i
+                visited[key] = (i, nb_visits + 1)
+                escape = nb_visits + 1 > MAX_REPETITIONS
+            else:
+                visited[key] = (i, 1)
+                if i - last_tenure_change > average_cycle_length:
+                    new_tenure = max(1, int(tenure * TENURE_DECREASE))
+                    last_tenure_change = i
+            
+            if new_tenure != tenure:
+                tenure = new_tenure
+                tabu_list = resize_tabu_list(tabu_list, tenure)
         
         # Update tabu list
         if fitness >= old_fitness:
@@ -300,5 +596,168 @@ def tabu_search(items, bin_dimensions, iteration_number, tabu_list_size, kappa,
         elif fitness < best_fitness:
             best_fitness = fitness
             best_solution[:] = solution['solution'][:len_solution]
+            last_improvement = i
+            if incumbent is not None:
+                incumbent.publish(slot, best_solution, best_fitness)
+        
+        if control is not None:
+            control.report(i + 1, best_fitness, evaluations - reported_evaluations, best_solution)
+            reported_evaluations = evaluations
+        
+        if telemetry is not None:
+            clock.evaluations = evaluations
+            telemetry(clock.record(i, best_fitness, fitness, tenure=tenure))
+    
+    return best_solution, best_fitness
+
+def tabu_search(items, bin_dimensions, iteration_number, tabu_list_size, kappa, guillotine_cut, rotation,
+                nb_starts=1, nb_workers=None, restart_interval=0, seed=None, reactive=False, diversification_interval=0,
+                engine=LGFI_ENGINE, split_rule=SHORTER_LEFTOVER_SPLIT, bin_selection=FIRST_FIT_SELECTION, open_bins=DEFAULT_OPEN_BINS,
+                initial_solution=None, telemetry=None, control=None):
+    """
+    Perform tabu search for the bin packing problem.
+
+    Args:
+        items (list): The list of items.
+        bin_dimensions (tuple): Dimensions of the bin (width, height).
+        iteration_number (int): Number of iterations.
+        tabu_list_size (int): Size of the tabu list.
+        kappa (int): Parameter for solution generation.
+        guillotine_cut (bool): Whether guillotine cut is allowed.
+        rotation (bool): Whether rotation is allowed.
+        nb_starts (int): Number of independent trajectories. More than one runs them in a process pool.
+        nb_workers (int): Number of worker processes for a multi-start search (defaults to the number of CPUs).
+        restart_interval (int): Number of iterations without improvement after which a trajectory restarts
+                                from the elite solution (0 disables restarts).
+        seed (int): Seed of the random generator, None for a non reproducible run.
+        reactive (bool): Adapt the tabu tenure to the revisited solutions, starting from tabu_list_size.
+        diversification_interval (int): Number of iterations without improvement after which a trajectory restarts
+                                        from a solution built with the long-term frequency memory (0 disables it).
+        engine (int): The placement engine used to build the bins.
+        split_rule (int): The rule deciding the orientation of the guillotine cuts.
+        bin_selection (int): The policy choosing the bin receiving the next item.
+        open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+        initial_solution (np.ndarray): Id ordering to start from (see solution_to_ordering) instead of a sampled one.
+                                       With several starts, only the first trajectory starts from it.
+        telemetry (callable): Called with the telemetry record of each iteration (see binpacking.telemetry),
+                              None to disable it. With several starts, it is called in the worker processes
+                              and must be picklable, like JsonlTelemetry.
+        control (SolveControl): Control to cancel the search, bound its time and follow its progress. The first
+                                solution is always decoded, a stopped search returns the best solution found so far.
+                                Iterations are never interrupted, they are short since instances are limited to
+                                MAX_ITEMS items.
+
+    Returns:
+        tuple: Best solution and its fitness value.
+    """
+    
+    assert tabu_list_size < 3*len(items), "Tabu list size must be lower than 3 x number of items"
+    check_placement_engine(engine, guillotine_cut)
+    check_bin_selection(bin_selection, open_bins, engine)
+    if initial_solution is not None:
+        initial_solution = check_orderings(initial_solution, items, rotation)[0]
+    
+    if nb_starts > 1:
+        return multi_start_tabu_search(items, bin_dimensions, iteration_number, tabu_list_size, kappa, guillotine_cut, 
+                                       rotation, nb_starts, nb_workers, restart_interval, seed, reactive, 
+                                       diversification_interval, engine, split_rule, bin_selection, open_bins,
+                                       initial_solution, telemetry, control)
+    
+    if seed is not None:
+        set_seed(seed)
+    
+    if initial_solution is None:
+        initial_solution = generate_population(items, 1, kappa)[0]
+    
+    with control.watch(iteration_number) if control is not None else nullcontext():
+        return tabu_trajectory(items, bin_dimensions, iteration_number, tabu_list_size, initial_solution, 
+                               guillotine_cut, rotation, restart_interval=restart_interval, reactive=reactive, 
+                               diversification_interval=diversification_interval, engine=engine, split_rule=split_rule,
+                               bin_selection=bin_selection, open_bins=open_bins, telemetry=telemetry, control=control)
+
+def _init_tabu_worker(incumbent, control=None):
+    """
+    Initialize a multi-start worker process: share the incumbent and the control.
+    """
+    global _worker_incumbent, _worker_control
+    _worker_incumbent = incumbent
+    _worker_control = control
+
+def _run_tabu_start(slot, seed, items, bin_dimensions, iteration_number, tabu_list_size, kappa, guillotine_cut, 
+                    rotation, restart_interval, reactive, diversification_interval, engine, split_rule, bin_selection, open_bins,
+                    initial_solution=None, telemetry=None):
+    """
+    Run one trajectory of a multi-start tabu search inside a worker process.
+    """
+    set_seed(seed)
+    if initial_solution is None:
+        initial_solution = generate_population(items, 1, kappa)[0]
+    
+    return tabu_trajectory(items, bin_dimensions, iteration_number, tabu_list_size, initial_solution, guillotine_cut, 
+                           rotation, _worker_incumbent, slot, restart_interval, reactive, diversification_interval, engine, split_rule, 
+                           bin_selection, open_bins, telemetry, _worker_control)
+
+def multi_start_tabu_search(items, bin_dimensions, iteration_number, tabu_list_size, kappa, guillotine_cut, rotation, 
+                            nb_starts, nb_workers=None, restart_interval=0, seed=None, reactive=False, 
+                            diversification_interval=0, engine=LGFI_ENGINE, split_rule=SHORTER_LEFTOVER_SPLIT, 
+                            bin_selection=FIRST_FIT_SELECTION, open_bins=DEFAULT_OPEN_BINS, initial_solution=None, telemetry=None,
+                            control=None):
+    """
+    Run several independent tabu search trajectories in a process pool.
+    
+    Each trajectory has its own seed and starting solution, the first one starts from initial_solution if
+    it is given. They share their best solutions through
+    a SharedIncumbent, which is used to restart stuck trajectories from the elite and to stop every
+    trajectory as soon as one of them reaches the bin count lower bound.
+
+    Args:
+        items (list): The list of items.
+        bin_dimensions (tuple): Dimensions of the bin (width, height).
+        iteration_number (int): Number of iterations of each trajectory.
+        tabu_list_size (int): Size of the tabu list.
+        kappa (int): Parameter for solution generation.
+        guillotine_cut (bool): Whether guillotine cut is allowed.
+        rotation (bool): Whether rotation is allowed.
+        nb_starts (int): Number of trajectories.
+        nb_workers (int): Number of worker processes (defaults to the number of CPUs).
+        restart_interval (int): Number of iterations without improvement after which a trajectory restarts
+                                from the elite solution (0 disables restarts).
+        seed (int): Seed of the random generator, None for a non reproducible run.
+        reactive (bool): Adapt the tabu tenure to the revisited solutions, starting from tabu_list_size.
+        diversification_interval (int): Number of iterations without improvement after which a trajectory restarts
+                                        from a solution built with the long-term frequency memory (0 disables it).
+        engine (int): The placement engine used to build the bins.
+        split_rule (int): The rule deciding the orientation of the guillotine cuts.
+        bin_selection (int): The policy choosing the bin receiving the next item.
+        open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+        initial_solution (np.ndarray): Id ordering the first trajectory starts from, None to sample it.
+        telemetry (callable): Picklable telemetry sink called by every trajectory, None to disable it.
+        control (SolveControl): Control shared with every trajectory, which report their progress to it. Their best
+                                solutions only reach it once they all ended.
+
+    Returns:
+        tuple: Best solution and its fitness value.
+    """
+    
+    nb_workers = count_workers(nb_starts, nb_workers)
+    
+    # Reaching the lower bound on the number of bins cannot be improved upon
+    lower_bound = compute_bin_lower_bound(items, bin_dimensions)
+    incumbent = SharedIncumbent(nb_starts, len(items), target_fitness=np.nextafter(lower_bound + 1, -np.inf))
+    
+    seeds = np.random.SeedSequence(seed).generate_state(nb_starts)
+    
+    with create_process_pool(nb_workers, _init_tabu_worker, (incumbent, control)) as executor, \
+         control.watch(iteration_number) if control is not None else nullcontext():
+        futures = [executor.submit(_run_tabu_start, slot, int(seeds[slot]), items, bin_dimensions, iteration_number, 
+                                   tabu_list_size, kappa, guillotine_cut, rotation, restart_interval, reactive, 
+                                   diversification_interval, engine, split_rule, bin_selection, open_bins,
+                                   initial_solution if slot == 0 else None, telemetry)
+                   for slot in range(nb_starts)]
+        results = [future.result() for future in futures]
+    
+    best_solution, best_fitness = min(results, key=lambda result: result[1])
+    if control is not None:
+        control.report(0, best_fitness, 0, best_solution)
     
-    return best_solution, best_fitness
\ No newline at end of file
+    return best_solution, best_fitness
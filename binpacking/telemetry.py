@@ -0,0 +1,114 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from binpacking.data_manager import NumpyEncoder
+
+# Telemetry records of the searches, one per generation (genetic algorithm) or iteration (tabu search):
+# - "algorithm": "genetic_algo" or "tabu_search".
+# - "step": The generation or iteration, from 0.
+# - "best_fitness": The best fitness found so far, whose integer part is its number of bins ("bins").
+# - "fitness": The best fitness of the generation, or the fitness of the current solution of the tabu search.
+# - "mean_fitness" and "diversity" (genetic algorithm): The mean fitness of the population, and the mean fraction
+#   of the positions where an individual differs from the best one of the generation.
+# - "tenure" and "slot" (tabu search): The size of the tabu list, and the trajectory of a multi-start search.
+# - "evaluations" and "cache_hits": The orderings decoded so far, and those whose fitness was already known.
+# - "elapsed" and "evaluations_per_second": Since the start of the search.
+TELEMETRY_EXTENSION = ".jsonl"
+
+def population_diversity(population: np.ndarray, best_index: int) -> float:
+    """
+    Parameters:
+    - population (np.ndarray): The id orderings of the population, one per row.
+    - best_index (int): The row of the best individual.
+
+    Returns:
+    - float: The mean fraction of the positions where an individual differs from the best one, 0 for a population
+             of clones.
+    """
+    return float(np.mean(population != population[best_index]))
+
+class TelemetryClock:
+    """
+    Count the evaluations of a search and build its telemetry records.
+    """
+
+    def __init__(self, algorithm, **fields):
+        """
+        Parameters:
+        - algorithm (str): The name of the search, in the "algorithm" field of the records.
+        - fields: Fields added to every record.
+        """
+        self.fields = dict(fields, algorithm=algorithm)
+        self.start = time.perf_counter()
+        self.evaluations = 0
+        self.cache_hits = 0
+
+    def record(self, step, best_fitness, fitness, **fields):
+        """
+        Returns:
+        - dict: The telemetry record of a generation or iteration.
+        """
+        elapsed = time.perf_counter() - self.start
+
+        return dict(self.fields, step=step, best_fitness=float(best_fitness), fitness=float(fitness),
+                    bins=int(best_fitness), evaluations=self.evaluations, cache_hits=self.cache_hits, elapsed=elapsed,
+                    evaluations_per_second=self.evaluations / elapsed if elapsed > 0 else 0.0, **fields)
+
+class JsonlTelemetry:
+    """
+    Telemetry sink writing each record as a line of JSON, flushed at once so that the file can be followed
+    while the search runs.
+
+    The file is only opened when the first record is written, in append mode, so that a sink passed to the worker
+    processes of a multi-start tabu search is shared by its trajectories.
+    """
+
+    def __init__(self, file_path, append=False, **fields):
+        """
+        Parameters:
+        - file_path (str): The path of the JSONL file.
+        - append (bool): Keep the records already in the file, else it is emptied.
+        - fields: Fields added to every record, such as the name of the instance.
+        """
+        self.file_path = file_path
+        self.fields = fields
+        self.file = None
+
+        if not append:
+            directory = os.path.dirname(file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            open(file_path, "w").close()
+
+    def __call__(self, record):
+        if self.file is None:
+            self.file = open(self.file_path, "a")
+
+        self.file.write(json.dumps(dict(self.fields, **record), cls=NumpyEncoder) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getstate__(self):
+        # The open file stays in the process which opened it
+        return dict(self.__dict__, file=None)
+
+def load_telemetry(file_path):
+    """
+    Returns:
+    - list: The records of a JSONL telemetry file.
+    """
+    with open(file_path) as file:
+        return [json.loads(line) for line in file if line.strip()]
@@ -0,0 +1,303 @@
+import os
+
+from binpacking.structures import *
+from binpacking.data_manager import import_solution, load_items_from_file, load_solution_records, solution_to_records
+from binpacking.process_pool import count_workers, create_process_pool
+
+# Number of faulty items or bins listed for each kind of error
+MAX_REPORTED_ERRORS = 10
+
+@njit(int64[:, :](int32[:], int32[:], int32[:], int32[:], int32[:]), cache = True)
+def find_overlaps(bin_ids: np.ndarray, x: np.ndarray, y: np.ndarray, width: np.ndarray, height: np.ndarray) -> np.ndarray:
+    """
+    Find the overlapping items of a solution with a sort and sweep over each bin.
+
+    The items of a bin are sorted by x and swept from left to right. An item can only overlap the
+    items whose horizontal extent is still active, so only their vertical extents are compared.
+
+    Parameters:
+    - bin_ids (np.ndarray): The bin of each item. The items of a bin must be contiguous.
+    - x (np.ndarray): The x coordinate of each item.
+    - y (np.ndarray): The y coordinate of each item.
+    - width (np.ndarray): The width of each item.
+    - height (np.ndarray): The height of each item.
+
+    Returns:
+    - np.ndarray: The indices of the overlapping items, one pair per row.
+    """
+
+    n = len(bin_ids)
+    pairs = np.empty((16, 2), dtype=np.int64)
+    nb_pairs = 0
+    active = np.empty(n, dtype=np.int64)
+
+    start = 0
+    while start < n:
+        end = start
+        while end < n and bin_ids[end] == bin_ids[start]:
+            end += 1
+
+        order = start + np.argsort(x[start:end], kind='mergesort')
+        nb_active = 0
+
+        for k in range(end - start):
+            i = order[k]
+
+            # Keep the items still crossing the sweep line, and compare them to the new item
+            nb_kept = 0
+            for a in range(nb_active):
+                j = active[a]
+                if x[j] + width[j] > x[i]:
+                    active[nb_kept] = j
+                    nb_kept += 1
+
+                    if y[j] < y[i] + height[i] and y[i] < y[j] + height[j]:
+                        if nb_pairs == len(pairs):
+                            grown = np.empty((2 * len(pairs), 2), dtype=np.int64)
+                            grown[:nb_pairs] = pairs
+                            pairs = grown
+                        pairs[nb_pairs, 0] = j
+                        pairs[nb_pairs, 1] = i
+                        nb_pairs += 1
+
+            active[nb_kept] = i
+            nb_active = nb_kept + 1
+
+        start = end
+
+    return pairs[:nb_pairs]
+
+@njit(boolean(int32[:], int32[:], int32[:], int32[:]), cache = True)
+def is_guillotine(x: np.ndarray, y: np.ndarray, width: np.ndarray, height: np.ndarray) -> bool:
+    """
+    Check that the items of a bin can be separated by a sequence of edge to edge cuts.
+
+    A group of items is cut along every vertical line crossing none of them, or else along every
+    horizontal line, and each resulting strip is checked the same way. A group of several items
+    which can't be cut in either direction isn't guillotine. Cutting along every free line at once is
+    safe because a strip of a guillotine packing is still guillotine.
+
+    Parameters:
+    - x (np.ndarray): The x coordinate of each item.
+    - y (np.ndarray): The y coordinate of each item.
+    - width (np.ndarray): The width of each item.
+    - height (np.ndarray): The height of each item.
+
+    Returns:
+    - bool: True if the items are guillotine separable.
+    """
+
+    n = len(x)
+    indices = np.arange(n)
+
+    # Groups left to check, as ranges of indices. The groups are disjoint, so there are at most n of them.
+    stack = np.empty((n + 1, 2), dtype=np.int64)
+    stack[0, 0], stack[0, 1] = 0, n
+    nb_groups = 1
+
+    while nb_groups > 0:
+        nb_groups -= 1
+        start, end = stack[nb_groups, 0], stack[nb_groups, 1]
+        if end - start <= 1:
+            continue
+
+        cut = False
+        for vertical in (True, False):
+            position = x if vertical else y
+            size = width if vertical else height
+
+            group = indices[start:end].copy()
+            indices[start:end] = group[np.argsort(position[group], kind='mergesort')]
+
+            strip_start = start
+            strip_end = position[indices[start]] + size[indices[start]]
+            for k in range(start + 1, end):
+                i = indices[k]
+                # No item of the strip goes past the start of this one
+                if position[i] >= strip_end:
+                    stack[nb_groups, 0], stack[nb_groups, 1] = strip_start, k
+                    nb_groups += 1
+                    strip_start = k
+                    cut = True
+                strip_end = max(strip_end, position[i] + size[i])
+
+            if cut:
+                stack[nb_groups, 0], stack[nb_groups, 1] = strip_start, end
+                nb_groups += 1
+                break
+
+        if not cut:
+            return False
+
+    return True
+
+def format_errors(message, values):
+    """
+    Describe a kind of error, listing at most MAX_REPORTED_ERRORS of the faulty items or bins.
+    """
+    listed = ", ".join(str(value) for value in values[:MAX_REPORTED_ERRORS])
+    more = f" and {len(values) - MAX_REPORTED_ERRORS} more" if len(values) > MAX_REPORTED_ERRORS else ""
+
+    return f"{message}: {listed}{more}"
+
+def validate_records(records, items, rotation=True, guillotine_cut=False):
+    """
+    Check that a solution is a feasible packing of the items of its instance.
+
+    Checks that every item is placed exactly once, inside its bin, with its own dimensions (or rotated, only if
+    the flag of the item says so and rotation is allowed), that no bin holds more than MAX_ITEMS items, that no
+    items overlap and, if guillotine_cut is True, that every bin is guillotine separable.
+
+    Parameters:
+    - records (np.ndarray): The SolutionRecord array of the solution.
+    - items (np.ndarray): The items of the instance.
+    - rotation (bool): Are the items allowed to rotate.
+    - guillotine_cut (bool): Must the bins be guillotine separable.
+
+    Returns:
+    - list: The description of each kind of error found, empty if the solution is feasible.
+    """
+
+    errors = []
+    records = np.asarray(records)
+
+    # The records of a bin must be contiguous
+    if len(records) > 1 and np.any(records['bin_id'][1:] < records['bin_id'][:-1]):
+        records = records[np.argsort(records['bin_id'], kind='stable')]
+
+    # Contiguous and writable copies of the columns, the records may be a read-only memory map
+    bin_ids, x, y, width, height = (records[field].astype(np.int32)
+                                    for field in ('bin_id', 'corner_x', 'corner_y', 'width', 'height'))
+
+    # Inside the bins
+    outside = (x < 0) | (y < 0) | (width <= 0) | (height <= 0) | \
+              (x.astype(np.int64) + width > records['bin_width']) | (y.astype(np.int64) + height > records['bin_height'])
+    if np.any(outside):
+        errors.append(format_errors("Items outside of their bin", records['id'][outside]))
+
+    # Every item exactly once
+    placed_ids = np.sort(records['id'])
+    expected_ids = np.sort(items['id'])
+
+    duplicated = np.unique(placed_ids[1:][placed_ids[1:] == placed_ids[:-1]])
+    if len(duplicated):
+        errors.append(format_errors("Items placed more than once", duplicated))
+    missing = np.setdiff1d(expected_ids, placed_ids, assume_unique=True)
+    if len(missing):
+        errors.append(format_errors("Items not placed", missing))
+    unknown = np.setdiff1d(placed_ids, expected_ids)
+    if len(unknown):
+        errors.append(format_errors("Items not in the instance", unknown))
+
+    # Dimensions and orientation
+    known = np.isin(records['id'], expected_ids)
+    item_index = np.argsort(items['id'], kind='stable')[np.searchsorted(expected_ids, records['id'][known])]
+    original_width, original_height = items['width'][item_index], items['height'][item_index]
+    rotated = records['rotated'][known]
+
+    expected_width = np.where(rotated, original_height, original_width)
+    expected_height = np.where(rotated, original_width, original_height)
+    wrong_dimensions = (width[known] != expected_width) | (height[known] != expected_height)
+    if np.any(wrong_dimensions):
+        errors.append(format_errors("Items with wrong dimensions for their orientation", records['id'][known][wrong_dimensions]))
+
+    if not rotation:
+        wrongly_rotated = rotated & (original_width != original_height)
+        if np.any(wrongly_rotated):
+            errors.append(format_errors("Items rotated while rotation is not allowed", records['id'][known][wrongly_rotated]))
+
+    # Bin capacity
+    unique_bins, bin_starts, bin_counts = np.unique(bin_ids, return_index=True, return_counts=True)
+    if np.any(bin_counts > MAX_ITEMS):
+        errors.append(format_errors(f"Bins with more than {MAX_ITEMS} items", unique_bins[bin_counts > MAX_ITEMS]))
+
+    # Overlaps
+    overlaps = find_overlaps(bin_ids, x, y, width, height)
+    if len(overlaps):
+        errors.append(format_errors("Overlapping items",
+                                    [(int(records['id'][i]), int(records['id'][j])) for i, j in overlaps]))
+
+    # Guillotine cuts
+    if guillotine_cut:
+        not_guillotine = []
+        for bin_id, start, count in zip(unique_bins, bin_starts, bin_counts):
+            end = start + count
+            if not is_guillotine(x[start:end], y[start:end], width[start:end], height[start:end]):
+                not_guillotine.append(bin_id)
+
+        if not_guillotine:
+            errors.append(format_errors("Bins which are not guillotine separable", not_guillotine))
+
+    return errors
+
+def validate_solution(bins, items, rotation=True, guillotine_cut=False):
+    """
+    Check that the bins of a solution are a feasible packing of the items of its instance (see validate_records).
+
+    Parameters:
+    - bins (np.ndarray): The bins of the solution (or a list of bins).
+    - items (np.ndarray): The items of the instance.
+    - rotation (bool): Are the items allowed to rotate.
+    - guillotine_cut (bool): Must the bins be guillotine separable.
+
+    Returns:
+    - list: The description of each kind of error found, empty if the solution is feasible.
+    """
+    return validate_records(solution_to_records(bins), items, rotation, guillotine_cut)
+
+def validate_solution_file(solution_path, instance_path, rotation=True, guillotine_cut=False):
+    """
+    Check that a solution file (JSON or binary) is a feasible packing of the items of an instance file.
+
+    Returns:
+    - list: The description of each kind of error found, empty if the solution is feasible.
+    """
+    try:
+        _, _, items = load_items_from_file(instance_path)
+
+        if solution_path.endswith('.npy'):
+            records = load_solution_records(solution_path)
+        else:
+            records = solution_to_records(import_solution(solution_path))
+    except (OSError, ValueError, KeyError) as error:
+        return [f"Unreadable file: {error}"]
+
+    return validate_records(records, items, rotation, guillotine_cut)
+
+def _validate_solution_file(arguments):
+    return validate_solution_file(*arguments)
+
+def validate_solution_directory(solution_directory, instance_directory, rotation=True, guillotine_cut=False, nb_workers=None):
+    """
+    Check every solution file of a directory against its instance, in parallel processes if nb_workers isn't 1.
+
+    The instance of "<name>-solution.json" or "<name>-solution.npy" is "<name>.bp2d" in the instance directory.
+
+    Parameters:
+    - solution_directory (str): The directory of the solution files.
+    - instance_directory (str): The directory of the instance files.
+    - rotation (bool): Are the items allowed to rotate.
+    - guillotine_cut (bool): Must the bins be guillotine separable.
+    - nb_workers (int): Number of worker processes (defaults to the number of CPUs).
+
+    Returns:
+    - dict: The errors found in each solution file, empty lists for the feasible ones.
+    """
+
+    files = sorted(file for file in os.listdir(solution_directory)
+                   if file.endswith("-solution.json") or file.endswith("-solution.npy"))
+    jobs = [(os.path.join(solution_directory, file),
+             os.path.join(instance_directory, file[:file.rindex("-solution")] + ".bp2d"), rotation, guillotine_cut)
+            for file in files]
+    if not jobs:
+        return {}
+
+    nb_workers = count_workers(len(jobs), nb_workers)
+
+    if nb_workers == 1:
+        results = [_validate_solution_file(job) for job in jobs]
+    else:
+        with create_process_pool(nb_workers) as executor:
+            results = list(executor.map(_validate_solution_file, jobs, chunksize=max(1, len(jobs) // (4 * nb_workers))))
+
+    return dict(zip(files, results))
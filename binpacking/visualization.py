@@ -1,24 +1,58 @@
+import html
+import os
+
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib.patches as patches
-import tkinter as tk
-import random
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import hsv_to_rgb
+from matplotlib.figure import Figure
+
+from binpacking.data_manager import get_solution_records
+from binpacking.process_pool import count_workers, create_process_pool
+
+# Formats written by the headless renderer, chosen by the extension of the image
+IMAGE_FORMATS = ("png", "svg")
+# Solutions with more bins are rendered as thumbnails, without labels, unless asked otherwise
+MAX_LABELED_BINS = 24
+# Width of the cell of a bin in inches, and resolution of the images
+BIN_SIZE = 3.0
+THUMBNAIL_BIN_SIZE = 0.8
+# Space around each bin in inches, for its title and ticks
+LABEL_MARGIN = 0.6
+RENDER_DPI = 100
+THUMBNAIL_DPI = 72
+# Spreads the hues of consecutive item IDs around the color wheel
+GOLDEN_RATIO_CONJUGATE = 0.6180339887498949
+CONTACT_SHEET_FILE = "index.html"
 
-def random_pastel_color():
+def item_colors(ids):
     """
-    Generate a random pastel color.
-    
+    Pastel colors of items, an item ID gets the same color in every image.
+
+    Parameters:
+    - ids (np.ndarray): The IDs of the items.
+
     Returns:
-    - str: Random pastel hex color code.
+    - np.ndarray: The RGB color of each item, one per row.
     """
-    r = (random.random() + 1) / 2
-    g = (random.random() + 1) / 2
-    b = (random.random() + 1) / 2
-    return (r, g, b)
+    hues = (np.asarray(ids, dtype=np.float64) * GOLDEN_RATIO_CONJUGATE) % 1.0
+    return hsv_to_rgb(np.column_stack((hues, np.full(len(hues), 0.35), np.full(len(hues), 0.97))))
+
+def get_screen_aspect_ratio(default=16 / 9):
+    """
+    Get the aspect ratio of the screen with Tkinter, or the default one without a display.
+    """
+    try:
+        import tkinter as tk
+    except ImportError:
+        return default
+
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        # No display
+        return default
 
-def visualize_bins(bins):
-    # Get screen resolution
-    root = tk.Tk()
     root.withdraw()
     root.update_idletasks()
     root.attributes('-fullscreen', True)
@@ -27,72 +61,289 @@ def visualize_bins(bins):
     screen_height = root.winfo_screenheight()
     root.destroy()
 
-    screen_aspect_ratio = screen_width / screen_height
-    target_aspect_ratio = 16 / 9
-    
-    num_bins = len(bins)
-    
-    # Determine the optimal number of rows and columns
-    def optimal_grid(num_bins, target_ratio):
-        best_diff = float('inf')
-        best_rows = best_cols = 1
-        
-        for rows in range(1, num_bins + 1):
-            cols = (num_bins + rows - 1) // rows
-            ratio = cols / rows
-            diff = abs(ratio - target_ratio)
-            
-            if diff < best_diff:
-                best_diff = diff
-                best_rows, best_cols = rows, cols
-        
-        return best_rows, best_cols
-    
-    rows, cols = optimal_grid(num_bins, screen_aspect_ratio)
-    
-    fig, ax = plt.subplots(rows, cols, figsize=(16, 9))
-    
-    # Ensure ax is a 2D array for easy indexing
-    if rows == 1 and cols == 1:
-        ax = np.array([[ax]])
-    elif rows == 1:
-        ax = np.expand_dims(ax, axis=0)
-    elif cols == 1:
-        ax = np.expand_dims(ax, axis=1)
-    
-    for i, bin in enumerate(bins):
-        row_index = i // cols
-        col_index = i % cols
-        
-        ax[row_index, col_index].set_xlim(0, bin['width'])
-        ax[row_index, col_index].set_ylim(0, bin['height'])
-        ax[row_index, col_index].set_title(f'Bin {bin["id"]+1}')
-        ax[row_index, col_index].set_aspect('equal')
-        
-        # Draw the bin border
-        bin_border = patches.Rectangle((0, 0), bin['width'], bin['height'], edgecolor='black', facecolor='none')
-        ax[row_index, col_index].add_patch(bin_border)
-        
-        # Draw the items
-        for item in bin['items']:
-            if item['width'] == 0:  # assuming width 0 means uninitialized item
-                continue
-            
-            color = random_pastel_color()
-            rect = patches.Rectangle((item['corner_x'], item['corner_y']), item['width'], item['height'], 
-                                     edgecolor='blue', facecolor=color)
-            ax[row_index, col_index].add_patch(rect)
-            rx, ry = rect.get_xy()
-            cx = rx + rect.get_width() / 2.0
-            cy = ry + rect.get_height() / 2.0
-            ax[row_index, col_index].annotate(f'ID {item["id"]}', (cx, cy), color='black', weight='bold', 
-                                              fontsize=8, ha='center', va='center')
+    return screen_width / screen_height
+
+def optimal_grid(num_bins, target_ratio):
+    """
+    Find the number of rows and columns of the grid of bins closest to an aspect ratio (columns / rows).
+    """
+    best_diff = float('inf')
+    best_rows = best_cols = 1
+
+    for rows in range(1, num_bins + 1):
+        cols = (num_bins + rows - 1) // rows
+        ratio = cols / rows
+        diff = abs(ratio - target_ratio)
+
+        if diff < best_diff:
+            best_diff = diff
+            best_rows, best_cols = rows, cols
+
+    return best_rows, best_cols
+
+def get_bin_bounds(records):
+    """
+    Find the records of each bin of a solution.
+
+    Parameters:
+    - records (np.ndarray): The SolutionRecord array of the solution.
+
+    Returns:
+    - tuple: The records sorted by bin, and the start and end of the records of each bin.
+    """
+    bin_ids = np.asarray(records['bin_id'])
+    if len(records) > 1 and np.any(bin_ids[1:] < bin_ids[:-1]):
+        records = records[np.argsort(bin_ids, kind='stable')]
+        bin_ids = np.asarray(records['bin_id'])
+
+    starts = np.flatnonzero(np.r_[True, bin_ids[1:] != bin_ids[:-1]]) if len(records) else np.zeros(0, dtype=np.int64)
+    ends = np.r_[starts[1:], len(records)]
+
+    return records, starts, ends
+
+def rectangle_corners(x, y, width, height):
+    """
+    Corners of rectangles, counterclockwise from the bottom left one, as an array of shape (n, 4, 2).
+    """
+    right, top = x + width, y + height
+    return np.stack((np.column_stack((x, y)), np.column_stack((right, y)),
+                     np.column_stack((right, top)), np.column_stack((x, top))), axis=1)
+
+def draw_bin(ax, records, labels=True):
+    """
+    Draw a bin and its items on a matplotlib axis, the items as a single collection of polygons.
+
+    Parameters:
+    - ax (matplotlib.axes.Axes): The axis to draw on.
+    - records (np.ndarray): The SolutionRecord array of the items of the bin.
+    - labels (bool): Draw the title of the bin, the ID of each item and the ticks.
+    """
+    x, y = records['corner_x'].astype(np.float64), records['corner_y'].astype(np.float64)
+    right, top = x + records['width'], y + records['height']
+    bin_width, bin_height = int(records['bin_width'][0]), int(records['bin_height'][0])
+
+    ax.add_collection(PolyCollection(rectangle_corners(x, y, records['width'], records['height']),
+                                     facecolors=item_colors(records['id']), edgecolors='blue',
+                                     linewidths=1.0 if labels else 0.3))
+
+    # Draw the bin border
+    ax.add_patch(patches.Rectangle((0, 0), bin_width, bin_height, edgecolor='black', facecolor='none'))
+    ax.set_xlim(0, bin_width)
+    ax.set_ylim(0, bin_height)
+    ax.set_aspect('equal')
+
+    if labels:
+        ax.set_title(f'Bin {records["bin_id"][0]+1}')
+        for item_id, cx, cy in zip(records['id'], (x + right) / 2.0, (y + top) / 2.0):
+            ax.text(cx, cy, f'ID {item_id}', color='black', weight='bold', fontsize=8, ha='center', va='center')
+
+    # Placing and drawing the ticks takes most of the time, only keep the dimensions of the bin
+    ax.set_xticks([0, bin_width] if labels else [])
+    ax.set_yticks([0, bin_height] if labels else [])
+
+def draw_solution(figure, records, cols, labels=True):
+    """
+    Draw the bins of a solution on a figure, in a grid with cols columns.
+
+    Parameters:
+    - figure (matplotlib.figure.Figure): The figure to draw on.
+    - records (np.ndarray): The SolutionRecord array of the solution.
+    - cols (int): The number of columns of the grid.
+    - labels (bool): Draw the titles of the bins, the IDs of the items and the ticks.
+    """
+    records, starts, ends = get_bin_bounds(records)
+    rows = max(1, -(-len(starts) // cols))
+    ax = figure.subplots(rows, cols, squeeze=False)
+
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        draw_bin(ax[i // cols, i % cols], records[start:end], labels)
 
     # Hide any unused subplots
-    for j in range(i + 1, rows * cols):
-        fig.delaxes(ax[j // cols, j % cols])
+    for j in range(len(starts), rows * cols):
+        ax[j // cols, j % cols].remove()
+
+def draw_thumbnails(figure, records, cols):
+    """
+    Draw the bins of a solution on a single axis covering a figure, in a grid with cols columns, without labels.
+    All the items form one collection of polygons, and all the bins another one, which is much faster than
+    an axis per bin for many bins.
+
+    Parameters:
+    - figure (matplotlib.figure.Figure): The figure to draw on.
+    - records (np.ndarray): The SolutionRecord array of the solution.
+    - cols (int): The number of columns of the grid.
+    """
+    records, starts, ends = get_bin_bounds(records)
+    bin_width, bin_height = float(records['bin_width'][0]), float(records['bin_height'][0])
+    gap = 0.05 * max(bin_width, bin_height)
+
+    # Bottom left corner of each bin in the grid, the first row on top
+    bin_index = np.arange(len(starts))
+    bin_x = (bin_index % cols) * (bin_width + gap)
+    bin_y = -(bin_index // cols) * (bin_height + gap)
+    item_bin = np.repeat(bin_index, ends - starts)
+
+    ax = figure.add_axes((0, 0, 1, 1))
+    ax.add_collection(PolyCollection(rectangle_corners(bin_x[item_bin] + records['corner_x'], bin_y[item_bin] + records['corner_y'],
+                                                       records['width'].astype(np.float64), records['height'].astype(np.float64)),
+                                     facecolors=item_colors(records['id']), edgecolors='blue', linewidths=0.3))
+    ax.add_collection(PolyCollection(rectangle_corners(bin_x, bin_y, np.full(len(starts), bin_width), np.full(len(starts), bin_height)),
+                                     facecolors='none', edgecolors='black', linewidths=0.6))
+
+    rows = -(-len(starts) // cols)
+    ax.set_xlim(-gap / 2, cols * (bin_width + gap) - gap / 2)
+    ax.set_ylim(-(rows - 1) * (bin_height + gap) - gap / 2, bin_height + gap / 2)
+    ax.set_aspect('equal')
+    ax.set_axis_off()
+
+def visualize_bins(bins):
+    # Pyplot picks a GUI backend, only load it to show the bins
+    import matplotlib.pyplot as plt
+
+    records = get_solution_records(bins)
+    rows, cols = optimal_grid(len(np.unique(records['bin_id'])), get_screen_aspect_ratio())
+
+    fig = plt.figure(figsize=(16, 9))
+    draw_solution(fig, records, cols)
 
     plt.tight_layout()
     plt.show()
 
+def render_solution(solution, image_path, thumbnail=None, cols=None):
+    """
+    Render the bins of a solution to an image file without a display, a PNG or SVG file depending on its extension.
+
+    Parameters:
+    - solution (str | np.ndarray): The path of a solution file (JSON or binary), the bins of a solution or its records.
+    - image_path (str): The path of the image.
+    - thumbnail (bool): Draw small bins without labels. By default, only for more than MAX_LABELED_BINS bins.
+    - cols (int): The number of bins per row, by default the grid is close to 16:9.
+
+    Returns:
+    - str: The path of the image.
+    """
+
+    image_format = os.path.splitext(image_path)[1][1:].lower()
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format: {image_format}, expected one of {', '.join(IMAGE_FORMATS)}")
+
+    records = get_solution_records(solution)
+    if len(records) == 0:
+        raise ValueError("The solution has no items")
+
+    nb_bins = len(np.unique(records['bin_id']))
+    if thumbnail is None:
+        thumbnail = nb_bins > MAX_LABELED_BINS
+    if cols is None:
+        _, cols = optimal_grid(nb_bins, 16 / 9)
+    rows = -(-nb_bins // cols)
+
+    # The cells keep the aspect ratio of the bins
+    aspect_ratio = records['bin_height'][0] / records['bin_width'][0]
+    if thumbnail:
+        figure = Figure(figsize=(cols * THUMBNAIL_BIN_SIZE, rows * THUMBNAIL_BIN_SIZE * aspect_ratio))
+        draw_thumbnails(figure, records, cols)
+    else:
+        # Fixed margins for the titles and ticks, tight_layout would draw the figure twice
+        bin_height = BIN_SIZE * aspect_ratio
+        figure_width, figure_height = cols * (BIN_SIZE + LABEL_MARGIN) + LABEL_MARGIN, rows * (bin_height + LABEL_MARGIN) + LABEL_MARGIN
+        figure = Figure(figsize=(figure_width, figure_height))
+        draw_solution(figure, records, cols)
+        figure.subplots_adjust(left=LABEL_MARGIN / figure_width, right=1 - LABEL_MARGIN / (2 * figure_width),
+                               bottom=LABEL_MARGIN / (2 * figure_height), top=1 - LABEL_MARGIN / figure_height,
+                               wspace=LABEL_MARGIN / BIN_SIZE, hspace=LABEL_MARGIN / bin_height)
+
+    # A bare Figure isn't managed by pyplot, it is drawn by the Agg (or SVG) backend whatever the display
+    figure.savefig(image_path, dpi=THUMBNAIL_DPI if thumbnail else RENDER_DPI)
+
+    return image_path
+
+def render_solution_file(solution_path, image_path, thumbnail=None):
+    """
+    Render a solution file to an image file (see render_solution).
+
+    Returns:
+    - str: The description of the error, None if the image was written.
+    """
+    try:
+        render_solution(solution_path, image_path, thumbnail)
+    except (OSError, ValueError, KeyError) as error:
+        return f"Unreadable file: {error}"
+
+    return None
+
+def _render_solution_file(arguments):
+    return render_solution_file(*arguments)
+
+def write_contact_sheet(images, sheet_path, errors=None):
+    """
+    Write an HTML page showing images in a grid, with their names.
+
+    Parameters:
+    - images (dict): The path of each image, by name.
+    - sheet_path (str): The path of the HTML page. The images are linked relatively to its directory.
+    - errors (dict): The error of the images which couldn't be written, by name.
+    """
+    errors = errors or {}
+    directory = os.path.dirname(os.path.abspath(sheet_path))
+
+    cells = []
+    for name, image_path in images.items():
+        caption = html.escape(name)
+        if errors.get(name):
+            cells.append(f'<figure class="error"><figcaption>{caption}<br>{html.escape(errors[name])}</figcaption></figure>')
+        else:
+            source = html.escape(os.path.relpath(os.path.abspath(image_path), directory).replace(os.sep, "/"))
+            cells.append(f'<figure><a href="{source}"><img src="{source}" loading="lazy"></a><figcaption>{caption}</figcaption></figure>')
+
+    page = "\n".join([
+        "<!DOCTYPE html>",
+        '<html><head><meta charset="utf-8"><title>Solutions</title><style>',
+        "body { font-family: sans-serif; display: grid; grid-template-columns: repeat(auto-fill, minmax(320px, 1fr)); gap: 12px; }",
+        "figure { margin: 0; } img { width: 100%; border: 1px solid #ccc; } .error { color: #b00; }",
+        "</style></head><body>",
+        *cells,
+        "</body></html>",
+    ])
+    with open(sheet_path, "w") as file:
+        file.write(page)
+
+def render_solution_directory(solution_directory, image_directory, image_format="png", thumbnail=None, nb_workers=None):
+    """
+    Render every solution file of a directory to an image, in parallel processes if nb_workers isn't 1, and write
+    an HTML contact sheet of the images (CONTACT_SHEET_FILE in the image directory).
+
+    The image of "<name>-solution.json" or "<name>-solution.npy" is "<name>-solution.<image_format>".
+
+    Parameters:
+    - solution_directory (str): The directory of the solution files.
+    - image_directory (str): The directory of the images, created if needed.
+    - image_format (str): "png" or "svg".
+    - thumbnail (bool): Draw small bins without labels. By default, only for more than MAX_LABELED_BINS bins.
+    - nb_workers (int): Number of worker processes (defaults to the number of CPUs).
+
+    Returns:
+    - dict: The error of each solution file, None for the rendered ones.
+    """
+
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format: {image_format}, expected one of {', '.join(IMAGE_FORMATS)}")
+
+    files = sorted(file for file in os.listdir(solution_directory)
+                   if file.endswith("-solution.json") or file.endswith("-solution.npy"))
+    images = {file: os.path.join(image_directory, f"{os.path.splitext(file)[0]}.{image_format}") for file in files}
+    jobs = [(os.path.join(solution_directory, file), images[file], thumbnail) for file in files]
+
+    os.makedirs(image_directory, exist_ok=True)
+    nb_workers = count_workers(len(jobs), nb_workers)
+
+    if nb_workers <= 1:
+        results = [_render_solution_file(job) for job in jobs]
+    else:
+        with create_process_pool(nb_workers) as executor:
+            results = list(executor.map(_render_solution_file, jobs))
+
+    errors = dict(zip(files, results))
+    write_contact_sheet(images, os.path.join(image_directory, CONTACT_SHEET_FILE), errors)
 
+    return errors
@@ -0,0 +1,101 @@
+from binpacking.structures import *
+from binpacking.data_manager import get_solution_records
+from binpacking.fitness import compute_fitnesses
+
+def check_orderings(orderings, items, rotation=True):
+    """
+    Check that seed orderings are id orderings of the items, for warm starting a metaheuristic.
+
+    Parameters:
+    - orderings (np.ndarray): An id ordering, or an array with one ordering per row.
+    - items (np.ndarray): The items of the instance.
+    - rotation (bool): Are the items allowed to rotate. If not, the rotations of the orderings are dropped.
+
+    Returns:
+    - np.ndarray: The orderings, as an int32 array with one ordering per row.
+    """
+
+    orderings = np.atleast_2d(np.asarray(orderings, dtype=np.int32))
+    if not rotation:
+        orderings = np.abs(orderings)
+
+    expected_ids = np.sort(items['id'])
+    if orderings.shape[1] != len(items) or np.any(np.sort(np.abs(orderings), axis=1) != expected_ids):
+        raise ValueError("A seed ordering must hold the id of every item exactly once")
+
+    return orderings
+
+def records_to_orderings(records, items):
+    """
+    Build the candidate id orderings replaying a solution.
+
+    Each ordering lists the bins of the solution in order. The items of each bin are listed in the order they
+    were placed (the order of the records), bottom-left first (by y then x), left-bottom first (by x then y) or
+    largest first. Replaying the placement order rebuilds the packing of a solution found with the same
+    placement parameters, the other orders may pack it better, or help for a solution found with other
+    parameters. The rotated items get a negative id. The items of the instance missing from the solution come last, largest first, and the
+    records of items which aren't in the instance are dropped, so a solution of a slightly different
+    instance still gives valid orderings.
+
+    Parameters:
+    - records (np.ndarray): The SolutionRecord array of the solution.
+    - items (np.ndarray): The items of the instance.
+
+    Returns:
+    - np.ndarray: The candidate orderings, one per row.
+    """
+
+    records = np.asarray(records)
+    records = records[np.isin(records['id'], items['id'])]
+    # A duplicated item keeps its first placement
+    _, first = np.unique(records['id'], return_index=True)
+    records = records[np.sort(first)]
+
+    ids = np.where(records['rotated'], -records['id'], records['id']).astype(np.int32)
+    areas = records['width'].astype(np.int64) * records['height']
+
+    missing = items[~np.isin(items['id'], records['id'])]
+    missing_areas = missing['width'].astype(np.int64) * missing['height']
+    missing_ids = missing['id'][np.argsort(-missing_areas, kind='stable')]
+
+    # Secondary sort keys within each bin, the last key is the primary one
+    bin_keys = [(np.arange(len(records)),), (records['corner_x'], records['corner_y']), 
+                (records['corner_y'], records['corner_x']), (-areas,)]
+
+    orderings = np.empty((len(bin_keys), len(items)), dtype=np.int32)
+    for k, keys in enumerate(bin_keys):
+        orderings[k, :len(records)] = ids[np.lexsort(keys + (records['bin_id'],))]
+        orderings[k, len(records):] = missing_ids
+
+    return orderings
+
+def solution_to_ordering(solution, items, bin_dimensions, guillotine_cut, rotation, engine=LGFI_ENGINE,
+                         split_rule=SHORTER_LEFTOVER_SPLIT, bin_selection=FIRST_FIT_SELECTION, open_bins=DEFAULT_OPEN_BINS):
+    """
+    Convert a solution into an id ordering from which to warm start a metaheuristic.
+
+    The candidate orderings of records_to_orderings are decoded with the given parameters, and the one
+    with the best fitness is kept. For a solution found with the same parameters, it decodes to the same
+    packing or a better one, and a metaheuristic seeded with it never returns a worse solution.
+
+    Parameters:
+    - solution (str | np.ndarray): The path of a solution file (JSON or binary), the bins of a solution or its records.
+    - items (np.ndarray): The items of the instance.
+    - bin_dimensions (tuple): Tuple containing the width and height of the bin.
+    - guillotine_cut (bool): Should the guillotine cut rule be applied.
+    - rotation (bool): Should the items be able to rotate.
+    - engine (int): The placement engine used to build the bins.
+    - split_rule (int): The rule deciding the orientation of the guillotine cuts.
+    - bin_selection (int): The policy choosing the bin receiving the next item.
+    - open_bins (int): Number of bins kept open with LAST_K_SELECTION.
+
+    Returns:
+    - tuple: The ordering and its fitness.
+    """
+
+    records = get_solution_records(solution)
+    orderings = check_orderings(records_to_orderings(records, items), items, rotation)
+    fitnesses = compute_fitnesses(orderings, items, bin_dimensions, guillotine_cut, rotation, engine, split_rule, bin_selection, open_bins)
+    best_index = np.argmin(fitnesses)
+
+    return orderings[best_index], fitnesses[best_index]
@@ -4,11 +4,26 @@ from numba import config
 # Useful for performance comparison
 config.DISABLE_JIT = False
 
-from binpacking.genetic_algo.gen_algo import initialize_numba_functions
-from solutions_helper import generate_all_solutions, generate_single_solution, Metaheuristic, visualize_solution
+from binpacking.kernel_cache import prepare_kernels, print_startup_times, timed_phase
+
+# Check the cache of compiled kernels before they are loaded from it
+with timed_phase("Kernel cache check"):
+    KERNEL_CACHE_PROBLEMS = prepare_kernels()
+
+with timed_phase("Kernel loading"):
+    from solutions_helper import generate_all_solutions, generate_single_solution, Metaheuristic, visualize_solution
+from binpacking.structures import LGFI_ENGINE, SKYLINE_ENGINE, MAXRECTS_ENGINE
+from binpacking.structures import SHORTER_LEFTOVER_SPLIT, LONGER_LEFTOVER_SPLIT, MIN_AREA_SPLIT, MAX_AREA_SPLIT, HYBRID_FIT_SPLIT
+from binpacking.structures import FIRST_FIT_SELECTION, BEST_FIT_SELECTION, LAST_K_SELECTION, DEFAULT_OPEN_BINS
     
 INPUT_DATA_DIRECTORY = "data"
 OUTPUT_DATA_DIRECTORY = "solutions"
+SOLUTION_FORMAT = "json" # "json", or "npy" for compact binary solutions
+BATCH_WORKERS = None # Processes solving the files in parallel with generate_all_solutions (None = one per CPU)
+WARM_START = False # Start from the solution already in OUTPUT_DATA_DIRECTORY, if any
+TELEMETRY_DIRECTORY = None # Directory of the JSONL telemetry of each search, one record per generation or iteration (None = disabled)
+PREPROCESS = False # Pack the items whose bin is known in advance in fixed bins, and only search the other items
+FITNESS_CACHE = False # Don't decode the same ordering twice in the GA (worth it on small instances or converged populations)
 
 # Parameters for Genetic Algorithm
 POPULATION_SIZE = 10
@@ -20,6 +35,10 @@ MUTATION_RATE = 0.3
 # Parameters for the Unified Tabu Search
 ITERATION_NUMBER = 200
 TABU_LIST_SIZE = 10
+NB_TABU_STARTS = 1 # More than 1 runs independent trajectories in parallel processes
+RESTART_INTERVAL = 0 # Iterations without improvement before restarting from the elite (0 = never)
+REACTIVE_TABU = False # Adapt the tabu list size when solutions are revisited
+DIVERSIFICATION_INTERVAL = 0 # Iterations without improvement before a frequency-based restart (0 = never)
 
 # Genetic Parameters
 KAPPA = 1 # Must be >= 1 (For both GA and TABU)
@@ -28,7 +47,16 @@ DELTA = 1 # Must be >= 1 (Only for GA)
 GUILLOTINE = True
 ROTATION = True
 
+# LGFI_ENGINE, or SKYLINE_ENGINE / MAXRECTS_ENGINE (faster, only when GUILLOTINE = False)
+PLACEMENT_ENGINE = LGFI_ENGINE
+# Rule deciding the orientation of the guillotine cuts (only with LGFI_ENGINE and GUILLOTINE = True)
+SPLIT_RULE = HYBRID_FIT_SPLIT
+# FIRST_FIT_SELECTION, BEST_FIT_SELECTION (fullest bin first) or LAST_K_SELECTION (only the last OPEN_BINS bins stay open)
+BIN_SELECTION = FIRST_FIT_SELECTION
+OPEN_BINS = DEFAULT_OPEN_BINS # Only with LAST_K_SELECTION
+
 SELECTED_METAHEURISTIC = Metaheuristic.GA
+SEED = None # Seed of the random generator, None for a non reproducible run
 
 assert KAPPA >= 1, "KAPPA must be >= 1"
 assert DELTA >= 1, "DELTA must be >= 1"
@@ -36,26 +64,34 @@ assert DELTA >= 1, "DELTA must be >= 1"
 if __name__ == "__main__":
 
     # ====================== Compile code ======================
-    # You should first execute this single line to compile everything and cache the compiled code
-    # This allows future compilations time to be waaaaaaay faster
+    # You should first run "python -m binpacking.kernel_cache build" to compile everything and cache the compiled code
+    # This allows future startups to be waaaaaaay faster, without it each kernel is compiled the first time it is used
     
-    initialize_numba_functions(advanced=True)
+    for problem in KERNEL_CACHE_PROBLEMS:
+        print(problem)
+    print_startup_times()
     
     # ====================== Generate All Solutions ======================
 
     # generate_all_solutions(SELECTED_METAHEURISTIC, ITERATION_NUMBER, TABU_LIST_SIZE, KAPPA, GUILLOTINE, ROTATION, 
     #                        POPULATION_SIZE, NB_GENERATIONS, CROSSOVER_RATE, MUTATION_RATE, DELTA, 
-    #                        INPUT_DATA_DIRECTORY, OUTPUT_DATA_DIRECTORY)
+    #                        INPUT_DATA_DIRECTORY, OUTPUT_DATA_DIRECTORY, NB_TABU_STARTS, RESTART_INTERVAL,
+    #                        REACTIVE_TABU, DIVERSIFICATION_INTERVAL, PLACEMENT_ENGINE, SPLIT_RULE, BIN_SELECTION, OPEN_BINS,
+    #                        BATCH_WORKERS, SEED, solution_format=SOLUTION_FORMAT, warm_start=WARM_START,
+    #                        telemetry_directory=TELEMETRY_DIRECTORY, preprocess=PREPROCESS, fitness_cache=FITNESS_CACHE)
             
     # =================== Generate One Solutions ==================
     
     file = "binpacking2d-06.bp2d" # Just chnage the dataset number to generate another solution
     
     generate_single_solution(file, SELECTED_METAHEURISTIC, ITERATION_NUMBER, TABU_LIST_SIZE, KAPPA, GUILLOTINE, ROTATION,
-                             POPULATION_SIZE, NB_GENERATIONS, CROSSOVER_RATE, MUTATION_RATE, DELTA, INPUT_DATA_DIRECTORY, OUTPUT_DATA_DIRECTORY)
+                             POPULATION_SIZE, NB_GENERATIONS, CROSSOVER_RATE, MUTATION_RATE, DELTA, INPUT_DATA_DIRECTORY, OUTPUT_DATA_DIRECTORY,
+                             NB_TABU_STARTS, RESTART_INTERVAL, REACTIVE_TABU, DIVERSIFICATION_INTERVAL, PLACEMENT_ENGINE, SPLIT_RULE,
+                             BIN_SELECTION, OPEN_BINS, SEED, SOLUTION_FORMAT, WARM_START, TELEMETRY_DIRECTORY, PREPROCESS,
+                             FITNESS_CACHE)
     
     
     # ====================== Visualize Solutions ======================
     
-    file = "binpacking2d-06-solution.json" # Just chnage the solution number to visualize another solution
+    file = f"binpacking2d-06-solution.{SOLUTION_FORMAT}" # Just chnage the solution number to visualize another solution
     visualize_solution(file, OUTPUT_DATA_DIRECTORY)
\ No newline at end of file
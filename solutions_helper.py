@@ -1,75 +1,59 @@
+from concurrent.futures import as_completed
 from enum import Enum
+import hashlib
+import json
 import os
 import time
 
-from binpacking.data_manager import export_solutions_to_json, import_solution_from_json, load_items_from_file
-from binpacking.genetic_algo.gen_algo import genetic_algo, initialize_numba_functions
-from binpacking.lgfi import lgfi
+import numpy as np
+
+from binpacking.data_manager import compute_file_hash, export_solution, import_solution, load_items_from_file
+from binpacking.data_manager import BINARY_INSTANCE_EXTENSION, load_manifest, save_manifest
+from binpacking.genetic_algo.gen_algo import genetic_algo
+from binpacking.decoder import decode
+from binpacking.fitness import compute_bin_lower_bound
 from binpacking.population_generation import get_corresponding_sequence_by_id
+from binpacking.preprocessing import reduce_instance
+from binpacking.process_pool import count_workers, create_process_pool
+from binpacking.structures import Bin, LGFI_ENGINE, SHORTER_LEFTOVER_SPLIT, FIRST_FIT_SELECTION, DEFAULT_OPEN_BINS
+from binpacking.symmetry import canonical_ordering
 from binpacking.tabu_search import tabu_search
-from binpacking.visualization import visualize_bins
+from binpacking.telemetry import TELEMETRY_EXTENSION, JsonlTelemetry
+from binpacking.validation import validate_solution
+from binpacking.warm_start import solution_to_ordering
 
 class Metaheuristic(Enum):
     GA = 0
     TABU = 1
 
+# Record of the solved files of a batch, in the output directory
+MANIFEST_FILE = "manifest.json"
+# Extensions of the solution files: JSON, or one binary record per item (much faster to read and write)
+SOLUTION_FORMATS = ("json", "npy")
 
-def generate_all_solutions(selected_metaheuristic, iteration_number, tabu_list_size, kappa, guillotine, rotation, 
-                        population_size, nb_generations, crossover_rate, mutation_rate, delta, 
-                        input_data_directory, output_data_directory):
+
+def solve_file(file, selected_metaheuristic, iteration_number, tabu_list_size, kappa, guillotine, rotation, 
+               population_size, nb_generations, crossover_rate, mutation_rate, delta,
+               input_data_directory, output_data_directory, nb_starts=1, restart_interval=0,
+               reactive=False, diversification_interval=0, engine=LGFI_ENGINE, split_rule=SHORTER_LEFTOVER_SPLIT,
+               bin_selection=FIRST_FIT_SELECTION, open_bins=DEFAULT_OPEN_BINS, seed=None, solution_format="json", warm_start=False,
+               telemetry_directory=None, preprocess=False, fitness_cache=False):
+    """
+    Solve a single instance file and save its solution, without printing anything.
     
-    for file in os.listdir(input_data_directory):
-        if file.endswith(".bp2d"):
-            
-            file_name = "".join(file.split('.')[:-1])
-            full_path = os.path.join(input_data_directory, file)
-            
-            bin_width, bin_height, items = load_items_from_file(full_path)
-            
-            print(f"===================== {file_name} =====================")
-            print(f"Bin dimensions: {bin_width}x{bin_height}")
-            print(f"Number of items: {len(items)}")
-            
-            start = time.perf_counter()
-            
-            # Check if the selected metaheuristic is an enum value
-            if selected_metaheuristic == Metaheuristic.TABU:
-                # ====================== Tabu Search ======================
-                best_solution, _ = tabu_search(items=items,
-                                               bin_dimensions=(bin_width, bin_height),
-                                               iteration_number=iteration_number,
-                                               tabu_list_size=tabu_list_size,
-                                               kappa=kappa,
-                                               guillotine_cut=guillotine,
-                                               rotation=rotation)
-            else:
-                # ====================== Genetic Algo ======================
-                best_solution, _ = genetic_algo(items=items,
-                                                bin_dimensions=(bin_width, bin_height),
-                                                population_size=population_size,
-                                                nb_generations=nb_generations,
-                                                crossover_rate=crossover_rate,
-                                                mutation_rate=mutation_rate,
-                                                kappa=kappa,
-                                                delta=delta,
-                                                guillotine_cut=guillotine,
-                                                rotation=rotation)
-            
-            ordered_items = get_corresponding_sequence_by_id(items, best_solution)
-            solution = lgfi(ordered_items, bin_width=bin_width, bin_height=bin_height, 
-                            guillotine_cut=guillotine, rotation=rotation)
-            time_elapsed = time.perf_counter() - start
-            
-            solution_file_path = os.path.join(output_data_directory, file_name + "-solution.json") 
-            export_solutions_to_json(solution, solution_file_path)
-            
-            print(f"Time elapsed: {time_elapsed:.1f} seconds")
-            print(f"Best solution: {len(solution)} bins")
-            print(f"Solution saved to: {solution_file_path}\n")
-            
-def generate_single_solution(file, selected_metaheuristic, iteration_number, tabu_list_size, kappa, 
-            guillotine, rotation, population_size, nb_generations, crossover_rate, mutation_rate, delta,
-            input_data_directory, output_data_directory):
+    The solution is saved in JSON, or in the compact binary format of export_solution_to_binary if
+    solution_format is "npy". If warm_start is True and the output directory already holds a solution of
+    the file, the metaheuristic starts from it (see solution_to_ordering). With a telemetry directory, the
+    telemetry records of the search are written to <file name>-telemetry.jsonl in it. With preprocess, the
+    items whose bin is known in advance are packed in fixed bins, and the metaheuristic only searches the
+    other items (see reduce_instance). With fitness_cache, the genetic algorithm doesn't decode the same
+    ordering twice.
+
+    Returns:
+    - dict: The file name, number of items, bin dimensions, number of bins, bin count lower bound,
+            elapsed time, path of the saved solution, errors found by the solution validator, and the
+            number of items and bins fixed by the preprocessing.
+    """
 
     file_name = "".join(file.split('.')[:-1])
     
@@ -77,25 +61,55 @@ def generate_single_solution(file, selected_metaheuristic, iteration_number, tab
     
     bin_width, bin_height, items = load_items_from_file(full_path)
     
-    print(f"===================== {file_name} =====================")
-    print(f"Bin dimensions: {bin_width}x{bin_height}")
-    print(f"Number of items: {len(items)}")
-    
     start = time.perf_counter()
     
+    reduction = reduce_instance(items, (bin_width, bin_height), rotation) if preprocess else None
+    search_items = reduction.items if reduction is not None else items
+    
+    initial_solution = None
+    previous_solution_path = find_solution_file(output_data_directory, file_name, solution_format) if warm_start else None
+    if previous_solution_path is not None:
+        initial_solution, _ = solution_to_ordering(previous_solution_path, items, (bin_width, bin_height), guillotine, 
+                                                   rotation, engine, split_rule, bin_selection, open_bins)
+        if reduction is not None:
+            initial_solution = reduction.reduce_ordering(initial_solution)
+    
+    telemetry = None
+    if telemetry_directory is not None:
+        telemetry = JsonlTelemetry(os.path.join(telemetry_directory, f"{file_name}-telemetry{TELEMETRY_EXTENSION}"),
+                                   instance=file_name)
+    
+    if reduction is not None:
+        # The reduced instance may be too small for the tabu list
+        tabu_list_size = min(tabu_list_size, 3 * len(search_items) - 1)
+    
     # Check if the selected metaheuristic is an enum value
-    if selected_metaheuristic == Metaheuristic.TABU:
+    if len(search_items) == 0:
+        # Every item is in a fixed bin
+        best_solution = np.zeros(0, dtype=np.int32)
+    elif selected_metaheuristic == Metaheuristic.TABU:
         # ====================== Tabu Search ======================
-        best_solution, best_fitness = tabu_search(items=items,
+        best_solution, best_fitness = tabu_search(items=search_items,
                                                   bin_dimensions=(bin_width, bin_height),
                                                   iteration_number=iteration_number,
                                                   tabu_list_size=tabu_list_size,
                                                   kappa=kappa,
                                                   guillotine_cut=guillotine,
-                                                  rotation=rotation)
+                                                  rotation=rotation,
+                                                  nb_starts=nb_starts,
+                                                  restart_interval=restart_interval,
+                                                  reactive=reactive,
+                                                  diversification_interval=diversification_interval,
+                                                  engine=engine,
+                                                  split_rule=split_rule,
+                                                  bin_selection=bin_selection,
+                                                  open_bins=open_bins,
+                                                  seed=seed,
+                                                  initial_solution=initial_solution,
+                                                  telemetry=telemetry)
     else:
         # ====================== Genetic Algo ======================
-        best_solution, best_fitness = genetic_algo(items=items,
+        best_solution, best_fitness = genetic_algo(items=search_items,
                                                    bin_dimensions=(bin_width, bin_height),
                                                    population_size=population_size,
                                                    nb_generations=nb_generations,
@@ -104,21 +118,278 @@ def generate_single_solution(file, selected_metaheuristic, iteration_number, tab
                                                    kappa=kappa,
                                                    delta=delta,
                                                    guillotine_cut=guillotine,
-                                                   rotation=rotation)
+                                                   rotation=rotation,
+                                                   engine=engine,
+                                                   split_rule=split_rule,
+                                                   bin_selection=bin_selection,
+                                                   open_bins=open_bins,
+                                                   seed=seed,
+                                                   initial_solutions=initial_solution,
+                                                   telemetry=telemetry,
+                                                   fitness_cache=fitness_cache)
     
-    ordered_items = get_corresponding_sequence_by_id(items, best_solution)
-    solution = lgfi(ordered_items, bin_width=bin_width, bin_height=bin_height, 
-                    guillotine_cut=guillotine, rotation=rotation)
+    if telemetry is not None:
+        telemetry.close()
+    
+    solution = np.zeros(0, dtype=Bin)
+    if len(best_solution):
+        # The ids of identical items are only bound to the packing here, equivalent orderings give the same file
+        best_solution = canonical_ordering(best_solution, search_items, rotation)
+        ordered_items = get_corresponding_sequence_by_id(search_items, best_solution)
+        solution = decode(ordered_items, bin_width=bin_width, bin_height=bin_height, 
+                          guillotine_cut=guillotine, rotation=rotation, engine=engine, split_rule=split_rule,
+                          bin_selection=bin_selection, open_bins=open_bins)
+    if reduction is not None:
+        solution = reduction.restore_solution(solution)
     time_elapsed = time.perf_counter() - start
     
-    solution_file_path = os.path.join(output_data_directory, file_name + "-solution.json")
-    export_solutions_to_json(solution, solution_file_path)
+    solution_file_path = os.path.join(output_data_directory, f"{file_name}-solution.{solution_format}")
+    export_solution(solution, solution_file_path)
+    
+    return {
+        'file_name': file_name,
+        'nb_items': len(items),
+        'bin_width': bin_width,
+        'bin_height': bin_height,
+        'nb_bins': len(solution),
+        'lower_bound': int(compute_bin_lower_bound(items, (bin_width, bin_height))),
+        'time': time_elapsed,
+        'solution_file_path': solution_file_path,
+        'errors': validate_solution(solution, items, rotation, guillotine),
+        'nb_fixed_items': reduction.nb_fixed_items if reduction is not None else 0,
+        'nb_fixed_bins': reduction.nb_fixed_bins if reduction is not None else 0
+    }
+
+def find_solution_file(output_data_directory, file_name, solution_format="json"):
+    """
+    Find the saved solution of an instance, preferably in the given format.
+
+    Returns:
+    - str: The path of the solution file, None if the instance has no saved solution.
+    """
+    for extension in sorted(SOLUTION_FORMATS, key=lambda extension: extension != solution_format):
+        solution_file_path = os.path.join(output_data_directory, f"{file_name}-solution.{extension}")
+        if os.path.isfile(solution_file_path):
+            return solution_file_path
+    
+    return None
+
+def print_solution_report(result, progress=""):
+    """
+    Print the report of a solved instance file, as returned by solve_file, followed by progress in its title.
+    """
+    print(f"===================== {result['file_name']} ====================={progress}")
+    print(f"Bin dimensions: {result['bin_width']}x{result['bin_height']}")
+    print(f"Number of items: {result['nb_items']}")
+    print(f"Time elapsed: {result['time']:.1f} seconds")
+    print(f"Best solution: {result['nb_bins']} bins")
+    if result.get('nb_fixed_items'):
+        print(f"Fixed by preprocessing: {result['nb_fixed_items']} items in {result['nb_fixed_bins']} bins")
+    for error in result.get('errors', []):
+        print(f"Invalid solution: {error}")
+    print(f"Solution saved to: {result['solution_file_path']}\n", flush=True)
+
+def print_batch_summary(results, wall_time, failures=None):
+    """
+    Print a table of the solved instances, sorted by file name, with the gap to the bin count lower bound.
+    The files solved by a previous batch are marked with a *, and the files which failed are listed below it.
+    """
+    
+    name_width = max([len("Instance")] + [len(result['file_name']) for result in results])
+    header = f"{'Instance':<{name_width}} | {'Items':>6} | {'Bins':>5} | {'LB':>5} | {'Gap':>4} | {'Time (s)':>9}"
+    
+    print(header)
+    print("-" * len(header))
+    for result in sorted(results, key=lambda result: result['file_name']):
+        gap = result['nb_bins'] - result['lower_bound']
+        print(f"{result['file_name']:<{name_width}} | {result['nb_items']:>6} | {result['nb_bins']:>5} | "
+              f"{result['lower_bound']:>5} | {gap:>4} | {result['time']:>9.1f}{' *' if result.get('cached') else ''}")
+    print("-" * len(header))
+    
+    total_bins = sum(result['nb_bins'] for result in results)
+    total_gap = sum(result['nb_bins'] - result['lower_bound'] for result in results)
+    total_time = sum(result['time'] for result in results)
+    print(f"{'Total':<{name_width}} | {'':>6} | {total_bins:>5} | {'':>5} | {total_gap:>4} | {total_time:>9.1f}")
+    invalid = [result['file_name'] for result in results if result.get('errors')]
+    if invalid:
+        print(f"Invalid solutions: {', '.join(sorted(invalid))}")
+    if failures:
+        print(f"Failed files: {', '.join(sorted(failures))}")
+    print(f"Wall time: {wall_time:.1f} seconds\n")
+
+def check_solution_format(solution_format):
+    """
+    Check that the solution format is one of SOLUTION_FORMATS before solving anything.
+    """
+    if solution_format not in SOLUTION_FORMATS:
+        raise ValueError(f"Unknown solution format: {solution_format}, expected one of {SOLUTION_FORMATS}")
+
+def get_job_key(instance_hash, file, selected_metaheuristic, parameters, seed):
+    """
+    Identify a job of a batch by its instance file, its content and everything that affects its solution. Two files
+    with the same content are distinct jobs, each one writes its own solution file.
+
+    Returns:
+    - str: The SHA-256 hash of the job description.
+    """
+    description = json.dumps({'instance': instance_hash, 'file': file, 'metaheuristic': selected_metaheuristic.name, 
+                              'parameters': parameters, 'seed': seed}, sort_keys=True)
+    
+    return hashlib.sha256(description.encode()).hexdigest()
+
+def is_job_solved(job):
+    """
+    Check that the solution saved by a job of the manifest is still there and unchanged.
+    """
+    return job is not None and os.path.isfile(job['solution_file_path']) and \
+           compute_file_hash(job['solution_file_path']) == job['solution_sha256']
+
+def generate_all_solutions(selected_metaheuristic, iteration_number, tabu_list_size, kappa, guillotine, rotation, 
+                        population_size, nb_generations, crossover_rate, mutation_rate, delta, 
+                        input_data_directory, output_data_directory, nb_starts=1, restart_interval=0,
+                        reactive=False, diversification_interval=0, engine=LGFI_ENGINE, split_rule=SHORTER_LEFTOVER_SPLIT,
+                        bin_selection=FIRST_FIT_SELECTION, open_bins=DEFAULT_OPEN_BINS, nb_workers=None, seed=None, force=False,
+                        solution_format="json", warm_start=False, telemetry_directory=None, preprocess=False,
+                        fitness_cache=False):
+    """
+    Solve every instance file of the input directory, in parallel processes if nb_workers isn't 1.
+    
+    The largest files are scheduled first so that a long instance doesn't start last. The report of each
+    instance is printed as soon as it is solved, followed by a summary table once they are all solved. A file
+    which fails is reported and skipped. A multi-start tabu search already runs its trajectories in parallel,
+    so its files are solved one after the other.
+    
+    Every solved file is recorded in a manifest of the output directory, keyed by the name and the hash of the
+    instance, the metaheuristic, its parameters and the seed. A file whose job is in the manifest, with its solution
+    unchanged, is skipped unless force is True. The manifest is saved after each file, so an interrupted
+    batch resumes where it stopped.
+    
+    With warm_start, the files which already have a solution are solved again starting from it. With a telemetry
+    directory, the telemetry records of each search are written to a JSONL file in it. With preprocess, only the
+    items left by reduce_instance are searched, and with fitness_cache the genetic algorithm caches the fitnesses of
+    its orderings (see solve_file).
+    """
+    
+    check_solution_format(solution_format)
+    
+    files = [file for file in os.listdir(input_data_directory) if file.endswith((".bp2d", BINARY_INSTANCE_EXTENSION))]
+    files.sort(key=lambda file: os.path.getsize(os.path.join(input_data_directory, file)), reverse=True)
+    if not files:
+        return []
+    
+    # Only the parameters used by the selected metaheuristic change the solution
+    parameters = {'kappa': kappa, 'guillotine': guillotine, 'rotation': rotation, 'engine': engine, 
+                  'split_rule': split_rule, 'bin_selection': bin_selection, 'open_bins': open_bins, 
+                  'solution_format': solution_format}
+    if selected_metaheuristic == Metaheuristic.TABU:
+        parameters.update({'iteration_number': iteration_number, 'tabu_list_size': tabu_list_size, 
+                           'nb_starts': nb_starts, 'restart_interval': restart_interval, 'reactive': reactive, 
+                           'diversification_interval': diversification_interval})
+    else:
+        parameters.update({'population_size': population_size, 'nb_generations': nb_generations, 
+                           'crossover_rate': crossover_rate, 'mutation_rate': mutation_rate, 'delta': delta})
+    # A warm started solution also depends on the previous one
+    if warm_start:
+        parameters['warm_start'] = True
+    # Only recorded when enabled, so that the jobs solved before it existed stay solved
+    if preprocess:
+        parameters['preprocess'] = True
+    
+    manifest_path = os.path.join(output_data_directory, MANIFEST_FILE)
+    jobs = load_manifest(manifest_path)
     
-    print(f"Time elapsed: {time_elapsed:.1f} seconds")
-    print(f"Best solution: {len(solution)} bins")
-    print(f"Solution saved to: {solution_file_path}\n")
+    results = []
+    pending = []
+    for file in files:
+        key = get_job_key(compute_file_hash(os.path.join(input_data_directory, file)), file,
+                          selected_metaheuristic, parameters, seed)
+        
+        if not force and is_job_solved(jobs.get(key)):
+            results.append(dict(jobs[key]['result'], cached=True))
+        else:
+            pending.append((file, key))
+    
+    if results:
+        print(f"{len(results)} of {len(files)} files already solved with these parameters\n")
+    
+    solve_arguments = (selected_metaheuristic, iteration_number, tabu_list_size, kappa, guillotine, rotation, 
+                       population_size, nb_generations, crossover_rate, mutation_rate, delta, 
+                       input_data_directory, output_data_directory, nb_starts, restart_interval,
+                       reactive, diversification_interval, engine, split_rule, bin_selection, open_bins, seed, solution_format,
+                       warm_start, telemetry_directory, preprocess, fitness_cache)
+    
+    def record(key, result):
+        # A solution file belongs to a single job, the previous job which wrote it is stale
+        for stale_key in [stale_key for stale_key, job in jobs.items() 
+                          if job['solution_file_path'] == result['solution_file_path']]:
+            del jobs[stale_key]
+        
+        jobs[key] = {'file': result['file_name'], 'metaheuristic': selected_metaheuristic.name, 
+                     'parameters': parameters, 'seed': seed, 'result': result,
+                     'solution_file_path': result['solution_file_path'], 
+                     'solution_sha256': compute_file_hash(result['solution_file_path'])}
+        save_manifest(jobs, manifest_path)
+        
+        results.append(dict(result, cached=False))
+        print_solution_report(result, f" [{len(results)}/{len(files)}]")
+    
+    failures = {}
+    def fail(file, error):
+        # A file which can't be solved doesn't stop the batch, it is reported and solved again by the next one
+        failures[file] = error
+        print(f"Failed to solve {file}: {error!r}\n", flush=True)
+    
+    wall_start = time.perf_counter()
+    if selected_metaheuristic == Metaheuristic.TABU and nb_starts > 1:
+        # A multi-start tabu search already runs its trajectories in a process pool on every CPU
+        nb_workers = 1
+    nb_workers = count_workers(len(pending), nb_workers)
+    
+    if nb_workers == 1:
+        for file, key in pending:
+            try:
+                result = solve_file(file, *solve_arguments)
+            except Exception as error:
+                fail(file, error)
+            else:
+                record(key, result)
+    elif nb_workers > 1:
+        with create_process_pool(nb_workers) as executor:
+            futures = {executor.submit(solve_file, file, *solve_arguments): (file, key) for file, key in pending}
+            for future in as_completed(futures):
+                file, key = futures[future]
+                try:
+                    result = future.result()
+                except Exception as error:
+                    fail(file, error)
+                else:
+                    record(key, result)
+    
+    print_batch_summary(results, time.perf_counter() - wall_start, failures)
+    
+    return results
+            
+def generate_single_solution(file, selected_metaheuristic, iteration_number, tabu_list_size, kappa, 
+            guillotine, rotation, population_size, nb_generations, crossover_rate, mutation_rate, delta,
+            input_data_directory, output_data_directory, nb_starts=1, restart_interval=0,
+            reactive=False, diversification_interval=0, engine=LGFI_ENGINE, split_rule=SHORTER_LEFTOVER_SPLIT,
+            bin_selection=FIRST_FIT_SELECTION, open_bins=DEFAULT_OPEN_BINS, seed=None, solution_format="json", warm_start=False,
+            telemetry_directory=None, preprocess=False, fitness_cache=False):
+
+    check_solution_format(solution_format)
+    
+    result = solve_file(file, selected_metaheuristic, iteration_number, tabu_list_size, kappa, guillotine, rotation, 
+                        population_size, nb_generations, crossover_rate, mutation_rate, delta,
+                        input_data_directory, output_data_directory, nb_starts, restart_interval,
+                        reactive, diversification_interval, engine, split_rule, bin_selection, open_bins, seed, 
+                        solution_format, warm_start, telemetry_directory, preprocess, fitness_cache)
+    
+    print_solution_report(result)
     
 def visualize_solution(file, output_data_directory):
+    # Matplotlib and Tkinter are only loaded to draw, headless runs never import them
+    from binpacking.visualization import visualize_bins
+
     solution_file_path = os.path.join(output_data_directory, file) 
-    bins = import_solution_from_json(solution_file_path)
+    bins = import_solution(solution_file_path)
     visualize_bins(bins)
\ No newline at end of file